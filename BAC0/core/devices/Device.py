@@ -8,12 +8,15 @@
 Device.py - describe a BACnet Device
 
 """
+from __future__ import annotations
+
 import asyncio
 import logging
 import os.path
 
 # --- standard Python modules ---
 from collections import namedtuple
+from datetime import datetime, timedelta
 from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 
@@ -22,9 +25,13 @@ from bacpypes3.basetypes import ServicesSupported
 from bacpypes3.errors import NoResponse
 
 # from ...bokeh.BokehRenderer import BokehPlot
+from ...db.export import HistoryExport
+from ...db.history_files import HistoryFiles
 from ...db.sql import SQLMixin
 from ...tasks.DoOnce import DoOnce
 from ...tasks.Poll import DeviceOneShotPoll
+from ..functions.ChangeFeed import ChangeSubscription
+from ..functions.CircuitBreaker import CircuitBreaker
 from ..io.IOExceptions import (
     BadDeviceDefinition,
     DeviceNotConnected,
@@ -36,6 +43,7 @@ from ..io.IOExceptions import (
 )
 from ..utils.notes import note_and_log
 from ..utils.lookfordependency import pandas_if_available
+from ..utils.offload import offload
 from .mixins.read_mixin import ReadProperty, ReadPropertyMultiple
 from .Points import BooleanPoint, EnumPoint, NumericPoint, OfflinePoint, Point
 from .Virtuals import VirtualPoint
@@ -64,6 +72,7 @@ class DeviceProperties(object):
         self.fast_polling: bool = False
         self.vendor_id: int = 0
         self.ping_failures: int = 0
+        self.history_files: Optional[HistoryFiles] = None
 
     @property
     def asdict(self) -> Dict:
@@ -89,6 +98,9 @@ class Device(SQLMixin):
     object_list (list, optional): User can provide a custom object list for the creation of the device. The object list must be built using the same pattern returned by bacpypes when polling the objectList property. Defaults to None.
     auto_save (bool or int, optional): If False or 0, auto_save is disabled. To activate, pass an integer representing the number of polls before auto_save is called. Will write the histories to SQLite db locally. Defaults to None.
     clear_history_on_save (bool, optional): If set to True, will clear device history. Defaults to None.
+    history_path (str, optional): Folder where point histories are also written to disk, in a
+        Device_<device_id> subfolder. They survive a restart and can be reopened with
+        from_backup='<history_path>/Device_<device_id>'. Defaults to None.
 
     """
 
@@ -107,6 +119,7 @@ class Device(SQLMixin):
         clear_history_on_save: bool = False,
         history_size: Optional[int] = None,
         reconnect_on_failure: bool = True,
+        history_path: Optional[str] = None,
     ):
         self.properties = DeviceProperties()
         # self.initialized = False
@@ -135,6 +148,8 @@ class Device(SQLMixin):
 
         self.points = []
         self._list_of_trendlogs = {}
+        # shared by polling, writes, COV and trend logs
+        self.breaker = CircuitBreaker(self)
 
         self._polling_task = namedtuple("_polling_task", ["task", "running"])
         self._polling_task.task = None
@@ -154,7 +169,9 @@ class Device(SQLMixin):
             filename = from_backup
             db_name = filename.split(".")[0]
             self.properties.network = None
-            if os.path.isfile(filename):
+            if os.path.isfile(os.path.join(filename, HistoryFiles.INDEX)):
+                self.properties.history_files = HistoryFiles(filename, read_only=True)
+            elif os.path.isfile(filename):
                 self.properties.db_name = db_name
 
             else:
@@ -170,6 +187,10 @@ class Device(SQLMixin):
                 raise BadDeviceDefinition(
                     "Please provide address, device id and network or specify from_backup argument"
                 )
+            if history_path:
+                self.properties.history_files = HistoryFiles(
+                    os.path.join(history_path, f"Device_{device_id}")
+                )
 
     @property
     def initialized(self):
@@ -216,15 +237,35 @@ class Device(SQLMixin):
     def initialize_device_from_db(self) -> None:
         raise NotImplementedError()
 
-    def df(self, list_of_points: List[str], force_read: bool = True) -> pd.DataFrame:
+    def df(
+        self,
+        list_of_points: List[str],
+        force_read: bool = True,
+        start: Optional[Union[datetime, timedelta]] = None,
+        end: Optional[datetime] = None,
+    ) -> pd.DataFrame:
         """
         Build a pandas DataFrame from a list of points.  DataFrames are used to present and analyze data.
 
         :param list_of_points: a list of point names as str
+        :param start: only keep records from start (datetime or timedelta for the last X)
+        :param end: only keep records until end (datetime)
         :returns: pd.DataFrame
         """
         raise NotImplementedError()
 
+    async def df_async(
+        self,
+        list_of_points: List[str],
+        force_read: bool = True,
+        start: Optional[Union[datetime, timedelta]] = None,
+        end: Optional[datetime] = None,
+    ) -> pd.DataFrame:
+        """
+        Same as df() but the DataFrame is built in a worker thread.
+        """
+        raise NotImplementedError()
+
     @property
     def simulated_points(self) -> Iterator[Point]:
         """
@@ -315,6 +356,53 @@ class Device(SQLMixin):
         for point in self.points:
             point.properties.history_size = size
 
+    def changes(self, **kwargs: Any) -> ChangeSubscription:
+        """
+        Follow the updates of the points of this device.
+        Same arguments as bacnet.changes() (types, tags, maxsize, batch_size)
+
+        ex.
+            async with dev.changes(types=["binary"]) as feed:
+                async for batch in feed:
+                    ...
+        """
+        if self.properties.network is None:
+            raise DeviceNotConnected("Must be connected to BACnet to follow changes")
+        return self.properties.network.changes(devices=[self], **kwargs)
+
+    @property
+    def round_trip_time(self) -> Dict[str, Any]:
+        """
+        Answer times of the device (smoothed round trip time, variation,
+        current timeout), used to choose timeouts and retries of requests
+        """
+        if self.properties.network is None:
+            raise DeviceNotConnected("Must be connected to BACnet")
+        return self.properties.network.round_trip_times.stats(self.properties.address)
+
+    async def export(
+        self,
+        path: str,
+        format: str = "parquet",
+        start: Optional[Union[datetime, timedelta]] = None,
+        end: Optional[datetime] = None,
+        chunk_size: int = 65536,
+    ) -> int:
+        """
+        Write the point histories and the trend logs read from the device
+        to a file, chunk by chunk (see BAC0.db.export).
+
+        :param format: "parquet" (requires pyarrow) or "csv"
+        :param start: datetime, or timedelta for the last X (ex. 1 day)
+        :param end: datetime, defaults to now
+        :returns: number of samples written
+
+        ex. await dev.export("dev5.parquet", start=timedelta(days=1))
+        """
+        async with HistoryExport(path, format=format, chunk_size=chunk_size) as export:
+            await export.add_device(self, start, end)
+        return export.rows
+
     @property
     def analog_units(self) -> Dict[str, str]:
         raise NotImplementedError()
@@ -453,6 +541,8 @@ class DeviceConnected(Device):
 
     async def _init_state(self):
         await self._buildPointList()
+        if self.properties.history_files is not None:
+            self.properties.history_files.register_points(self.points)
         self.properties.network.register_device(self)
         if self.properties.pollDelay == 0:
             _poll = DeviceOneShotPoll(self)
@@ -470,6 +560,8 @@ class DeviceConnected(Device):
         if save_on_disconnect:
             self.log(f"Saving {self.properties.name} to database...", level="info")
             await self.save()
+        if self.properties.history_files is not None:
+            self.properties.history_files.close()
         if self.properties.db_name:
             await self.new_state(DeviceFromDB)
         else:
@@ -490,21 +582,50 @@ class DeviceConnected(Device):
                 "Already connected, provide db arg if you want to connect to db"
             )
 
-    def df(self, list_of_points, force_read=True):
+    def df(self, list_of_points, force_read=True, start=None, end=None):
         """
         When connected, calling DF should force a reading on the network.
+        start and end limit the records to a time range.
+        """
+        return self._df_from_snapshot(
+            self._points_snapshot(list_of_points, force_read, start, end)
+        )
+
+    async def df_async(self, list_of_points, force_read=True, start=None, end=None):
+        """
+        Same as df() but the dataframe is built in a worker thread so polling
+        and COV are not delayed by large histories.
         """
+        return await offload(
+            self._df_from_snapshot,
+            self._points_snapshot(list_of_points, force_read, start, end),
+        )
 
-        his = []
+    def _points_snapshot(self, list_of_points, force_read=True, start=None, end=None):
+        snapshot = {}
         for point in list_of_points:
             try:
-                his.append(self._findPoint(point, force_read=force_read).history)
+                snapshot[point] = self._findPoint(
+                    point, force_read=force_read
+                )._history_snapshot(start, end)
             except ValueError as ve:
                 self.log(f"Value Error : {ve}", level=logging.DEBUG)
                 continue
+        return snapshot
+
+    @staticmethod
+    def _df_from_snapshot(snapshot):
         if not _PANDAS:
-            return dict(zip(list_of_points, his))
-        return pd.DataFrame(dict(zip(list_of_points, his)))
+            return {
+                name: dict(zip(timestamps, values))
+                for name, (timestamps, values) in snapshot.items()
+            }
+        return pd.DataFrame(
+            {
+                name: pd.Series(index=timestamps, data=values)
+                for name, (timestamps, values) in snapshot.items()
+            }
+        )
 
     async def _buildPointList(self):
         """
@@ -876,7 +997,8 @@ class DeviceDisconnected(Device):
             self.properties.network = network
         if not self.properties.network:
             self.log("No network...calling DeviceFromDB", level="debug")
-            if db:
+            files = self.properties.history_files
+            if db or self.properties.db_name or (files is not None and files.points):
                 await self.new_state(DeviceFromDB)
             self.log(
                 'You can reconnect to network using : "device.connect(network=bacnet)"',
@@ -890,6 +1012,7 @@ class DeviceDisconnected(Device):
                         self.properties.address, self.properties.device_id
                     )
                 )
+                self.breaker.reset()
 
                 segmentation = await self.properties.network.read(
                     "{} device {} segmentationSupported".format(
@@ -923,7 +1046,10 @@ class DeviceDisconnected(Device):
                     )
                     self._log.warning("Ex. controller.connect(db = 'backup')")
 
-    def df(self, list_of_points, force_read=True):
+    def df(self, list_of_points, force_read=True, start=None, end=None):
+        raise DeviceNotConnected("Must connect to BACnet or database")
+
+    async def df_async(self, list_of_points, force_read=True, start=None, end=None):
         raise DeviceNotConnected("Must connect to BACnet or database")
 
     @property
@@ -1062,9 +1188,12 @@ class DeviceFromDB(DeviceConnected):
 
     async def initialize_device_from_db(self):
         self.log(f"Initializing DB for {self.properties.name}", level="info")
+        if self.properties.history_files is not None:
+            return self._initialize_device_from_history_files()
         # Save important properties for reuse
         if self.properties.db_name:
             dbname = self.properties.db_name
+            await self.upgrade_backup(dbname)
             try:
                 self._props = self.read_dev_prop(self.properties.db_name)
             except ValueError:
@@ -1078,11 +1207,14 @@ class DeviceFromDB(DeviceConnected):
         # network = self.properties.network
         pss = self.properties.pss
 
+        # histories are read from the database when used
         self.points = []
-        for point in await self.points_from_sql(self.properties.db_name):
+        points_props = await self.points_prop_from_sql(self.properties.db_name)
+        for point, props in points_props.items():
             try:
-                self.points.append(OfflinePoint(self, point))
-            except RemovedPointException:
+                self.points.append(OfflinePoint(self, point, props))
+            except TypeError:
+                # no offline version for this type (dates...)
                 continue
 
         self.properties = DeviceProperties()
@@ -1107,6 +1239,27 @@ class DeviceFromDB(DeviceConnected):
             level="info",
         )
 
+    def _initialize_device_from_history_files(self):
+        """
+        Only the index is read, histories are mapped from disk when used.
+        """
+        files = self.properties.history_files
+        self.points = []
+        for point in files.points:
+            try:
+                self.points.append(OfflinePoint(self, point))
+            except RemovedPointException:
+                continue
+        _props = files.device_properties
+        self.properties.name = _props.get("name", self.properties.name)
+        self.properties.address = _props.get("address")
+        self.properties.device_id = _props.get("device_id")
+        self.properties.network = None
+        self.properties.pollDelay = _props.get("pollDelay")
+        self.properties.multistates = _props.get("multistates") or {}
+        self.properties.default_history_size = _props.get("history_size")
+        self.log(f"{self.properties.name} restored from {files.path}", level="info")
+
     @property
     def simulated_points(self):
         raise DeviceNotConnected("Must connect to BACnet or database")
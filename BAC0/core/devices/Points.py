@@ -9,11 +9,14 @@ Points.py - Definition of points so operations on Read results are more convenie
 """
 
 import asyncio
+import sys
 import typing as t
-from collections import namedtuple
+from bisect import bisect_left, bisect_right
 
 # --- standard Python modules ---
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from numbers import Real
+from types import MappingProxyType
 
 from bacpypes3.basetypes import BinaryPV, PropertyIdentifier
 from bacpypes3.pdu import Address
@@ -27,23 +30,56 @@ from ...tasks.Match import Match, Match_Value
 # --- this application's modules ---
 from ...tasks.Poll import SimplePoll as Poll
 from ..io.IOExceptions import (
+    CircuitOpen,
     NoResponseFromController,
-    RemovedPointException,
     UnknownPropertyError,
     WritePropertyException,
 )
 from ..utils.lookfordependency import pandas_if_available
 from ..utils.notes import note_and_log
 
-_PANDAS, pd, sql, Timestamp = pandas_if_available()
+_PANDAS, pd, _, _ = pandas_if_available()
 # ------------------------------------------------------------------------------
 
 
+_shared_metadata: t.Dict[t.Any, t.Any] = {}
+
+
+def share(value: t.Any) -> t.Any:
+    """
+    Return a shared instance of value. Points with the same type, units or
+    description then reference the same object instead of holding a copy.
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    try:
+        return _shared_metadata.setdefault(value, value)
+    except TypeError:
+        # unhashable (list)
+        return value
+
+
 class PointProperties(object):
     """
     A container for point properties.
     """
 
+    __slots__ = (
+        "device",
+        "name",
+        "type",
+        "address",
+        "description",
+        "units_state",
+        "simulated",
+        "overridden",
+        "priority_array",
+        "history_size",
+        "bacnet_properties",
+        "status_flags",
+        "recording",
+    )
+
     def __init__(self):
         self.device = None
         self.name = None
@@ -57,13 +93,239 @@ class PointProperties(object):
         self.history_size = None
         self.bacnet_properties = {}
         self.status_flags = None
+        self.recording = None
 
     def __repr__(self):
         return f"{self.asdict}"
 
     @property
     def asdict(self):
-        return self.__dict__
+        return {
+            each: getattr(self, each) for each in self.__slots__ if hasattr(self, each)
+        }
+
+
+def _aware(timestamp: datetime) -> datetime:
+    # histories are timezone aware, naive datetimes are local time
+    return timestamp if timestamp.tzinfo else timestamp.astimezone()
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+
+
+class HistoryTier(object):
+    """
+    Downsampled history : min, max, mean and last value of the samples
+    received in each bucket of `step`. Buckets are updated as samples
+    arrive ; buckets older than `retention` are dropped. A late sample (older
+    than the bucket in progress) is merged into its bucket, so timestamps
+    stay sorted.
+    """
+
+    __slots__ = (
+        "step",
+        "retention",
+        "timestamp",
+        "min",
+        "max",
+        "mean",
+        "last",
+        "_counts",
+        "_start",
+        "_min",
+        "_max",
+        "_sum",
+        "_count",
+        "_last",
+    )
+
+    def __init__(self, step: timedelta, retention: t.Optional[timedelta] = None):
+        self.step = step
+        self.retention = retention
+        self.clear()
+
+    def clear(self) -> None:
+        self.timestamp: t.List[datetime] = []
+        self.min: t.List[float] = []
+        self.max: t.List[float] = []
+        self.mean: t.List[float] = []
+        self.last: t.List[float] = []
+        self._counts: t.List[int] = []
+        self._start: t.Optional[datetime] = None
+
+    def bucket(self, timestamp: datetime) -> datetime:
+        step = self.step // _ONE_US
+        return timestamp - timedelta(
+            microseconds=((timestamp - _EPOCH) // _ONE_US) % step
+        )
+
+    def add(self, timestamp: datetime, value) -> None:
+        if not isinstance(value, Real) or value != value:
+            # only numbers are aggregated, NaN is skipped
+            return
+        start = self.bucket(timestamp)
+        if self._start is not None and start < self._start:
+            self._merge(start, value)
+            return
+        if start != self._start:
+            self._close()
+            self._start = start
+            self._min = self._max = self._sum = self._last = value
+            self._count = 1
+            return
+        if value < self._min:
+            self._min = value
+        elif value > self._max:
+            self._max = value
+        self._sum += value
+        self._count += 1
+        self._last = value
+
+    def _merge(self, start: datetime, value) -> None:
+        i = bisect_left(self.timestamp, start)
+        if i < len(self.timestamp) and self.timestamp[i] == start:
+            count = self._counts[i]
+            self.min[i] = min(self.min[i], value)
+            self.max[i] = max(self.max[i], value)
+            self.mean[i] = (self.mean[i] * count + value) / (count + 1)
+            self._counts[i] = count + 1
+            # last stays the value of the newest sample of the bucket
+            return
+        if self.retention is not None and start < self._start - self.retention:
+            # older than what the tier keeps
+            return
+        bucket = (start, value, value, value, value, 1)
+        for column, each in zip(self._columns(), bucket):
+            column.insert(i, each)
+
+    def _columns(self) -> t.Tuple[list, ...]:
+        return (self.timestamp, self.min, self.max, self.mean, self.last, self._counts)
+
+    def _close(self) -> None:
+        if self._start is None:
+            return
+        self.timestamp.append(self._start)
+        self.min.append(self._min)
+        self.max.append(self._max)
+        self.mean.append(self._sum / self._count)
+        self.last.append(self._last)
+        self._counts.append(self._count)
+        if self.retention is not None:
+            i = bisect_left(self.timestamp, self._start - self.retention)
+            if i:
+                for column in self._columns():
+                    del column[:i]
+
+    def snapshot(self) -> t.Tuple[t.List[datetime], t.Dict[str, t.List[float]]]:
+        """
+        Closed buckets and the bucket in progress, as (timestamps, columns)
+        """
+        timestamps = self.timestamp.copy()
+        columns = {
+            "min": self.min[: len(timestamps)],
+            "max": self.max[: len(timestamps)],
+            "mean": self.mean[: len(timestamps)],
+            "last": self.last[: len(timestamps)],
+        }
+        if self._start is not None:
+            timestamps.append(self._start)
+            columns["min"].append(self._min)
+            columns["max"].append(self._max)
+            columns["mean"].append(self._sum / self._count)
+            columns["last"].append(self._last)
+        return timestamps, columns
+
+
+# Resolutions available for tiered histories
+HISTORY_TIERS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1)}
+_NO_TIERS: t.Mapping[str, HistoryTier] = MappingProxyType({})
+
+
+class PointHistory(object):
+    """
+    Timestamps and values read for a point
+
+    raw_window : raw samples older than this are dropped (None = kept)
+    tiers : downsampled histories by resolution name (see HISTORY_TIERS)
+    """
+
+    __slots__ = ("timestamp", "value", "raw_window", "tiers")
+
+    def __init__(self):
+        self.timestamp: t.List[datetime] = []
+        self.value: t.List[t.Any] = []
+        self.raw_window: t.Optional[timedelta] = None
+        self.tiers: t.Mapping[str, HistoryTier] = _NO_TIERS
+
+
+class TaskState(object):
+    """
+    A task attached to a point and its state
+    """
+
+    __slots__ = ("task", "running")
+
+    def __init__(self):
+        self.task = None
+        self.running = False
+
+
+class RecordingPolicy(object):
+    """
+    Decide if a sample must be added to the history of a point.
+
+    deadband : change from the last recorded value required to record a
+               sample. None records every change (change-only).
+    percent : deadband is a percentage of the last recorded value
+    heartbeat : a sample is recorded anyway when the last recorded one is
+                older than this (timedelta)
+    """
+
+    __slots__ = ("deadband", "percent", "heartbeat")
+
+    def __init__(
+        self,
+        deadband: t.Optional[float] = None,
+        percent: bool = False,
+        heartbeat: t.Optional[timedelta] = None,
+    ):
+        self.deadband = deadband
+        self.percent = percent
+        self.heartbeat = heartbeat
+
+    def accept(self, history: PointHistory, timestamp: datetime, value) -> bool:
+        if not history.timestamp:
+            return True
+        if (
+            self.heartbeat is not None
+            and timestamp - history.timestamp[-1] >= self.heartbeat
+        ):
+            return True
+        last = history.value[-1]
+        if value is None or last is None:
+            return value is not last
+        if self.deadband is None:
+            return value != last
+        try:
+            delta = abs(value - last)
+        except TypeError:
+            return value != last
+        if delta != delta:
+            # NaN, record when only one of them is NaN
+            return (value != value) != (last != last)
+        threshold = abs(last) * self.deadband / 100 if self.percent else self.deadband
+        return delta > 0 and delta >= threshold
+
+    def __repr__(self):
+        unit = "%" if self.percent else ""
+        return f"RecordingPolicy(deadband={self.deadband}{unit}, heartbeat={self.heartbeat})"
+
+
+_NO_READ: t.Tuple[t.Optional[datetime], t.Any] = (None, None)
+
+# Binary histories hold 0 / 1, decoded with this table
+BINARY_STATES = ("inactive", "active")
 
 
 # ------------------------------------------------------------------------------
@@ -78,6 +340,20 @@ class Point:
     is added to a history table. Histories capture the changes to point values over time.
     """
 
+    __slots__ = (
+        "properties",
+        "_history",
+        "_polling_task",
+        "_match_task",
+        "_previous_read",
+        "_last_seen",
+        "cov_registered",
+        "cov_task",
+        "tags",
+        "_series_key",
+        "__weakref__",
+    )
+
     _cache_delta = timedelta(seconds=5)
 
     def __init__(
@@ -92,41 +368,33 @@ class Point:
         history_size=None,
         tags=[],
     ):
-        self._history = namedtuple("_history", ["timestamp", "value"])
+        self._history = PointHistory()
         self.properties = PointProperties()
-
-        self._polling_task = namedtuple("_polling_task", ["task", "running"])
-        self._polling_task.task = None
-        self._polling_task.running = False
-
-        self._match_task = namedtuple("_match_task", ["task", "running"])
-        self._match_task.task = None
-        self._match_task.running = False
-
-        self._history.timestamp = []
-        self._history.value = []
-        # self._history.value = [presentValue]
-        # self._history.timestamp.append(datetime.now().astimezone())
+        self._polling_task = TaskState()
+        self._match_task = TaskState()
 
         self.properties.history_size = history_size
 
         self.properties.device = device
         self.properties.name = str(pointName)
-        self.properties.type = pointType
+        self.properties.type = share(pointType)
         self.properties.address = pointAddress
 
-        self.properties.description = str(description)
-        self.properties.units_state = units_state
+        self.properties.description = share(str(description))
+        self.properties.units_state = share(units_state)
         self.properties.simulated = (False, 0)
         self.properties.overridden = (False, 0)
 
         self.cov_registered = False
 
         self.tags = tags
+        # InfluxDB measurement and tag set (see BAC0.db.line_protocol)
+        self._series_key = None
 
-        self._cache: t.Dict[str, t.Tuple[t.Optional[datetime], t.Any]] = {
-            "_previous_read": (None, None)
-        }
+        # (timestamp, value) of the last network read
+        self._previous_read = _NO_READ
+        # timestamp of the last sample, recorded or not
+        self._last_seen: t.Optional[datetime] = None
 
     @property
     async def value(self):
@@ -134,11 +402,11 @@ class Point:
         Retrieve value of the point
         """
         if (
-            self._cache["_previous_read"][0]
-            and datetime.now().astimezone() - self._cache["_previous_read"][0]
+            self._previous_read[0]
+            and datetime.now().astimezone() - self._previous_read[0]
             < Point._cache_delta
         ):
-            return self._cache["_previous_read"][1]
+            return self._previous_read[1]
 
         try:
             res = await self.properties.device.properties.network.read(
@@ -152,7 +420,7 @@ class Point:
             # self._trend(res)
         except Exception:
             raise
-        self._cache["_previous_read"] = (datetime.now().astimezone(), res)
+        self._previous_read = (datetime.now().astimezone(), res)
         return res
 
     async def read_priority_array(self):
@@ -259,10 +527,27 @@ class Point:
 
     def _trend(self, res: t.Optional[t.Union[float, int, str]]) -> None:
         now = datetime.now().astimezone()
+        self._last_seen = now
+        live_values = self.properties.device.properties.network.live_values
+        if live_values is not None:
+            live_values.update_point(self, now, res)
+        policy = self.properties.recording
+        if policy is not None and not policy.accept(self._history, now, res):
+            return
         self._history.timestamp.append(now)
         self._history.value.append(res)
-        if self.properties.device.properties.network.database:
-            self.properties.device.properties.network.database.prepare_point([self])
+        for tier in self._history.tiers.values():
+            tier.add(now, res)
+        if self.properties.device.properties.history_files is not None:
+            self.properties.device.properties.history_files.append(self, now, res)
+        change_feed = self.properties.device.properties.network.change_feed
+        if change_feed is not None:
+            change_feed.publish(self, now, res, self.properties.status_flags)
+        if self._history.raw_window is not None:
+            i = bisect_left(self._history.timestamp, now - self._history.raw_window)
+            if i:
+                del self._history.timestamp[:i]
+                del self._history.value[:i]
 
         if self.properties.history_size is None:
             return
@@ -318,10 +603,43 @@ class Point:
         """
         returns : (pd.Series) containing timestamp and value of all readings
         """
+        return self._history_series(*self._history_snapshot())
+
+    def history_range(
+        self,
+        start: t.Optional[t.Union[datetime, timedelta]] = None,
+        end: t.Optional[datetime] = None,
+        from_disk: bool = False,
+    ) -> t.Dict[datetime, t.Union[int, float, str]]:
+        """
+        Part of the history between start and end (both included). Only the
+        matching samples are copied, found by binary search on timestamps.
+
+        :param start: datetime, or timedelta for the last X (ex. 15 minutes)
+        :param end: datetime, defaults to now
+        :param from_disk: read the history files of the device (history_path)
+            instead of memory, includes what was recorded before a restart
+        :returns: (pd.Series) same as history
+        """
+        if not from_disk:
+            return self._history_series(*self._history_snapshot(start, end))
+        files = self.properties.device.properties.history_files
+        if files is None or self.properties.name not in files:
+            raise ValueError(f"No history on disk for {self.properties.name}")
+        if isinstance(start, timedelta):
+            start = datetime.now().astimezone() - start
+        return self._history_series(
+            *files.snapshot(
+                self.properties.name,
+                None if start is None else _aware(start),
+                None if end is None else _aware(end),
+            )
+        )
+
+    def _history_series(self, idx, values):
         if not _PANDAS:
-            return dict(zip(self._history.timestamp, self._history.value))
-        idx = self._history.timestamp.copy()
-        his_table = pd.Series(index=idx, data=self._history.value[: len(idx)])
+            return dict(zip(idx, values))
+        his_table = pd.Series(index=idx, data=values)
         del idx
         his_table.name = ("{}/{}").format(
             self.properties.device.properties.name, self.properties.name
@@ -338,9 +656,179 @@ class Point:
         his_table.datatype = self.properties.type
         return his_table
 
+    def history_at(self, resolution: str = "raw"):
+        """
+        History at a given resolution.
+
+        :param resolution: "raw" (same as point.history) or one of the tiers
+            enabled with set_retention ("minute", "hour")
+        :returns: (pd.DataFrame) min, max, mean and last value of each bucket
+            indexed by the start of the bucket (dict without pandas)
+        """
+        if resolution == "raw":
+            return self.history
+        try:
+            tier = self._history.tiers[resolution]
+        except KeyError:
+            raise ValueError(
+                f"No {resolution} history for {self.properties.name}, "
+                f"available : {['raw'] + list(self._history.tiers)}"
+            )
+        timestamps, columns = tier.snapshot()
+        if not _PANDAS:
+            return {
+                ts: {name: column[i] for name, column in columns.items()}
+                for i, ts in enumerate(timestamps)
+            }
+        his_table = pd.DataFrame(columns, index=timestamps)
+        his_table.index.name = ("{}/{}").format(
+            self.properties.device.properties.name, self.properties.name
+        )
+        return his_table
+
+    def set_retention(
+        self,
+        raw: t.Optional[t.Union[int, float, timedelta]] = None,
+        minute: t.Optional[t.Union[int, float, timedelta]] = None,
+        hour: t.Optional[t.Union[int, float, timedelta]] = None,
+        tiers: t.Iterable[str] = ("minute", "hour"),
+    ) -> None:
+        """
+        Keep raw samples for `raw` and downsampled histories (min, max, mean,
+        last per minute and per hour) for `minute` and `hour`. Durations are
+        in seconds or timedelta, None means no limit.
+
+        ex. dev['ZN-T'].set_retention(raw=3600, minute=86400, hour=7 * 86400)
+            dev['ZN-T'].history_at("minute")
+        """
+
+        def _duration(value):
+            if value is None or isinstance(value, timedelta):
+                return value
+            return timedelta(seconds=value)
+
+        retention = {"minute": _duration(minute), "hour": _duration(hour)}
+        self._history.raw_window = _duration(raw)
+        _tiers = {}
+        for name in tiers:
+            if name not in HISTORY_TIERS:
+                raise ValueError(f"Unknown tier {name} : {list(HISTORY_TIERS)}")
+            tier = HistoryTier(HISTORY_TIERS[name], retention[name])
+            # start with what is already in memory
+            for timestamp, value in zip(self._history.timestamp, self._history.value):
+                tier.add(timestamp, value)
+            _tiers[name] = tier
+        self._history.tiers = _tiers
+
+    def _history_snapshot(
+        self,
+        start: t.Optional[t.Union[datetime, timedelta]] = None,
+        end: t.Optional[datetime] = None,
+    ) -> t.Tuple[t.List[datetime], t.List[t.Union[int, float, str]]]:
+        """
+        Copy of the history lists (timestamps, values), limited to start and
+        end when given. Taken on the event loop, it can be handed to a worker
+        while polling keeps appending.
+        """
+        timestamps = self._history.timestamp
+        if start is None and end is None:
+            idx = timestamps.copy()
+            return idx, self._history.value[: len(idx)]
+        if isinstance(start, timedelta):
+            start = datetime.now().astimezone() - start
+        lo = 0 if start is None else bisect_left(timestamps, _aware(start))
+        hi = len(timestamps) if end is None else bisect_right(timestamps, _aware(end))
+        return timestamps[lo:hi], self._history.value[lo:hi]
+
+    def set_recording_policy(
+        self,
+        deadband: t.Optional[float] = None,
+        percent: bool = False,
+        heartbeat: t.Optional[t.Union[int, float, timedelta]] = None,
+    ) -> RecordingPolicy:
+        """
+        Record only the samples that matter instead of every poll.
+
+        :param deadband: minimal change to record a sample. Defaults to the
+            covIncrement of analog objects when known, otherwise every change
+            is recorded (change-only).
+        :param percent: deadband is a percentage of the last recorded value
+        :param heartbeat: record a sample at least every heartbeat seconds,
+            even if the value did not change
+
+        ex. dev['AI-1'].set_recording_policy(deadband=0.5, heartbeat=900)
+        """
+        if deadband is None and not percent:
+            deadband = self._default_deadband()
+        if heartbeat is not None and not isinstance(heartbeat, timedelta):
+            heartbeat = timedelta(seconds=heartbeat)
+        self.properties.recording = RecordingPolicy(
+            deadband=deadband, percent=percent, heartbeat=heartbeat
+        )
+        return self.properties.recording
+
+    def clear_recording_policy(self) -> None:
+        """
+        Go back to recording every sample
+        """
+        self.properties.recording = None
+
+    def _default_deadband(self) -> t.Optional[float]:
+        return None
+
+    def _state_table(self) -> t.Optional[t.Dict[int, str]]:
+        """
+        Texts of the codes stored in the history of binary and multistate
+        points. None for points that store their value as is.
+        """
+        return None
+
     def clear_history(self):
+        """
+        Clear the history in memory. History files on disk are kept.
+        """
         self._history.timestamp = []
         self._history.value = []
+        for tier in self._history.tiers.values():
+            tier.clear()
+
+    def load_history(
+        self,
+        timestamps: t.Sequence[datetime],
+        values: t.Sequence[t.Union[int, float, str]],
+    ) -> int:
+        """
+        Put older samples (ex. read back from a database after a restart)
+        in front of the history. Timestamps must be sorted ; samples that are
+        not older than the first one in memory are ignored. Downsampled
+        histories are only fed when the history was empty.
+
+        Returns the number of samples added.
+        """
+        history = self._history
+        if history.timestamp:
+            i = bisect_left(timestamps, history.timestamp[0])
+            timestamps, values = timestamps[:i], values[:i]
+        if not timestamps:
+            return 0
+        if not history.timestamp:
+            for tier in history.tiers.values():
+                for timestamp, value in zip(timestamps, values):
+                    tier.add(timestamp, value)
+        history.timestamp[:0] = timestamps
+        history.value[:0] = values
+        if history.raw_window is not None:
+            i = bisect_left(
+                history.timestamp, datetime.now().astimezone() - history.raw_window
+            )
+            if i:
+                del history.timestamp[:i]
+                del history.value[:i]
+        size = self.properties.history_size
+        if size is not None and len(history.timestamp) > size:
+            del history.timestamp[:-size]
+            del history.value[:-size]
+        return len(timestamps)
 
     def chart(self, remove=False):
         """
@@ -399,10 +887,12 @@ class Point:
                     raise ValueError("Priority must be a number between 1 and 16")
             req = f"{self.properties.device.properties.address} {self.properties.type} {self.properties.address} {prop} {value} - {priority}"
             # self.log(req, level='info')
+            device = self.properties.device
             try:
-                response = await self.properties.device.properties.network._write(
+                response = await device.breaker.call(
+                    device.properties.network._write,
                     req,
-                    vendor_id=self.properties.device.properties.vendor_id,
+                    vendor_id=device.properties.vendor_id,
                 )
                 # print(response)
                 self.log(f"Write response : {response}", level="debug")
@@ -648,6 +1138,11 @@ class Point:
         Returns:
             None
         """
+        if self.properties.device.breaker.is_open:
+            raise CircuitOpen(
+                f"{self.properties.device.properties.name} not answering, "
+                "COV subscription not sent"
+            )
         self.cov_task = COVPointSubscription(
             point=self, confirmed=confirmed, lifetime=lifetime, callback=callback
         )
@@ -688,21 +1183,20 @@ class Point:
         add information, etc.
         They will be included if InfluxDB is used.
         """
+        # a new list : the default one is shared and InfluxDB keys are
+        # built again when tags are replaced
         if lst is None:
-            self.tag.append((tag_id, tag_value))
+            self.tags = self.tags + [(tag_id, tag_value)]
         else:
-            for each in lst:
-                tag_id, tag_value = each
-                self.tag.append((tag_id, tag_value))
+            self.tags = self.tags + [(tag_id, tag_value) for tag_id, tag_value in lst]
 
     async def _update_value(self):
         await asyncio.wait_for(self.value, timeout=1.0)
 
     def _update_value_if_required(self):
-        value_too_old = (
-            self._history.timestamp[-1]
-            > datetime.now().astimezone() - Point._cache_delta
-        )
+        # with a recording policy, the history can be older than the last read
+        last_seen = self._last_seen or self._history.timestamp[-1]
+        value_too_old = last_seen > datetime.now().astimezone() - Point._cache_delta
         if value_too_old:
             try:
                 loop = asyncio.get_running_loop()
@@ -710,11 +1204,9 @@ class Point:
             except Exception as e:
                 self.log(f"Error updating value : {e}", level="error")
                 return self.lastValue
-        if datetime.now().astimezone() - self._history.timestamp[-1] > timedelta(
-            seconds=60
-        ):
+        if datetime.now().astimezone() - last_seen > timedelta(seconds=60):
             self.log(
-                f"Last known value {self._history.value[-1]} with timestamp of {self._history.timestamp[-1]}, older than 10sec {datetime.now().astimezone()}. Consider using dev['point'].lastValue if you trust polling of device of manage a up to date read in asynchronous side of your app for better precision",
+                f"Last known value {self._history.value[-1]} with timestamp of {last_seen}, older than 10sec {datetime.now().astimezone()}. Consider using dev['point'].lastValue if you trust polling of device of manage a up to date read in asynchronous side of your app for better precision",
                 level="warning",
             )
         return self.lastValue
@@ -728,6 +1220,8 @@ class NumericPoint(Point):
     Representation of a Numeric value
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         device=None,
@@ -766,6 +1260,12 @@ class NumericPoint(Point):
     def units(self):
         return self.properties.units_state
 
+    def _default_deadband(self):
+        try:
+            return float(self.properties.bacnet_properties["covIncrement"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
     async def _set(self, value):
         if str(value).lower() == "auto":
             await self._setitem(value)
@@ -830,6 +1330,8 @@ class BooleanPoint(Point):
     Representation of a Boolean value
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         device=None,
@@ -852,13 +1354,22 @@ class BooleanPoint(Point):
             units_state=units_state,
             history_size=history_size,
         )
-        self.properties.units_state = tuple(str(x) for x in units_state)
+        self.properties.units_state = share(tuple(str(x) for x in units_state))
 
     def _trend(self, res):
         if res is not None:
-            res = "1: active" if res == BinaryPV.active else "0: inactive"
+            res = 1 if res == BinaryPV.active else 0
         super()._trend(res)
 
+    def get_state(self, v):
+        try:
+            return BINARY_STATES[int(v)]
+        except (TypeError, ValueError, IndexError):
+            return "n/a"
+
+    def _state_table(self):
+        return dict(enumerate(BINARY_STATES))
+
     @property
     async def value(self):
         """
@@ -867,12 +1378,6 @@ class BooleanPoint(Point):
         res = await super().value
         self._trend(res)
 
-        if res == BinaryPV.inactive:
-            self._key = 0
-            self._boolKey = False
-        else:
-            self._key = 1
-            self._boolKey = True
         return res
 
     @property
@@ -880,17 +1385,7 @@ class BooleanPoint(Point):
         """
         returns : (boolean) Value
         """
-        if ":" in self.lastValue:
-            _val = int(self.lastValue.split(":")[0])
-        else:
-            _val = self.lastValue
-        if _val in [1, "active"]:
-            self._key = 1
-            self._boolKey = True
-        else:
-            self._key = 0
-            self._boolKey = False
-        return self._boolKey
+        return self.lastValue in [1, "active"]
 
     @property
     async def boolValue(self):
@@ -944,15 +1439,15 @@ class BooleanPoint(Point):
         self._update_value_if_required()
         if isinstance(other, str):
             if ":" in other:
-                return self.lastValue == other
-            elif other in ("inactive", "active"):
-                return self.lastValue.split(":")[1] == other
+                return f"{self.lastValue}: {self.get_state(self.lastValue)}" == other
+            elif other in BINARY_STATES:
+                return self.get_state(self.lastValue) == other
             else:
                 return False
         elif isinstance(other, bool):
             return self._boolValue == other
         elif isinstance(other, int):
-            return int(self.lastValue.split(":")[0]) == other
+            return self.lastValue == other
         else:
             return False
 
@@ -965,6 +1460,8 @@ class EnumPoint(Point):
     Representation of an Enumerated (multiState) value
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         device=None,
@@ -988,12 +1485,12 @@ class EnumPoint(Point):
             history_size=history_size,
         )
         self.properties.units_state = (
-            [str(x) for x in units_state] if units_state else []
+            [share(str(x)) for x in units_state] if units_state else []
         )
 
     def _trend(self, res):
         if res is not None:
-            res = f"{res}: {self.get_state(res)}"
+            res = int(res)
         super()._trend(res)
 
     @property
@@ -1007,27 +1504,22 @@ class EnumPoint(Point):
     def get_state(self, v):
         try:
             # errors caught below
-            return self.properties.units_state[v - 1]  # type: ignore[index]
-        except (TypeError, IndexError):
+            return self.properties.units_state[int(v) - 1]  # type: ignore[index]
+        except (TypeError, ValueError, IndexError):
             return "n/a"
 
+    def _state_table(self):
+        return {
+            code: state
+            for code, state in enumerate(self.properties.units_state or [], start=1)
+        }
+
     @property
     def _enumValue(self):
         """
         returns: (str) Enum state value
         """
-        try:
-            if ":" in self.lastValue:
-                _val = int(self.lastValue.split(":")[0])
-                return self.get_state(_val)
-        except TypeError:
-            # probably first occurence of history... retry
-            return self.get_state(self.lastValue)
-        except IndexError:
-            value = "unknown"
-        except ValueError:
-            value = "NaN"
-        return value
+        return self.get_state(self.lastValue)
 
     @property
     async def enumValue(self):
@@ -1071,11 +1563,11 @@ class EnumPoint(Point):
         self._update_value_if_required()
         if isinstance(other, str):
             if ":" in other:
-                return self.lastValue == other
+                return f"{self.lastValue}: {self._enumValue}" == other
             else:
                 return self._enumValue == other
         elif isinstance(other, int):
-            return int(self.lastValue.split(":")[0]) == other
+            return self.lastValue == other
         else:
             return self.lastValue == other
 
@@ -1085,6 +1577,8 @@ class StringPoint(Point):
     Representation of CharacterString value
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         device=None,
@@ -1150,6 +1644,8 @@ class DateTimePoint(Point):
     Representation of DatetimeValue value
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         device=None,
@@ -1237,14 +1733,18 @@ class OfflinePoint(Point):
     (we can't read on bacnet...)
     """
 
-    def __init__(self, device, name):
+    __slots__ = ()
+
+    def __init__(self, device, name, props=None):
         self.properties = PointProperties()
         self.properties.device = device
         dev_name = self.properties.device.properties.db_name
-        try:
-            props = self.properties.device.read_point_prop(dev_name, name)
-        except RemovedPointException:
-            raise
+        files = self.properties.device.properties.history_files
+        if props is None:
+            if files is not None and name in files:
+                props = files.point_properties(name)
+            else:
+                props = self.properties.device.read_point_prop(dev_name, name)
 
         self.properties.name = props["name"]
         self.properties.type = props["type"]
@@ -1270,15 +1770,25 @@ class OfflinePoint(Point):
         self.__class__ = newstate
 
 
+def _offline_history(point):
+    files = point.properties.device.properties.history_files
+    if files is not None and point.properties.name in files:
+        return point._history_series(*files.snapshot(point.properties.name))
+    return point._history_series(
+        *point.properties.device.history_from_sql(
+            point.properties.device.properties.db_name,
+            point.properties.name,
+            point.properties.type,
+        )
+    )
+
+
 class NumericPointOffline(NumericPoint):
+    __slots__ = ()
+
     @property
     def history(self):
-        his = self.properties.device._read_from_sql(
-            'select * from "history"',
-            self.properties.device.properties.db_name,
-        )
-        his.index = his["index"].apply(Timestamp)
-        return his.set_index("index")[self.properties.name]
+        return _offline_history(self)
 
     @property
     def value(self):
@@ -1317,14 +1827,11 @@ class NumericPointOffline(NumericPoint):
 
 
 class BooleanPointOffline(BooleanPoint):
+    __slots__ = ()
+
     @property
     def history(self):
-        his = self.properties.device._read_from_sql(
-            'select * from "history"',
-            self.properties.device.properties.db_name,
-        )
-        his.index = his["index"].apply(Timestamp)
-        return his.set_index("index")[self.properties.name]
+        return _offline_history(self)
 
     @property
     def value(self):
@@ -1348,14 +1855,11 @@ class BooleanPointOffline(BooleanPoint):
 
 
 class EnumPointOffline(EnumPoint):
+    __slots__ = ()
+
     @property
     def history(self):
-        his = self.properties.device._read_from_sql(
-            'select * from "history"',
-            self.properties.device.properties.db_name,
-        )
-        his.index = his["index"].apply(Timestamp)
-        return his.set_index("index")[self.properties.name]
+        return _offline_history(self)
 
     @property
     def value(self):
@@ -1397,14 +1901,11 @@ class EnumPointOffline(EnumPoint):
 
 
 class StringPointOffline(EnumPoint):
+    __slots__ = ()
+
     @property
     def history(self):
-        his = self.properties.device._read_from_sql(
-            'select * from "history"',
-            self.properties.device.properties.db_name,
-        )
-        his.index = his["index"].apply(Timestamp)
-        return his.set_index("index")[self.properties.name]
+        return _offline_history(self)
 
     @property
     def value(self):
@@ -1522,6 +2023,18 @@ class COVPointSubscription:
                             self.point._trend(val)
                         elif property_identifier == PropertyIdentifier.statusFlags:
                             self.point.properties.status_flags = property_value
+                            network = self.point.properties.device.properties.network
+                            if network.live_values is not None:
+                                network.live_values.update_status(self.point)
+                            if network.change_feed is not None:
+                                network.change_feed.publish(
+                                    self.point,
+                                    datetime.now().astimezone(),
+                                    self.point._history.value[-1]
+                                    if self.point._history.value
+                                    else None,
+                                    property_value,
+                                )
                         else:
                             self.point._log.warning(
                                 f"Unsupported COV property identifier {property_identifier}"
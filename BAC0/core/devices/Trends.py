@@ -16,6 +16,7 @@ from bacpypes3.primitivedata import Date, Time
 # --- this application's modules ---
 from ..utils.notes import note_and_log
 from ..utils.lookfordependency import pandas_if_available
+from ..utils.offload import offload
 
 _PANDAS, pd, _, _ = pandas_if_available()
 
@@ -135,6 +136,13 @@ class _TrendLog(TrendLogProperties):
         return self.properties.total_record_count
 
     async def read_log_buffer(self) -> None:
+        """
+        Read the records added since the last call (through the circuit
+        breaker of the device)
+        """
+        await self.properties.device.breaker.call(self._read_log_buffer)
+
+    async def _read_log_buffer(self) -> None:
         RECORDS = 10
         log_buffer = set()
         _actual_index = await self._total_record_count()
@@ -157,7 +165,8 @@ class _TrendLog(TrendLogProperties):
             for chunk in _chunk:
                 log_buffer.add(chunk)
         self._last_index = _from
-        self.create_dataframe(log_buffer)
+        # parsing records and building the dataframe is done in a worker
+        await offload(self.create_dataframe, log_buffer)
 
     def create_dataframe(self, log_buffer: set) -> None:
         for each in log_buffer:
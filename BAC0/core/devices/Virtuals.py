@@ -128,6 +128,7 @@ class VirtualPoint:
             EngineeringUnits(units) if object_type == "analogVirtual" else units
         )
         self.tags = tags
+        self._series_key = None
         self._history_fn = history_fn
 
         self._history = namedtuple("_history", ["timestamp", "value"])
@@ -161,10 +162,12 @@ class VirtualPoint:
             )
 
     def _trend(self, res):
-        self._history.timestamp.append(datetime.now().astimezone())
+        now = datetime.now().astimezone()
+        self._history.timestamp.append(now)
         self._history.value.append(res)
-        if self.properties.device.properties.network.database:
-            self.properties.device.properties.network.database.prepare_point([self])
+        network = self.properties.device.properties.network
+        if network is not None and network.change_feed is not None:
+            network.change_feed.publish(self, now, res)
 
         if self.properties.history_size is None:
             return
@@ -279,12 +282,12 @@ class VirtualPoint:
         add information, etc.
         They will be included if InfluxDB is used.
         """
+        # a new list : the default one is shared and InfluxDB keys are
+        # built again when tags are replaced
         if lst is None:
-            self.tag.append((tag_id, tag_value))
+            self.tags = self.tags + [(tag_id, tag_value)]
         else:
-            for each in lst:
-                tag_id, tag_value = each
-                self.tag.append((tag_id, tag_value))
+            self.tags = self.tags + [(tag_id, tag_value) for tag_id, tag_value in lst]
 
     def __repr__(self):
         return "{}/{} : {:.2f} {}".format(
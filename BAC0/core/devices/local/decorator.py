@@ -45,6 +45,49 @@ _required_analog_output: Tuple[str, ...] = (
 _required_analog_value: Tuple[str, ...] = ("priorityArray",)
 
 
+_commandable_classes: Dict[Type, Type] = {}
+_outOfService_classes: Dict[Type, Type] = {}
+
+
+def commandable_class(base_cls: Type) -> Type:
+    """
+    Return the Commandable subclass of base_cls. Classes are built once
+    and reused for every object of the same type. Classes that are already
+    commandable (local outputs) are returned unchanged.
+    """
+    if issubclass(base_cls, Commandable):
+        return base_cls
+    try:
+        return _commandable_classes[base_cls]
+    except KeyError:
+        new_type = type(
+            base_cls.__name__ + "Cmd",
+            (Commandable, base_cls),
+            {
+                "_required": (
+                    "priorityArray",
+                    "relinquishDefault",
+                    "currentCommandPriority",
+                )
+            },
+        )
+        _commandable_classes[base_cls] = new_type
+        return new_type
+
+
+def outOfService_class(base_cls: Type) -> Type:
+    """
+    Return the OutOfService subclass of base_cls. Classes are built once
+    and reused for every object of the same type.
+    """
+    try:
+        return _outOfService_classes[base_cls]
+    except KeyError:
+        new_type = type(base_cls.__name__ + "OOS", (OutOfService, base_cls), {})
+        _outOfService_classes[base_cls] = new_type
+        return new_type
+
+
 def make_commandable() -> Callable:
     def decorate(func: Callable) -> Callable:
         @wraps(func)
@@ -53,20 +96,8 @@ def make_commandable() -> Callable:
                 obj = func(*args, **kwargs)
             else:
                 obj = func
-            _type = obj.get_property_type("presentValue")
             base_cls = obj.__class__
-            base_cls_name = obj.__class__.__name__ + "Cmd"
-            new_type = type(
-                base_cls_name,
-                (Commandable, base_cls),
-                {
-                    "_required": (
-                        "priorityArray",
-                        "relinquishDefault",
-                        "currentCommandPriority",
-                    )
-                },
-            )
+            new_type = commandable_class(base_cls)
             objectType, instance, objectName, presentValue, description = args
             new_object = new_type(
                 objectIdentifier=(base_cls.objectType, instance),
@@ -90,12 +121,7 @@ def make_outOfService() -> Callable:
             else:
                 obj = func
             base_cls = obj.__class__
-            base_cls_name = obj.__class__.__name__ + "OOS"
-            new_type = type(
-                base_cls_name,
-                (OutOfService, base_cls),
-                {},
-            )
+            new_type = outOfService_class(base_cls)
             objectType, instance, objectName, presentValue, description = args
             new_object = new_type(
                 objectIdentifier=(base_cls.objectType, instance),
@@ -135,6 +161,25 @@ def add_feature(cls: Type) -> Callable:
     return decorate
 
 
+def set_properties(obj: Any, properties: Dict[str, Any]) -> Any:
+    """
+    Apply supplemental properties to an already created object.
+    """
+    for property_name, value in properties.items():
+        if property_name == "units":
+            new_prop = EngineeringUnits(value)
+            obj.__setattr__("units", new_prop)
+        else:
+            try:
+                property_type = obj.get_property_type(property_name)
+                obj.__setattr__(property_name, property_type(value))
+            except (KeyError, AttributeError) as error:
+                raise ValueError(
+                    f"Invalid property ({property_name}) for object | {error}"
+                )
+    return obj
+
+
 def bacnet_properties(properties: Dict[str, Any]) -> Callable:
     def decorate(func: Callable) -> Callable:
         @wraps(func)
@@ -143,21 +188,7 @@ def bacnet_properties(properties: Dict[str, Any]) -> Callable:
                 obj = func(*args, **kwargs)
             else:
                 obj = func
-            for property_name, value in properties.items():
-                if property_name == "units":
-                    new_prop = EngineeringUnits(value)
-                    obj.__setattr__("units", new_prop)
-                else:
-                    try:
-                        property_type = obj.get_property_type(property_name)
-                        # print(f"Property Type : {property_type}")
-                        # print(f"Value : {value}")
-                        obj.__setattr__(property_name, property_type(value))
-                    except (KeyError, AttributeError) as error:
-                        raise ValueError(
-                            f"Invalid property ({property_name}) for object | {error}"
-                        )
-            return obj
+            return set_properties(obj, properties)
 
         return wrapper
 
@@ -1,3 +1,5 @@
+import csv
+import json
 import typing as t
 from collections import namedtuple
 
@@ -20,14 +22,14 @@ from bacpypes3.local.multistate import (
     MultiStateOutputObject,
     MultiStateValueObject,
 )
-from bacpypes3.primitivedata import CharacterString
+from bacpypes3.primitivedata import CharacterString, ObjectType
 from colorama import Fore
 
 from BAC0.core.devices.local.trendLogs import LocalTrendLog
 
 from ....scripts.Base import Base
 from ...utils.notes import note_and_log
-from .decorator import bacnet_properties, create, make_commandable, make_outOfService
+from .decorator import commandable_class, create, outOfService_class, set_properties
 from .object import (
     CharacterStringValueObject,
     DateTimeValueObject,
@@ -59,6 +61,7 @@ class ObjectFactory(object):
     """
 
     instances: t.Dict[str, t.Set] = {}
+    _next_free_instance: t.Dict[str, int] = {}
 
     definition = namedtuple(  # type: ignore[name-match]
         "Definition",
@@ -104,43 +107,26 @@ class ObjectFactory(object):
             if relinquishDefault is not None:
                 relinquishDefault = enforce_datatype(relinquishDefault, pv_datatype)
 
-        @bacnet_properties(self._properties)
-        @make_commandable()
-        def _create_commandable(
-            objectType, instance, objectName, presentValue, description
-        ):
-            self._log.info(
-                f"Making this object commandable : type:{objectType} id:{instance} name:{objectName} presentValue:{presentValue} description:{description}"
-            )
-            return create(objectType, instance, objectName, presentValue, description)
-
-        @bacnet_properties(self._properties)
-        @make_outOfService()
-        def _create_outOfService(
-            objectType, instance, objectName, presentValue, description
-        ):
-            return create(objectType, instance, objectName, presentValue, description)
-
-        @bacnet_properties(self._properties)
-        def _create(objectType, instance, objectName, presentValue, description):
-            return create(objectType, instance, objectName, presentValue, description)
-
         objectName, instance = self.validate_name_and_instance(
             objectType, objectName, instance
         )
 
+        # Decorated classes are built once per objectType and reused
         if objectType in (AnalogInputObject, BinaryInputObject, MultiStateInputObject):
-            self.objects[objectName] = _create_outOfService(
-                objectType, instance, objectName, presentValue, description
-            )
+            _objectType = outOfService_class(objectType)
         elif is_commandable is True:
-            self.objects[objectName] = _create_commandable(
-                objectType, instance, objectName, presentValue, description
+            self.log(
+                f"Making this object commandable : type:{objectType} id:{instance} name:{objectName} presentValue:{presentValue} description:{description}",
+                level="debug",
             )
+            _objectType = commandable_class(objectType)
         else:
-            self.objects[objectName] = _create(
-                objectType, instance, objectName, presentValue, description
-            )
+            _objectType = objectType
+        self.objects[objectName] = set_properties(
+            create(_objectType, instance, objectName, presentValue, description),
+            self._properties,
+        )
+        self.objectName = objectName
         if objectType is TrendLogObject:  # Add special internal object for trendlog
             self.objects[objectName]._local = LocalTrendLog(
                 self.objects[objectName], datatype=_localTrendLogDataType
@@ -150,16 +136,16 @@ class ObjectFactory(object):
 
     def validate_instance(self, objectType, instance):
         _warning = True
-        try:
-            _set = self.instances[objectType.__name__]
-        except KeyError:
-            _set = set()
+        _set = self.instances.setdefault(objectType.__name__, set())
+        # All instances under this value are already taken
+        _next_free = self._next_free_instance.get(objectType.__name__, 0)
 
         if not instance:
             instance = 0
             _warning = False
 
         if instance in _set:
+            instance = max(instance, _next_free)
             while instance in _set:
                 instance += 1
             if _warning:
@@ -169,7 +155,10 @@ class ObjectFactory(object):
                 )
 
         _set.add(instance)
-        self.instances[objectType.__name__] = _set
+        if instance == _next_free:
+            while _next_free in _set:
+                _next_free += 1
+            self._next_free_instance[objectType.__name__] = _next_free
         return instance
 
     def validate_name_and_instance(self, objectType, objectName, instance):
@@ -203,20 +192,66 @@ class ObjectFactory(object):
     def clear_objects():
         ObjectFactory.objects = {}
         ObjectFactory.instances = {}
+        ObjectFactory._next_free_instance = {}
 
     def add_objects_to_application(self, app):
+        self._add_to_application(app, self.objects)
+
+    @classmethod
+    def _add_to_application(cls, app, objects):
         if isinstance(app, Base):
             app = app.this_application.app
         if not (isinstance(app, Application)):
             raise TypeError("Provide BAC0Application object or BAC0 Base instance")
-        for k, v in self.objects.items():
+        _added = 0
+        for k, v in objects.items():
             try:
                 app.add_object(v)
-                self.log(f"Adding {k} to application.", level="info")
+                _added += 1
+                cls._log.debug(f"Adding {k} to application.")
             except RuntimeError:
-                self._log.warning(
-                    f"There is already an object named {k} in application."
-                )
+                cls._log.warning(f"There is already an object named {k} in application.")
+        cls._log.info(f"{_added} objects added to application.")
+
+    @classmethod
+    def bulk_create(cls, definitions, app=None, format=None):
+        """
+        Create a lot of objects in one step. Definitions can be a list of dict
+        (same keys as ObjectFactory.from_dict), a path to a JSON or CSV file or
+        an opened JSON/CSV stream (use format="json" or format="csv").
+
+        objectType can be a bacpypes class or its name (ex. "analogValue").
+        Default properties of each type (units, stateText, polarity, etc.) are
+        provided the same way than when using analog_value(), binary_input()...
+
+        ex. :
+
+            ObjectFactory.bulk_create(
+                [{"name": "AV-1", "objectType": "analogValue", "presentValue": 1.0},
+                 {"name": "BI-1", "objectType": "binaryInput"}],
+                app=bacnet,
+            )
+
+        If app is provided, the new objects are added to the application.
+        Returns a dict (name: object) of the created objects.
+        """
+        created = {}
+        for definition in read_definitions(definitions, format=format):
+            definition = dict(definition)
+            _type = definition.pop("objectType")
+            if "properties" in definition:
+                definition["properties"] = dict(definition["properties"])
+            try:
+                _create_fn = _object_factories[
+                    str(_type.objectType if isinstance(_type, type) else ObjectType(_type))
+                ]
+            except (KeyError, ValueError, AttributeError):
+                raise ValueError(f"Unsupported objectType {_type}")
+            _new = _create_fn(**definition)
+            created[_new.objectName] = _new.objects[_new.objectName]
+        if app is not None:
+            cls._add_to_application(app, created)
+        return created
 
     def __repr__(self):
         return f"{self.objects}"
@@ -303,6 +338,39 @@ def _create(definition, **kwargs):
     return ObjectFactory.from_dict(_definition)
 
 
+def read_definitions(definitions, format=None):
+    """
+    Normalize definitions given to ObjectFactory.bulk_create. Accepts a list
+    of dict, a path to a .json or .csv file or an opened stream.
+    """
+    if isinstance(definitions, (list, tuple)):
+        return definitions
+    if isinstance(definitions, str):
+        format = format or definitions.rsplit(".", 1)[-1].lower()
+        with open(definitions, "r", newline="") as file:
+            return read_definitions(file, format=format)
+    if format == "json":
+        return json.load(definitions)
+    elif format == "csv":
+        return [_csv_row_to_definition(row) for row in csv.DictReader(definitions)]
+    raise ValueError("Provide a list of definitions, a .json/.csv file or a format")
+
+
+def _csv_row_to_definition(row):
+    definition = {k: v for k, v in row.items() if v not in (None, "")}
+    if "instance" in definition:
+        definition["instance"] = int(definition["instance"])
+    if "is_commandable" in definition:
+        definition["is_commandable"] = definition["is_commandable"].lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+    if "properties" in definition:
+        definition["properties"] = json.loads(definition["properties"])
+    return definition
+
+
 def make_state_text(list_of_string: list[str]):
     _arr = ArrayOf(CharacterString)
     _lst = [CharacterString(each) for each in list_of_string]
@@ -521,3 +589,20 @@ def trendlog(**kwargs):
         },
     }
     return _create(definition, **kwargs)
+
+
+_object_factories = {
+    "analog-input": analog_input,
+    "analog-output": analog_output,
+    "analog-value": analog_value,
+    "binary-input": binary_input,
+    "binary-output": binary_output,
+    "binary-value": binary_value,
+    "multi-state-input": multistate_input,
+    "multi-state-output": multistate_output,
+    "multi-state-value": multistate_value,
+    "characterstring-value": character_string,
+    "date-value": date_value,
+    "datetime-value": datetime_value,
+    "trend-log": trendlog,
+}
@@ -1,6 +1,6 @@
-from collections import namedtuple
+from collections import deque, namedtuple
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 from bacpypes3.basetypes import (
     Date,
@@ -30,17 +30,38 @@ class LocalTrendLog(object):
     Local trendLogs require a databse between values read on the field
     and values used to create thje local trendLogs object.
 
-    I will use the existing SQL code I have to store the local values
+    Records are kept in a bounded deque (bufferSize) and a set of timestamps
+    is used to reject duplicates. The logBuffer of the BACnet object is
+    maintained incrementally : new records are appended, old ones are evicted.
+    A complete rebuild only occurs when the buffer is out of sync (bufferSize
+    modified, object disabled, etc.)
 
     """
 
-    def __init__(self, obj: Any, datatype: str):
+    def __init__(self, obj: Any, datatype: str, bufferSize: int = 250):
         self.obj = obj
-        self.data: List[Record] = []
-        self.bufferSize: int = 250
+        self._bufferSize: int = bufferSize
+        self.data: Deque[Record] = deque(maxlen=bufferSize)
+        self._timestamps: Set[datetime] = set()
+        self._pending: Deque[Record] = deque(maxlen=bufferSize)
+        self._synced: bool = False
+        self._published_interval: Optional[int] = None
+        self._published_status_flags: Optional[StatusFlags] = None
         self.statusFlags = StatusFlags([0, 0, 0, 0])
         self.datatype = datatype
 
+    @property
+    def bufferSize(self) -> int:
+        return self._bufferSize
+
+    @bufferSize.setter
+    def bufferSize(self, size: int) -> None:
+        self._bufferSize = size
+        self.data = deque(self.data, maxlen=size)
+        self._timestamps = {each.timestamp for each in self.data}
+        self._pending = deque(maxlen=size)
+        self._synced = False
+
     @staticmethod
     def to_float(val: Union[int, float, str]) -> Optional[float]:
         try:
@@ -86,19 +107,16 @@ class LocalTrendLog(object):
             statusFlags=record.statusFlags,
         )
 
-    def add_data(
+    def _append(
         self,
         timestamp: datetime,
         value: Union[int, float, str],
-        flags: StatusFlags = StatusFlags([0, 0, 0, 0]),
-        interval: Optional[int] = None,
-        update_after: bool = True,
+        flags: StatusFlags,
+        interval: Optional[int],
     ) -> None:
-        """
-        each object will contain a dict of values that will be
-        turned into log_record.
-        """
-        if not self.data or self.data[-1] == (2**32) - 1:
+        if timestamp in self._timestamps:
+            return
+        if not self.data or self.data[-1].sequencenumber == (2**32) - 1:
             sequencenumber = 1
         else:
             sequencenumber = self.data[-1].sequencenumber + 1
@@ -111,46 +129,110 @@ class LocalTrendLog(object):
             trendFlag=None,
             logEvent=None,
         )
-        if _rec.timestamp not in [each.timestamp for each in self.data]:
-            self.data.append(_rec)
+        if len(self.data) == self.data.maxlen:
+            # deque will drop the oldest record
+            self._timestamps.discard(self.data[0].timestamp)
+        self.data.append(_rec)
+        self._timestamps.add(timestamp)
+        self._pending.append(_rec)
 
-        # limit to 250 values
-        self.data = self.data[-self.bufferSize :]
+    def add_data(
+        self,
+        timestamp: datetime,
+        value: Union[int, float, str],
+        flags: StatusFlags = StatusFlags([0, 0, 0, 0]),
+        interval: Optional[int] = None,
+        update_after: bool = True,
+    ) -> None:
+        """
+        each object will contain a dict of values that will be
+        turned into log_record.
+        """
+        self._append(timestamp, value, flags, interval)
         if update_after:
             self.update_properties()
 
-    def update_properties(self) -> None:
+    def add_many(
+        self,
+        records: Iterable[Tuple[datetime, Union[int, float, str]]],
+        flags: StatusFlags = StatusFlags([0, 0, 0, 0]),
+        interval: Optional[int] = None,
+    ) -> None:
         """
-        Meant to update trendLog properties like logBuffer,
-        startTime, stopTime, recordCount, totalRecordCount, statusFlags, etc...
+        Add a batch of (timestamp, value) records, then update the trendLog
+        properties only once.
         """
-        # startTime = self.data[0].timestamp
-        # stopTime = self.data[-1].timestamp
-        if not getattr(self.obj, "enable"):
-            if getattr(self.obj, "recordCount") == 0:
-                self.data = []  # empty it
-            else:
-                return  # disable....
+        for timestamp, value in records:
+            self._append(timestamp, value, flags, interval)
+        self.update_properties()
+
+    def clear(self) -> None:
+        self.data.clear()
+        self._timestamps.clear()
+        self._pending.clear()
+        self._synced = False
 
-        count = len(self.data)
+    def _rebuild_log_buffer(self) -> None:
         SequenceOfLogRecord = ListOf(LogRecord)()
         for each in self.data:
-            logRecord = self.to_bacpypes_logrecord(each)
-            SequenceOfLogRecord.append(logRecord)
+            SequenceOfLogRecord.append(self.to_bacpypes_logrecord(each))
         _props = {
-            # "startTime": startTime,
-            # "stopTime": stopTime,
             "logBuffer": SequenceOfLogRecord,
-            "recordCount": Unsigned(count),
             "bufferSize": Unsigned(self.bufferSize),
             "enable": True,
             "stopWhenFull": False,
-            "statusFlags": self.statusFlags,
-            "totalRecordCount": Unsigned(self.data[-1].sequencenumber),
-            "logInterval": Unsigned(self.data[-1].interval),
             "loggingType": LoggingType(0),
             "eventState": EventState(0),
             "reliability": Reliability(0),
         }
         for k, v in _props.items():
             setattr(self.obj, k, v)
+        self._pending.clear()
+        self._synced = True
+
+    def _sync_log_buffer(self) -> None:
+        """
+        Push pending records to logBuffer and evict the ones that are no
+        longer part of the buffer.
+        """
+        logBuffer = getattr(self.obj, "logBuffer")
+        if (
+            not self._synced
+            or logBuffer is None
+            or len(self._pending) >= len(self.data)
+        ):
+            self._rebuild_log_buffer()
+            return
+        for each in self._pending:
+            logBuffer.append(self.to_bacpypes_logrecord(each))
+        self._pending.clear()
+        _extra = len(logBuffer) - len(self.data)
+        if _extra > 0:
+            del logBuffer[:_extra]
+
+    def update_properties(self) -> None:
+        """
+        Meant to update trendLog properties like logBuffer,
+        startTime, stopTime, recordCount, totalRecordCount, statusFlags, etc...
+        """
+        if not getattr(self.obj, "enable"):
+            if getattr(self.obj, "recordCount") == 0:
+                self.clear()  # empty it
+            else:
+                self._synced = False  # will need a rebuild when enabled
+            return  # disable....
+
+        if not self.data:
+            return
+
+        self._sync_log_buffer()
+        setattr(self.obj, "recordCount", Unsigned(len(self.data)))
+        setattr(
+            self.obj, "totalRecordCount", Unsigned(self.data[-1].sequencenumber)
+        )
+        if self.data[-1].interval != self._published_interval:
+            setattr(self.obj, "logInterval", Unsigned(self.data[-1].interval))
+            self._published_interval = self.data[-1].interval
+        if self.statusFlags is not self._published_status_flags:
+            setattr(self.obj, "statusFlags", self.statusFlags)
+            self._published_status_flags = self.statusFlags
@@ -673,12 +673,21 @@ class ReadProperty(ReadUtilsMixin, DiscoveryUtilsMixin, RPObjectsProcessing):
         """
         if isinstance(points_list, list):
             (requests, points) = self._rpm_request_by_name(points_list)
+            answered = False
             for i, req in enumerate(requests):
-                val = await self.read_single(
-                    req, points_per_request=1, discover_request=discover_request
-                )
+                try:
+                    val = await self._read_single(req)
+                except NoResponseFromController:
+                    continue
+                answered = True
                 if val is not None and val != "":
                     points[i]._trend(val)
+            if requests and not answered:
+                # a dead device must fail the poll (and count in device.breaker)
+                raise NoResponseFromController(
+                    f"{self.properties.name} ({self.properties.address}) | "
+                    f"no answer to {len(requests)} ReadProperty requests"
+                )
         else:
             await self.read_single(
                 points_list, points_per_request=1, discover_request=discover_request
@@ -687,6 +696,12 @@ class ReadProperty(ReadUtilsMixin, DiscoveryUtilsMixin, RPObjectsProcessing):
     async def read_single(
         self, request, *, points_per_request=1, discover_request=(None, 4)
     ):
+        try:
+            return await self._read_single(request)
+        except NoResponseFromController:
+            return ""
+
+    async def _read_single(self, request):
         try:
             request = f"{self.properties.address} {''.join(request)}"
             self.log(f"RP_Request: {request} ", level="debug")
@@ -696,9 +711,6 @@ class ReadProperty(ReadUtilsMixin, DiscoveryUtilsMixin, RPObjectsProcessing):
         except KeyError as error:
             raise Exception(f"Unknown point name: {error}")
 
-        except NoResponseFromController:
-            return ""
-
     def poll(self, command="start", *, delay=120):
         """
         Poll a point every x seconds (delay=x sec)
@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 by Christian Tremblay, P.Eng <christian.tremblay@servisys.com>
+# Licensed under LGPLv3, see file LICENSE in this source tree.
+#
+"""
+ChangeFeed.py - push every point update to the consumers that asked for it
+
+Points publish an event each time a sample is recorded (poll, read or COV)
+and when COV reports new status flags. Each consumer gets its own bounded
+queue : a slow consumer loses the oldest events (counted in `dropped`)
+instead of slowing down polling or the other consumers.
+
+ex.
+    async with bacnet.changes(types=["analog"]) as feed:
+        async for batch in feed:
+            for event in batch:
+                print(event.point.properties.name, event.value)
+"""
+import asyncio
+import typing as t
+from collections import deque, namedtuple
+from datetime import datetime
+
+from ..utils.notes import note_and_log
+
+ChangeEvent = namedtuple("ChangeEvent", ["point", "timestamp", "value", "flags"])
+
+
+class ChangeSubscription:
+    """
+    Events for one consumer. Iterate (async for) to receive lists of
+    ChangeEvent, at most batch_size at a time.
+
+    :param devices: only points of these devices (device or device id)
+    :param types: only points whose type contains one of these (ex. "analog")
+    :param tags: only points having one of these tags, given as tag id or
+        (tag id, value)
+    :param maxsize: events kept while waiting for the consumer
+    """
+
+    def __init__(
+        self,
+        feed: "ChangeFeed",
+        devices: t.Optional[t.Iterable[t.Any]] = None,
+        types: t.Optional[t.Iterable[str]] = None,
+        tags: t.Optional[t.Iterable[t.Any]] = None,
+        maxsize: int = 10000,
+        batch_size: int = 500,
+    ) -> None:
+        self._feed = feed
+        self.devices = (
+            None
+            if devices is None
+            else {
+                each.properties.device_id if hasattr(each, "properties") else each
+                for each in devices
+            }
+        )
+        self.types = None if types is None else tuple(types)
+        self.tags = None if tags is None else list(tags)
+        self.batch_size = batch_size
+        self._queue: t.Deque[ChangeEvent] = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def matches(self, point) -> bool:
+        if (
+            self.devices is not None
+            and point.properties.device.properties.device_id not in self.devices
+        ):
+            return False
+        if self.types is not None and not any(
+            each in point.properties.type for each in self.types
+        ):
+            return False
+        if self.tags is not None:
+            point_tags = point.tags or []
+            tag_ids = {tag[0] for tag in point_tags}
+            if not any(
+                (tag in point_tags) if isinstance(tag, tuple) else (tag in tag_ids)
+                for tag in self.tags
+            ):
+                return False
+        return True
+
+    def put(self, event: ChangeEvent) -> None:
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(event)
+        self.received += 1
+        self._ready.set()
+
+    def get_nowait(self) -> t.List[ChangeEvent]:
+        """
+        Events waiting in the queue (up to batch_size), without waiting
+        """
+        batch = []
+        while self._queue and len(batch) < self.batch_size:
+            batch.append(self._queue.popleft())
+        if not self._queue:
+            self._ready.clear()
+        return batch
+
+    async def get(self) -> t.List[ChangeEvent]:
+        """
+        Wait for events and return them (up to batch_size)
+        """
+        while not self._queue:
+            if self.closed:
+                raise StopAsyncIteration
+            await self._ready.wait()
+        return self.get_nowait()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> t.List[ChangeEvent]:
+        return await self.get()
+
+    def close(self) -> None:
+        self.closed = True
+        self._feed.unsubscribe(self)
+        # wake up a consumer waiting in get()
+        self._ready.set()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def stats(self) -> t.Dict[str, int]:
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "pending": len(self._queue),
+        }
+
+    def __repr__(self):
+        return f"ChangeSubscription {self.stats}"
+
+
+@note_and_log
+class ChangeFeed:
+    """
+    Registry of the subscriptions of a network (bacnet.change_feed)
+    """
+
+    def __init__(self) -> None:
+        self.subscribers: t.List[ChangeSubscription] = []
+
+    def subscribe(self, **kwargs) -> ChangeSubscription:
+        subscription = ChangeSubscription(self, **kwargs)
+        self.subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ChangeSubscription) -> None:
+        try:
+            self.subscribers.remove(subscription)
+        except ValueError:
+            pass
+
+    def publish(self, point, timestamp: datetime, value, flags=None) -> None:
+        if not self.subscribers:
+            return
+        event = None
+        for subscription in self.subscribers:
+            if subscription.matches(point):
+                if event is None:
+                    event = ChangeEvent(point, timestamp, value, flags)
+                subscription.put(event)
@@ -0,0 +1,192 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 by Christian Tremblay, P.Eng <christian.tremblay@servisys.com>
+# Licensed under LGPLv3, see file LICENSE in this source tree.
+#
+"""
+CircuitBreaker.py - stop sending requests to a device that doesn't answer
+
+Each device has a breaker (device.breaker) shared by polling, writes, COV
+subscriptions and trend log harvests.
+
+    closed    : requests are sent. After `threshold` communication failures
+                in a row, the breaker opens.
+    open      : requests fail at once with CircuitOpen, no timeout is spent.
+                After reset_timeout, one request is let through.
+    half-open : that request is a probe. Success closes the breaker, failure
+                opens it again for twice as long (up to max_reset_timeout).
+
+Polling uses a cheap read of objectName as the probe, so a dead device
+costs one request per backoff window instead of a full poll cycle. Pings of
+the health check (bacnet.ping_registered_devices) are recorded too : the
+device is disconnected when its breaker opens.
+"""
+import asyncio
+import time
+import typing as t
+import weakref
+from collections import deque
+from datetime import datetime
+
+from bacpypes3.errors import NoResponse
+
+from ..io.IOExceptions import CircuitOpen, NoResponseFromController, Timeout
+from ..utils.backoff import backoff
+from ..utils.notes import note_and_log
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+COMMUNICATION_ERRORS = (
+    NoResponseFromController,
+    NoResponse,
+    Timeout,
+    asyncio.TimeoutError,
+)
+
+
+def is_communication_error(error: BaseException) -> bool:
+    """
+    True when the device didn't answer. Errors returned by the device
+    (unknown object, access denied...) prove it is alive.
+    """
+    if isinstance(error, COMMUNICATION_ERRORS):
+        return True
+    return "no-response" in str(getattr(error, "reason", ""))
+
+
+@note_and_log
+class CircuitBreaker(object):
+    """
+    :param device: the device protected by the breaker
+    :param threshold: failures in a row that open the breaker
+    :param reset_timeout: seconds before the first probe
+    :param max_reset_timeout: longest wait between probes
+    """
+
+    def __init__(
+        self,
+        device=None,
+        threshold: int = 3,
+        reset_timeout: float = 30,
+        max_reset_timeout: float = 600,
+    ) -> None:
+        self._device = None if device is None else weakref.ref(device)
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        # consecutive openings, for the backoff
+        self._openings = 0
+        self._retry_at = 0.0
+        self.metrics: t.Dict[str, int] = {
+            "calls": 0,
+            "failures": 0,
+            "rejected": 0,
+            "opened": 0,
+            "closed": 0,
+            "probes": 0,
+        }
+        # (datetime, old state, new state)
+        self.transitions: t.Deque[t.Tuple[datetime, str, str]] = deque(maxlen=50)
+
+    @property
+    def name(self) -> str:
+        device = None if self._device is None else self._device()
+        if device is None:
+            return "breaker"
+        return f"{device.properties.name} ({device.properties.address})"
+
+    def _set_state(self, state: str) -> None:
+        if state == self.state:
+            return
+        self.transitions.append((datetime.now().astimezone(), self.state, state))
+        level = "warning" if state == OPEN else "info"
+        self.log(f"{self.name} | circuit {self.state} -> {state}", level=level)
+        self.state = state
+        if state == OPEN:
+            self.metrics["opened"] += 1
+        elif state == CLOSED:
+            self.metrics["closed"] += 1
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Open and still waiting for the next probe
+        """
+        return self.state == OPEN and time.monotonic() < self._retry_at
+
+    def allow(self) -> bool:
+        """
+        Can a request be sent now ? When the wait is over, the first caller
+        gets the probe (state becomes half-open) and must report the result
+        with success() or failure().
+        """
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if now >= self._retry_at:
+            # first probe, or the previous probe never reported
+            self._set_state(HALF_OPEN)
+            self._retry_at = now + self.max_reset_timeout
+            self.metrics["probes"] += 1
+            return True
+        self.metrics["rejected"] += 1
+        return False
+
+    def success(self) -> None:
+        self.failures = 0
+        self._openings = 0
+        self._set_state(CLOSED)
+
+    def failure(self) -> None:
+        self.failures += 1
+        self.metrics["failures"] += 1
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self._openings += 1
+        self._retry_at = time.monotonic() + backoff(
+            self._openings, self.reset_timeout, self.max_reset_timeout
+        )
+        self._set_state(OPEN)
+
+    def reset(self) -> None:
+        """
+        Close the breaker (ex. the device was reconnected)
+        """
+        self.success()
+
+    async def call(self, fn: t.Callable[..., t.Awaitable], *args, **kwargs):
+        """
+        await fn(*args, **kwargs) through the breaker.
+        Raises CircuitOpen, without calling fn, when the breaker is open.
+        """
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} not answering, request not sent")
+        self.metrics["calls"] += 1
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as error:
+            if is_communication_error(error):
+                self.failure()
+            else:
+                self.success()
+            raise
+        self.success()
+        return result
+
+    @property
+    def stats(self) -> t.Dict[str, t.Any]:
+        stats: t.Dict[str, t.Any] = {"state": self.state, "failures": self.failures}
+        if self.state == OPEN:
+            stats["next_probe"] = max(0.0, self._retry_at - time.monotonic())
+        stats.update(self.metrics)
+        return stats
+
+    def __repr__(self) -> str:
+        return f"CircuitBreaker {self.name} {self.stats}"
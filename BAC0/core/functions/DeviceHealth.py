@@ -0,0 +1,213 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 by Christian Tremblay, P.Eng <christian.tremblay@servisys.com>
+# Licensed under LGPLv3, see file LICENSE in this source tree.
+#
+"""
+DeviceHealth.py - health of the registered devices, checked by the ping task
+
+Each sweep of bacnet.ping_registered_devices checks the devices that are due,
+concurrently : at most `concurrency` checks at a time, and `per_network` at a
+time for devices behind a router (same remote BACnet network) so a slow
+MS/TP trunk is not flooded.
+
+An online device is checked at every sweep. Its pings count in device.breaker,
+which decides when it is disconnected. Once disconnected (offline), it
+is probed less and less often : after 1, 2, 4, 8... sweep delays, up to
+max_backoff. Each delay is drawn between half and the full value (jitter)
+so devices lost together (ex. a router restarting) don't all come back in
+the same sweep.
+"""
+import asyncio
+import time
+import typing as t
+
+from bacpypes3.pdu import Address
+
+from ..utils.backoff import backoff
+from ..utils.notes import note_and_log
+
+ONLINE = "online"
+SUSPECT = "suspect"  # connected, but the last ping failed
+OFFLINE = "offline"
+
+
+class DeviceHealth(object):
+    """
+    Health of one device. Times are from time.monotonic().
+    """
+
+    __slots__ = (
+        "state",
+        "failures",
+        "probes",
+        "last_seen",
+        "last_check",
+        "next_check",
+    )
+
+    def __init__(self) -> None:
+        self.state: str = ONLINE
+        # consecutive failed checks
+        self.failures: int = 0
+        # failed checks since the device went offline, for the backoff
+        self.probes: int = 0
+        self.last_seen: t.Optional[float] = None
+        self.last_check: t.Optional[float] = None
+        self.next_check: float = 0.0
+
+    def due(self, now: float) -> bool:
+        return now >= self.next_check
+
+    @property
+    def stats(self) -> t.Dict[str, t.Any]:
+        now = time.monotonic()
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "last_seen": None if self.last_seen is None else now - self.last_seen,
+            "next_check": max(0.0, self.next_check - now),
+        }
+
+    def __repr__(self) -> str:
+        return f"DeviceHealth {self.stats}"
+
+
+@note_and_log
+class HealthMonitor(object):
+    """
+    Health of the registered devices of a network (bacnet.health_monitor)
+
+    :param delay: delay between sweeps (ping_delay), first backoff delay
+    :param concurrency: checks running at the same time
+    :param per_network: checks running at the same time on one remote network
+    :param max_backoff: longest delay between probes of an offline device
+    """
+
+    def __init__(
+        self,
+        delay: float = 300,
+        concurrency: int = 20,
+        per_network: int = 5,
+        max_backoff: float = 3600,
+    ) -> None:
+        self.delay = delay
+        self.max_backoff = max_backoff
+        self.per_network = per_network
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._networks: t.Dict[int, asyncio.Semaphore] = {}
+        # keyed by id(device), like bacnet.registered_devices
+        self._health: t.Dict[int, DeviceHealth] = {}
+
+    def health(self, device) -> DeviceHealth:
+        try:
+            return self._health[id(device)]
+        except KeyError:
+            health = self._health[id(device)] = DeviceHealth()
+            return health
+
+    def forget(self, device) -> None:
+        self._health.pop(id(device), None)
+
+    def due(self, devices: t.Iterable[t.Any]) -> t.List[t.Any]:
+        """
+        Devices to check now. Health of devices no longer in `devices` is
+        dropped.
+        """
+        devices = list(devices)
+        known = {id(device) for device in devices}
+        for oid in [oid for oid in self._health if oid not in known]:
+            del self._health[oid]
+        now = time.monotonic()
+        return [device for device in devices if self.health(device).due(now)]
+
+    def backoff(self, failures: int) -> float:
+        return backoff(failures, self.delay, self.max_backoff)
+
+    def _network(self, device) -> t.Optional[asyncio.Semaphore]:
+        try:
+            network = Address(str(device.properties.address)).addrNet
+        except (ValueError, TypeError):
+            network = None
+        if network is None:
+            # local network, only the global limit applies
+            return None
+        if network not in self._networks:
+            self._networks[network] = asyncio.Semaphore(self.per_network)
+        return self._networks[network]
+
+    def record(self, device, state: str) -> DeviceHealth:
+        """
+        Update the health of a device with the result of a check
+        """
+        health = self.health(device)
+        now = time.monotonic()
+        health.last_check = now
+        if state == ONLINE:
+            health.failures = 0
+            health.probes = 0
+            health.last_seen = now
+            health.next_check = now
+        elif state == SUSPECT:
+            # still connected, check again at next sweep
+            health.failures += 1
+            health.next_check = now
+        else:
+            health.failures += 1
+            # backoff counted from the transition to offline
+            health.probes = health.probes + 1 if health.state == OFFLINE else 1
+            health.next_check = now + self.backoff(health.probes)
+        if state != health.state:
+            self.log(
+                f"{device.properties.name}|{device.properties.address} "
+                f"{health.state} -> {state}",
+                level="info",
+            )
+        health.state = state
+        return health
+
+    async def check(
+        self, device, probe: t.Callable[[t.Any], t.Awaitable[str]]
+    ) -> DeviceHealth:
+        """
+        Run probe(device) within the limits and record the state it returns
+        """
+        network = self._network(device)
+        if network is None:
+            async with self._semaphore:
+                state = await self._probe(device, probe)
+        else:
+            # network slot first : checks queued for a busy trunk must not
+            # hold global slots needed by devices of other networks
+            async with network, self._semaphore:
+                state = await self._probe(device, probe)
+        return self.record(device, state)
+
+    async def _probe(self, device, probe) -> str:
+        try:
+            return await probe(device)
+        except Exception as error:
+            self.log(
+                f"Health check of {device.properties.name} failed ({error})",
+                level="warning",
+            )
+            return OFFLINE if self.health(device).state == OFFLINE else SUSPECT
+
+    async def sweep(
+        self,
+        devices: t.Iterable[t.Any],
+        probe: t.Callable[[t.Any], t.Awaitable[str]],
+    ) -> None:
+        """
+        Check the devices that are due, concurrently
+        """
+        due = self.due(devices)
+        if due:
+            await asyncio.gather(*(self.check(device, probe) for device in due))
+
+    def report(self, devices: t.Iterable[t.Any]) -> t.Dict[str, t.Dict[str, t.Any]]:
+        return {
+            str(device.properties.name): self.health(device).stats
+            for device in devices
+        }
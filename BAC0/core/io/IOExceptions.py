@@ -173,6 +173,15 @@ class NumerousPingFailures(Exception):
     pass
 
 
+class CircuitOpen(Exception):
+    """
+    The device stopped answering : requests are not sent until its circuit
+    breaker lets a probe through (see device.breaker)
+    """
+
+    pass
+
+
 class NotReadyError(Exception):
     pass
 
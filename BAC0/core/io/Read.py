@@ -20,7 +20,6 @@ Read.py - creation of ReadProperty and ReadPropertyMultiple requests
 
 """
 
-import asyncio
 import re
 
 # --- standard Python modules ---
@@ -94,13 +93,16 @@ class ReadProperty:
         arr_index: t.Optional[int] = None,
         vendor_id: int = 0,
         bacoid=None,
-        timeout: int = 10,
+        timeout: t.Optional[float] = None,
         show_property_name: bool = False,
     ) -> t.Union[ReadValue, t.Tuple[ReadValue, str], None]:
         """
         Build a ReadProperty request, wait for the answer and return the value
 
         :param args: String with <addr> <type> <inst> <prop> [ <indx> ]
+        :param timeout: seconds before giving up. By default, the wait and the
+            number of attempts come from the answer times of the device
+            (see bacnet.round_trip_times)
         :returns: data read from device (str representing data like 10 or True)
 
         *Example*::
@@ -136,30 +138,30 @@ class ReadProperty:
             device_address
         )
         if dic is None:
-            _iam = await self.this_application.app.who_is(address=device_address)
-            failures = 0
-            while _iam == []:
-                # retry
-                failures += 1
-                await asyncio.sleep(1)
-                _iam = await self.this_application.app.who_is(address=device_address)
-                if failures > 5:
-                    self.log(
-                        f"Trouble with Iam... Response received from {device_address} = {_iam}",
-                        level="error",
-                    )
-                    raise NoResponseFromController
+            _iam = await self._who_is_device(device_address)
             await self.this_application.app.device_info_cache.set_device_info(_iam[0])
             dic = await self.this_application.app.device_info_cache.get_device_info(
                 device_address
             )
             self.log(f"Device Info Cache : {dic}", level="debug")
         try:
-            response = await _app.read_property(
+            # identical reads in flight share the answer
+            response = await self.in_flight.do(
+                (
+                    "rp",
+                    str(device_address),
+                    str(object_identifier),
+                    str(property_identifier),
+                    property_array_index,
+                ),
+                self.round_trip_times.request,
+                device_address,
+                _app.read_property,
                 device_address,
                 object_identifier,
                 property_identifier,
                 property_array_index,
+                budget=timeout,
             )
 
         except ErrorRejectAbortNack as err:
@@ -205,6 +207,33 @@ class ReadProperty:
         if not isinstance(response, ErrorRejectAbortNack):
             return response
 
+    async def _who_is_device(self, address: Address) -> t.List[t.Any]:
+        """
+        Who-Is sent to one device until it answers. Each attempt waits the
+        rto of the device, doubled after every attempt without answer.
+        Concurrent lookups of the same address share the same Who-Is.
+        """
+        return await self.in_flight.do(
+            ("who-is", str(address)), self._who_is_attempts, address
+        )
+
+    async def _who_is_attempts(self, address: Address) -> t.List[t.Any]:
+        rtt = self.round_trip_times[address]
+        attempts = self.round_trip_times.attempts(address)
+        for _ in range(attempts):
+            _iam = await self.this_application.app.who_is(
+                address=address, timeout=rtt.rto
+            )
+            if _iam:
+                return _iam
+            rtt.timeout()
+        self.log(
+            f"Trouble with Iam... No response from {address} "
+            f"after {attempts} attempts",
+            level="error",
+        )
+        raise NoResponseFromController
+
     def _split_the_read_request(self, args, arr_index):
         """
         When a device doesn't support segmentation, this function
@@ -225,7 +254,7 @@ class ReadProperty:
         args: str,
         request_dict=None,
         vendor_id: int = 0,
-        timeout: int = 10,
+        timeout: t.Optional[float] = None,
         show_property_name: bool = False,
         from_regex=False,
     ) -> t.Union[t.Dict, t.List[t.Tuple[t.Any, str]]]:
@@ -270,7 +299,7 @@ class ReadProperty:
         # Force DeviceInfoCache
         dic = await self.this_application.app.device_info_cache.get_device_info(address)
         if dic is None:
-            _iam = await self.this_application.app.who_is(address=address)
+            _iam = await self._who_is_device(address)
             await self.this_application.app.device_info_cache.set_device_info(_iam[0])
             dic = await self.this_application.app.device_info_cache.get_device_info(
                 address
@@ -284,7 +313,16 @@ class ReadProperty:
 
         try:
             # build an ReadPropertyMultiple request
-            response = await _app.read_property_multiple(address, parameter_list)
+            # identical requests in flight share the answer
+            response = await self.in_flight.do(
+                ("rpm", str(address), str(parameter_list)),
+                self.round_trip_times.request,
+                address,
+                _app.read_property_multiple,
+                address,
+                parameter_list,
+                budget=timeout,
+            )
             self.log(f"Response : {response}", level="debug")
 
         except ErrorRejectAbortNack as err:
@@ -301,16 +339,6 @@ class ReadProperty:
             if "unknown-property" in str(err.reason):
                 values.append("")  # type: ignore[arg-type]
                 return values
-            if "no-response" in str(err.reason):
-                # values.append("")  # type: ignore[arg-type]
-                # return values
-                # try again
-                try:
-                    response = await _app.read_property_multiple(
-                        address, parameter_list
-                    )
-                except ErrorRejectAbortNack as err:
-                    raise err
 
         if not isinstance(response, ErrorRejectAbortNack):
             """
@@ -0,0 +1,204 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 by Christian Tremblay, P.Eng <christian.tremblay@servisys.com>
+# Licensed under LGPLv3, see file LICENSE in this source tree.
+#
+"""
+RoundTrip.py - request timeouts and retries learned from each device
+
+Answer times go from a few ms (BACnet/IP) to seconds (MS/TP behind a
+router). For each address, the smoothed round trip time (srtt) and its
+variation (rttvar) are updated after every answer, like TCP does
+(RFC 6298) ::
+
+    rttvar = 3/4 rttvar + 1/4 |srtt - rtt|
+    srtt   = 7/8 srtt + 1/8 rtt
+    rto    = srtt + 4 rttvar      (between min_rto and max_rto)
+
+A request waits rto, and is sent again with twice the wait when there is no
+answer. The number of attempts is what fits in `budget` seconds : a fast
+device fails in a few seconds, a slow trunk gets the time it needs. One
+attempt never waits more than the budget.
+"""
+import asyncio
+import time
+import typing as t
+
+from bacpypes3.pdu import Address
+
+from ..functions.CircuitBreaker import is_communication_error
+from ..utils.notes import note_and_log
+from .IOExceptions import NoResponseFromController
+
+ALPHA = 1 / 8
+BETA = 1 / 4
+K = 4
+
+
+class RoundTripTime(object):
+    """
+    Round trip estimation for one address. Times are in seconds.
+    """
+
+    __slots__ = (
+        "srtt",
+        "rttvar",
+        "rto",
+        "min_rto",
+        "max_rto",
+        "samples",
+        "timeouts",
+        "last",
+    )
+
+    def __init__(
+        self, initial_rto: float = 3.0, min_rto: float = 0.5, max_rto: float = 30.0
+    ) -> None:
+        self.srtt: t.Optional[float] = None
+        self.rttvar: t.Optional[float] = None
+        self.rto = initial_rto
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.samples = 0
+        self.timeouts = 0
+        self.last: t.Optional[float] = None
+
+    def update(self, rtt: float) -> None:
+        if self.srtt is None or self.rttvar is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - BETA) * self.rttvar + BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - ALPHA) * self.srtt + ALPHA * rtt
+        self.rto = min(self.max_rto, max(self.min_rto, self.srtt + K * self.rttvar))
+        self.samples += 1
+        self.last = rtt
+
+    def timeout(self) -> None:
+        # no answer : wait longer until the next sample
+        self.timeouts += 1
+        self.rto = min(self.max_rto, self.rto * 2)
+
+    def attempts(self, budget: float, max_attempts: int) -> int:
+        """
+        Number of tries, each waiting twice as long as the previous one,
+        that fit in budget (at least one)
+        """
+        attempts, total, wait = 0, 0.0, self.rto
+        while attempts < max_attempts and (attempts == 0 or total + wait <= budget):
+            attempts += 1
+            total += wait
+            wait = min(self.max_rto, wait * 2)
+        return attempts
+
+    @property
+    def stats(self) -> t.Dict[str, t.Any]:
+        def ms(value):
+            return None if value is None else round(value * 1000, 1)
+
+        return {
+            "srtt_ms": ms(self.srtt),
+            "rttvar_ms": ms(self.rttvar),
+            "rto_ms": ms(self.rto),
+            "last_ms": ms(self.last),
+            "samples": self.samples,
+            "timeouts": self.timeouts,
+        }
+
+    def __repr__(self) -> str:
+        return f"RoundTripTime {self.stats}"
+
+
+@note_and_log
+class RoundTripTimes(object):
+    """
+    Round trip times of the devices of a network (bacnet.round_trip_times)
+
+    :param initial_rto: wait for the first request to an address
+    :param min_rto: shortest wait, even for very fast devices
+    :param max_rto: longest wait for one attempt
+    :param budget: seconds a request should take at most before failing
+    :param max_attempts: limit of tries of one request
+    """
+
+    def __init__(
+        self,
+        initial_rto: float = 3.0,
+        min_rto: float = 0.5,
+        max_rto: float = 30.0,
+        budget: float = 10.0,
+        max_attempts: int = 3,
+    ) -> None:
+        self.initial_rto = initial_rto
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.budget = budget
+        self.max_attempts = max_attempts
+        self._addresses: t.Dict[str, RoundTripTime] = {}
+
+    def __getitem__(self, address) -> RoundTripTime:
+        if isinstance(address, str):
+            try:
+                # same key for "192.168.1.10" and "192.168.1.10:47808"
+                address = Address(address)
+            except ValueError:
+                pass
+        key = str(address)
+        try:
+            return self._addresses[key]
+        except KeyError:
+            rtt = self._addresses[key] = RoundTripTime(
+                self.initial_rto, self.min_rto, self.max_rto
+            )
+            return rtt
+
+    def attempts(self, address, budget: t.Optional[float] = None) -> int:
+        return self[address].attempts(budget or self.budget, self.max_attempts)
+
+    async def request(
+        self,
+        address,
+        fn: t.Callable[..., t.Awaitable],
+        *args,
+        budget: t.Optional[float] = None,
+    ):
+        """
+        await fn(*args), waiting rto for the answer and trying again (with
+        twice the wait) when the device doesn't answer. The round trip time
+        of the answer updates the estimation.
+
+        :param budget: replaces the default budget for this request
+        Raises NoResponseFromController when every attempt timed out.
+        """
+        rtt = self[address]
+        budget = budget or self.budget
+        attempts = self.attempts(address, budget)
+        for attempt in range(attempts):
+            start = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    fn(*args), timeout=min(rtt.rto, budget)
+                )
+            except Exception as error:
+                if not is_communication_error(error):
+                    raise
+                rtt.timeout()
+                self.log(
+                    f"{address} | no answer after {attempt + 1}/{attempts} attempts",
+                    level="debug",
+                )
+                continue
+            rtt.update(time.monotonic() - start)
+            return response
+        raise NoResponseFromController(
+            f"No answer from {address} after {attempts} attempts"
+        )
+
+    def stats(self, address=None) -> t.Dict[str, t.Any]:
+        """
+        Round trip statistics of an address, or of every address
+        """
+        if address is not None:
+            return self[address].stats
+        return {address: rtt.stats for address, rtt in self._addresses.items()}
@@ -0,0 +1,63 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 by Christian Tremblay, P.Eng <christian.tremblay@servisys.com>
+# Licensed under LGPLv3, see file LICENSE in this source tree.
+#
+"""
+SingleFlight.py - one network transaction for identical concurrent requests
+
+Polling, point.value, match tasks and scripts often read the same property
+at the same moment. While a request is waiting for its answer, an identical
+request (same key) doesn't go on the network : it waits for the same
+answer (or the same exception).
+
+The request runs in its own task so a caller that is cancelled doesn't
+cancel the answer the others are waiting for.
+"""
+import asyncio
+import typing as t
+
+
+class SingleFlight(object):
+    """
+    Requests in flight of a network (bacnet.in_flight)
+    """
+
+    def __init__(self) -> None:
+        self._calls: t.Dict[t.Hashable, asyncio.Future] = {}
+        self.sent = 0
+        self.shared = 0
+
+    async def do(
+        self, key: t.Hashable, fn: t.Callable[..., t.Awaitable], *args, **kwargs
+    ):
+        """
+        await fn(*args, **kwargs), or the identical request already in flight
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+            self.sent += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: t.Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # retrieved, even if every caller was cancelled
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    @property
+    def stats(self) -> t.Dict[str, int]:
+        return {"sent": self.sent, "shared": self.shared, "pending": len(self)}
+
+    def __repr__(self) -> str:
+        return f"SingleFlight {self.stats}"
@@ -0,0 +1,23 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 by Christian Tremblay, P.Eng <christian.tremblay@servisys.com>
+# Licensed under LGPLv3, see file LICENSE in this source tree.
+#
+"""
+backoff.py - exponential backoff with jitter
+
+Used by device.breaker (wait before the next probe) and by the health
+monitor (wait before the next check of an offline device).
+"""
+import random
+
+
+def backoff(attempt: int, delay: float, maximum: float) -> float:
+    """
+    Wait before retry number `attempt` (1, 2, 3...) : delay, 2 x delay,
+    4 x delay... up to maximum. The wait is drawn between half and the full
+    value so devices lost together are not retried together.
+    """
+    delay = min(maximum, delay * 2 ** max(0, attempt - 1))
+    return random.uniform(delay / 2, delay)
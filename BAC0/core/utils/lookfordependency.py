@@ -1,16 +1,69 @@
+import importlib
 import importlib.util
+import sys
 from types import ModuleType
-from typing import Type
+from typing import Any, Optional, Type
 
 
 # Function to dynamically import a module
 def import_module(module_name, package=None):
-    spec = importlib.util.find_spec(module_name, package)
-    if spec is None:
+    """
+    Import a module through the normal import system. A module already
+    imported is taken from sys.modules and never executed twice.
+    """
+    try:
+        return importlib.import_module(module_name, package)
+    except ModuleNotFoundError:
         return None
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
+
+
+class LazyModule(ModuleType):
+    """
+    Stand-in for an optional module that is imported on first attribute
+    access. Used for heavy dependencies (pandas) that are only required
+    when histories are turned into DataFrames.
+    """
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self._module: Optional[ModuleType] = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+class LazyAttribute(object):
+    """
+    Callable stand-in for an attribute of a LazyModule (ex. pd.Timestamp)
+    """
+
+    def __init__(self, module: LazyModule, attr: str) -> None:
+        self._lazy_module = module
+        self._attr = attr
+
+    def _load(self) -> Any:
+        return getattr(self._lazy_module, self._attr)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+
+def lazy_import(module_name: str) -> ModuleType:
+    """
+    Return the module if already imported, else a LazyModule.
+    """
+    return sys.modules.get(module_name) or LazyModule(module_name)
 
 
 def check_dependencies(module_name: list) -> bool:
@@ -26,12 +79,8 @@ def rich_if_available():
         _RICH = False
         return (_RICH, FakeRich)
     try:
-        rich_spec = importlib.util.find_spec("rich")
-        if rich_spec is not None:
-            rich = import_module("rich")
-            _RICH = True
-        else:
-            _RICH = False
+        rich = importlib.import_module("rich")
+        _RICH = True
     except ImportError:
         _RICH = False
         rich = False
@@ -42,37 +91,26 @@ def influxdb_if_available():
     if not check_dependencies(["influxdb_client"]):
         _INFLUXDB = False
         return (_INFLUXDB, FakeInflux)
-    try:
-        influxdb_spec = importlib.util.find_spec("influxdb_client")
-        if influxdb_spec is not None:
-            influxdb_client = import_module("influxdb_client")
-            _INFLUXDB = True
-        else:
-            _INFLUXDB = False
-    except ImportError:
-        _INFLUXDB = False
-        influxdb_client = False
+    # loaded when a database connection is actually configured
+    influxdb_client = lazy_import("influxdb_client")
+    _INFLUXDB = True
     return (_INFLUXDB, influxdb_client)
 
 
 def pandas_if_available() -> tuple[bool, Type, ModuleType, ModuleType]:
+    """
+    pandas is heavy to import and only needed when DataFrames are built.
+    The modules returned are loaded on first use.
+    """
     global _PANDAS
     if not check_dependencies(["pandas"]):
         _PANDAS = False
         return (_PANDAS, FakePandas, FakePandas.sql, FakePandas.Timestamp)
 
-    try:
-        pd = import_module("pandas")
-        sql = import_module("pandas.io.sql")
-
-        Timestamp = pd.Timestamp
-        _PANDAS = True
-
-    except ImportError:
-        _PANDAS = False
-        pd = FakePandas
-        sql = FakePandas.sql
-        Timestamp = FakePandas.Timestamp
+    pd = lazy_import("pandas")
+    sql = lazy_import("pandas.io.sql")
+    Timestamp = LazyAttribute(pd, "Timestamp")
+    _PANDAS = True
     return (_PANDAS, pd, sql, Timestamp)
 
 
@@ -6,7 +6,6 @@ logging feature at the same time.
 Goal is to be able to access quickly to important informations for
 the web interface.
 """
-import inspect
 import logging
 import os
 import sys
@@ -260,9 +259,10 @@ def note_and_log(cls):
         if level == logging.INFO:
             note = f"{note}"
         else:
-            caller_frame = inspect.stack()[1]
-            module = inspect.getmodule(caller_frame[0])
-            module_name = module.__name__ if module else "unknown"
+            # inspect.stack() would read the source of every frame, only the
+            # caller's module is needed here
+            caller_frame = sys._getframe(1)
+            module_name = caller_frame.f_globals.get("__name__", "unknown")
             note = f"{cls.logname} | {module_name} | {note}"
         cls._log.log(level, note)
 
@@ -0,0 +1,56 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 by Christian Tremblay, P.Eng <christian.tremblay@servisys.com>
+# Licensed under LGPLv3, see file LICENSE in this source tree.
+#
+"""
+offload.py - run CPU heavy work (pandas) outside of the event loop
+
+Histories are handed to the worker as snapshots (copies of the lists taken
+on the event loop) so the worker never touches objects that are modified
+by polling or COV callbacks.
+"""
+import asyncio
+import typing as t
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+
+_executor: t.Optional[Executor] = None
+
+MAX_WORKERS = 2
+
+
+def get_executor() -> Executor:
+    """
+    Return the executor used by BAC0 for heavy work. It is created on first
+    use.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=MAX_WORKERS, thread_name_prefix="BAC0_worker"
+        )
+    return _executor
+
+
+def set_executor(executor: t.Optional[Executor]) -> None:
+    """
+    Replace the executor (ex. a ProcessPoolExecutor, in which case the
+    functions and arguments sent to offload must be picklable).
+    The previous executor is shut down without waiting for pending work.
+    """
+    global _executor
+    if _executor is not None and _executor is not executor:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = executor
+
+
+def offload(func: t.Callable, *args: t.Any, **kwargs: t.Any) -> asyncio.Future:
+    """
+    Schedule func(*args, **kwargs) in the executor and return an awaitable
+    future. Cancelling the future before the work starts removes it from the
+    queue ; once started, the result is simply discarded.
+    """
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(get_executor(), partial(func, *args, **kwargs))
@@ -0,0 +1,234 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 by Christian Tremblay, P.Eng <christian.tremblay@servisys.com>
+# Licensed under LGPLv3, see file LICENSE in this source tree.
+#
+"""
+export.py - write point histories and trend logs to Parquet or CSV
+
+Samples are written in long format, one row per sample ::
+
+    device_id, device, point, timestamp, value, text
+
+Devices are exported one at a time : the histories of a device are copied
+on the event loop, then written by a worker in chunks of chunk_size rows
+(a record batch / row group for Parquet). Memory stays bounded by one
+device and one chunk, whatever the number of devices. In Parquet files,
+device and point names are dictionary encoded.
+
+ex.
+    await dev.export("dev5.parquet", start=timedelta(days=1))
+    await bacnet.export("site.parquet")
+    await bacnet.export("site.csv", format="csv")
+"""
+import csv
+import typing as t
+from datetime import datetime, timedelta
+
+from ..core.utils.lookfordependency import import_module
+from ..core.utils.offload import offload
+from .sql import sample_columns
+
+COLUMNS = ("device_id", "device", "point", "timestamp", "value", "text")
+FORMATS = ("parquet", "csv")
+
+# name, type, timestamps, values, states (see SQLMixin._histories_snapshot)
+Snapshot = t.List[t.Tuple[str, t.Optional[str], list, list, t.Any]]
+
+
+def _sample(_type: t.Optional[str], value, states):
+    if _type is None:
+        # trend log records, numbers (and booleans) or text
+        if isinstance(value, (int, float)):
+            return float(value), None
+        return None, None if value is None else str(value)
+    return sample_columns(_type, value, states)
+
+
+def trend_snapshot(trend, start=None, end=None):
+    """
+    Copy of the records of a trend log already read from the device
+    (trend.history reads the log buffer), as a snapshot entry
+    """
+    if isinstance(start, timedelta):
+        start = datetime.now().astimezone() - start
+    timestamps, values = [], []
+    for record in list(trend.properties._history_components):
+        # log buffer timestamps are local time
+        timestamp = record.index.to_pydatetime().astimezone()
+        if (start is None or timestamp >= start) and (end is None or timestamp <= end):
+            timestamps.append(timestamp)
+            values.append(record.logdatum)
+    return (str(trend.properties.object_name), None, timestamps, values, None)
+
+
+class HistoryExport:
+    """
+    A file receiving the histories of one or many devices
+
+    :param path: file to create
+    :param format: "parquet" (requires pyarrow) or "csv"
+    :param chunk_size: rows kept in memory before being written
+
+    ex.
+        async with HistoryExport("site.parquet") as export:
+            for dev in devices:
+                await export.add_device(dev, start=timedelta(days=1))
+    """
+
+    def __init__(
+        self, path: str, format: str = "parquet", chunk_size: int = 65536
+    ) -> None:
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format} : {list(FORMATS)}")
+        if format == "parquet":
+            self._pa = import_module("pyarrow")
+            if self._pa is None:
+                raise ImportError("Install pyarrow to use this feature")
+            self._pq = import_module("pyarrow.parquet")
+        self.path = path
+        self.format = format
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self._file: t.Any = None
+        self._writer: t.Any = None
+        self._clear()
+
+    def _clear(self) -> None:
+        self._chunk: t.Dict[str, list] = {column: [] for column in COLUMNS}
+        # dictionaries of the chunk, name : index
+        self._devices: t.Dict[str, int] = {}
+        self._points: t.Dict[str, int] = {}
+
+    def _schema(self):
+        pa = self._pa
+        names = pa.dictionary(pa.int32(), pa.string())
+        return pa.schema(
+            [
+                ("device_id", pa.int64()),
+                ("device", names),
+                ("point", names),
+                ("timestamp", pa.timestamp("us", tz="UTC")),
+                ("value", pa.float64()),
+                ("text", pa.string()),
+            ]
+        )
+
+    def _open(self) -> None:
+        if self.format == "parquet":
+            self._writer = self._pq.ParquetWriter(self.path, self._schema())
+        else:
+            self._file = open(self.path, "w", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(COLUMNS)
+
+    def _add(self, device_id, device: str, snapshot: Snapshot) -> None:
+        devices, points = self._devices, self._points
+        for name, _type, timestamps, values, states in snapshot:
+            for timestamp, _value in zip(timestamps, values):
+                value, text = _sample(_type, _value, states)
+                if value is None and text is None:
+                    continue
+                if len(self._chunk["timestamp"]) >= self.chunk_size:
+                    self._flush()
+                    devices, points = self._devices, self._points
+                chunk = self._chunk
+                chunk["device_id"].append(device_id)
+                chunk["device"].append(devices.setdefault(device, len(devices)))
+                chunk["point"].append(points.setdefault(name, len(points)))
+                chunk["timestamp"].append(timestamp)
+                chunk["value"].append(value)
+                chunk["text"].append(text)
+
+    def _flush(self) -> None:
+        chunk = self._chunk
+        if not chunk["timestamp"]:
+            return
+        if self.format == "parquet":
+            self._writer.write_batch(self._batch(chunk))
+        else:
+            devices = list(self._devices)
+            points = list(self._points)
+            self._writer.writerows(
+                (
+                    device_id,
+                    devices[device],
+                    points[point],
+                    timestamp.isoformat(),
+                    value,
+                    text,
+                )
+                for device_id, device, point, timestamp, value, text in zip(
+                    *chunk.values()
+                )
+            )
+        self.rows += len(chunk["timestamp"])
+        self._clear()
+
+    def _batch(self, chunk: t.Dict[str, list]):
+        pa = self._pa
+        schema = self._schema()
+
+        def _names(indices, dictionary):
+            return pa.DictionaryArray.from_arrays(
+                pa.array(indices, pa.int32()), pa.array(list(dictionary), pa.string())
+            )
+
+        return pa.record_batch(
+            [
+                pa.array(chunk["device_id"], pa.int64()),
+                _names(chunk["device"], self._devices),
+                _names(chunk["point"], self._points),
+                pa.array(chunk["timestamp"], schema.field("timestamp").type),
+                pa.array(chunk["value"], pa.float64()),
+                pa.array(chunk["text"], pa.string()),
+            ],
+            schema=schema,
+        )
+
+    def _close(self) -> None:
+        try:
+            self._flush()
+        finally:
+            if self.format == "parquet":
+                self._writer.close()
+            else:
+                self._file.close()
+
+    async def add_device(
+        self,
+        device,
+        start: t.Optional[t.Union[datetime, timedelta]] = None,
+        end: t.Optional[datetime] = None,
+    ) -> None:
+        """
+        Write the point histories and trend logs of a device
+        """
+        if self._writer is None:
+            await offload(self._open)
+        snapshot = device._histories_snapshot(start, end)
+        snapshot.extend(
+            trend_snapshot(trend, start, end)
+            for _, trend in device._list_of_trendlogs.values()
+        )
+        await offload(
+            self._add,
+            device.properties.device_id,
+            str(device.properties.name),
+            snapshot,
+        )
+
+    async def close(self) -> None:
+        if self._writer is None:
+            await offload(self._open)
+        await offload(self._close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __repr__(self) -> str:
+        return f"HistoryExport {self.path} ({self.format}, {self.rows} rows)"
@@ -0,0 +1,317 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 by Christian Tremblay, P.Eng <christian.tremblay@servisys.com>
+# Licensed under LGPLv3, see file LICENSE in this source tree.
+#
+"""
+history_files.py - on-disk point histories
+
+Each device gets a folder holding, for every point, two append-only column
+files of fixed width records :
+
+    <n>.ts  : int64, microseconds since epoch (UTC)
+    <n>.val : float64, value (state code for binary and multistate points)
+
+and index.json, describing the device and mapping point names to files.
+
+Samples are kept in memory per point and appended to the files at each
+poll cycle (flush), so histories survive a restart and are not limited by
+memory. Column files are opened, appended and closed by flush : no file
+stays open, whatever the number of points. Point.history keeps reading
+memory ; the files are read on demand (point.history_range(...,
+from_disk=True)) : the range is found by binary search on the mapped
+timestamps and only that part is copied, then the files are unmapped.
+
+Values are written before timestamps. A crash between both writes (or in
+the middle of one) leaves columns of different lengths : records past the
+length of the shorter column are ignored by the reader, and cut from the
+files before the next samples are appended so both columns stay aligned.
+"""
+import json
+import mmap
+import os
+import struct
+import typing as t
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+
+from ..core.utils.lookfordependency import lazy_import, pandas_if_available
+from ..core.utils.notes import note_and_log
+
+_PANDAS, pd, _, _ = pandas_if_available()
+if _PANDAS:
+    np = lazy_import("numpy")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+_TS = struct.Struct("<q")
+_VAL = struct.Struct("<d")
+_RECORD = 8
+
+# buffered bytes of one column that trigger a write without waiting for flush
+MAX_PENDING = 64 * 1024
+
+# Only numbers can be stored in fixed width columns
+STORED_TYPES = ("analog", "binary", "multi")
+
+
+@note_and_log
+class HistoryFiles:
+    """
+    Histories of the points of one device, stored in `path`.
+
+    ex. dev = await BAC0.device('2:5', 5, bacnet, history_path='histories')
+        dev['ZN-T'].history  # read from histories/Device_5
+    """
+
+    INDEX = "index.json"
+
+    def __init__(self, path: str, read_only: bool = False) -> None:
+        self.path = path
+        self.read_only = read_only
+        self.index: t.Dict[str, t.Any] = {"device": {}, "points": {}}
+        # samples not written yet, by point name : (timestamps, values)
+        self._pending: t.Dict[str, t.Tuple[bytearray, bytearray]] = {}
+        # points whose columns were checked (aligned) since opening
+        self._aligned: t.Set[str] = set()
+        if os.path.isfile(self._file(self.INDEX)):
+            with open(self._file(self.INDEX)) as file:
+                self.index = json.load(file)
+        elif read_only:
+            raise FileNotFoundError(f"No history found in {path}")
+        else:
+            os.makedirs(path, exist_ok=True)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def __contains__(self, point_name: str) -> bool:
+        return point_name in self.index["points"]
+
+    @property
+    def points(self) -> t.List[str]:
+        return list(self.index["points"])
+
+    @property
+    def device_properties(self) -> t.Dict[str, t.Any]:
+        return self.index["device"]
+
+    def point_properties(self, point_name: str) -> t.Dict[str, t.Any]:
+        return self.index["points"][point_name]
+
+    def _save_index(self) -> None:
+        # written aside then renamed so a crash never leaves a partial index
+        tmp = self._file(f"{self.INDEX}.tmp")
+        with open(tmp, "w") as file:
+            json.dump(self.index, file, default=str)
+        os.replace(tmp, self._file(self.INDEX))
+
+    def register(self, point) -> t.Optional[str]:
+        """
+        Add a point to the index. Returns the file name used for its columns
+        or None if the point value can't be stored (strings, dates).
+        """
+        name = str(point.properties.name)
+        if name not in self.index["points"] and self._add(point):
+            self._save_index()
+        return self._point_file(name)
+
+    def register_points(self, points: t.Iterable[t.Any]) -> None:
+        """
+        Add the points of a device to the index, written once
+        """
+        added = False
+        for point in points:
+            if str(point.properties.name) not in self.index["points"]:
+                added = self._add(point) or added
+        if added:
+            self._save_index()
+
+    def _point_file(self, name: str) -> t.Optional[str]:
+        try:
+            return self.index["points"][name]["file"]
+        except KeyError:
+            return None
+
+    def _add(self, point) -> bool:
+        if not any(each in point.properties.type for each in STORED_TYPES):
+            return False
+        device = point.properties.device.properties
+        self.index["device"] = {
+            "name": device.name,
+            "address": str(device.address),
+            "device_id": device.device_id,
+            "vendor_id": device.vendor_id,
+            "pollDelay": device.pollDelay,
+            "multistates": device.multistates,
+            "history_size": device.history_size,
+        }
+        name = str(point.properties.name)
+        units_state = point.properties.units_state
+        self.index["points"][name] = {
+            "file": str(len(self.index["points"])),
+            "name": name,
+            "type": point.properties.type,
+            "address": point.properties.address,
+            "description": point.properties.description,
+            "units_state": (
+                list(units_state)
+                if isinstance(units_state, (list, tuple))
+                else units_state
+            ),
+        }
+        return True
+
+    def append(self, point, timestamp: datetime, value) -> None:
+        """
+        Add a sample to the columns of the point. Written to disk by
+        flush() (at the end of each poll cycle) or close().
+        """
+        if self.read_only:
+            return
+        name = str(point.properties.name)
+        try:
+            ts, val = self._pending[name]
+        except KeyError:
+            if self.register(point) is None:
+                return
+            ts, val = self._pending[name] = (bytearray(), bytearray())
+        try:
+            _value = float("nan") if value is None else float(value)
+        except (TypeError, ValueError):
+            return
+        ts += _TS.pack((timestamp - _EPOCH) // _ONE_US)
+        val += _VAL.pack(_value)
+        if len(ts) >= MAX_PENDING:
+            # no poll cycle (ex. COV only), don't grow without limit
+            self._write(name)
+
+    def _align(self, _file: str) -> None:
+        """
+        Cut both columns to the records they have in common (see the module
+        documentation)
+        """
+        names = [self._file(f"{_file}.ts"), self._file(f"{_file}.val")]
+        sizes = [os.path.getsize(each) if os.path.exists(each) else 0 for each in names]
+        common = min(sizes) // _RECORD * _RECORD
+        for each, size in zip(names, sizes):
+            if size > common:
+                self.log(f"{each} : {size - common} bytes cut", level="warning")
+                os.truncate(each, common)
+
+    def _write(self, name: str) -> None:
+        ts, val = self._pending[name]
+        if not ts:
+            return
+        _file = self.index["points"][name]["file"]
+        try:
+            if name not in self._aligned:
+                self._align(_file)
+                self._aligned.add(name)
+            # values first, see the module documentation
+            for column, data in (("val", val), ("ts", ts)):
+                with open(self._file(f"{_file}.{column}"), "ab") as file:
+                    file.write(data)
+        except OSError as error:
+            # columns are aligned again before the next write
+            self._aligned.discard(name)
+            self.log(f"Can't write history of {name} : {error}", level="error")
+        del ts[:], val[:]
+
+    def flush(self) -> None:
+        """
+        Write the samples kept in memory to disk
+        """
+        for name in self._pending:
+            self._write(name)
+
+    def close(self) -> None:
+        """
+        Write the samples kept in memory and forget them
+        """
+        self.flush()
+        self._pending.clear()
+
+    def _map(self, filename: str) -> t.Optional[mmap.mmap]:
+        try:
+            with open(self._file(filename), "rb") as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return None
+                return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+    def columns(
+        self,
+        point_name: str,
+        start: t.Optional[datetime] = None,
+        end: t.Optional[datetime] = None,
+    ):
+        """
+        (timestamps, values) of a point between start and end (both
+        included). The bounds are found by binary search on the mapped
+        timestamps and only the range is copied ; the files are unmapped
+        before returning. With numpy, timestamps are datetime64[us] (UTC) and
+        values float64 arrays, otherwise lists.
+        """
+        _file = self.index["points"][point_name]["file"]
+        if point_name in self._pending:
+            self._write(point_name)
+        ts, val = self._map(f"{_file}.ts"), self._map(f"{_file}.val")
+        try:
+            if ts is None or val is None:
+                if not _PANDAS:
+                    return [], []
+                return (
+                    np.empty(0, dtype="datetime64[us]"),
+                    np.empty(0, dtype="float64"),
+                )
+            # after a crash, records past the shorter column are ignored
+            count = min(len(ts), len(val)) // _RECORD
+            lo_us = None if start is None else (start - _EPOCH) // _ONE_US
+            hi_us = None if end is None else (end - _EPOCH) // _ONE_US
+            if _PANDAS:
+                return self._range_array(ts, val, count, lo_us, hi_us)
+            return self._range_list(ts, val, count, lo_us, hi_us)
+        finally:
+            for each in (ts, val):
+                if each is not None:
+                    each.close()
+
+    @staticmethod
+    def _range_array(ts, val, count, lo_us, hi_us):
+        stamps = np.frombuffer(ts, dtype="<i8", count=count)
+        values = np.frombuffer(val, dtype="<f8", count=count)
+        lo = 0 if lo_us is None else int(np.searchsorted(stamps, lo_us, "left"))
+        hi = count if hi_us is None else int(np.searchsorted(stamps, hi_us, "right"))
+        # copies : no view is left on the maps, they can be closed
+        return stamps[lo:hi].astype("datetime64[us]"), values[lo:hi].copy()
+
+    @staticmethod
+    def _range_list(ts, val, count, lo_us, hi_us):
+        stamps = [us for (us,) in _TS.iter_unpack(ts[: count * 8])]
+        lo = 0 if lo_us is None else bisect_left(stamps, lo_us)
+        hi = count if hi_us is None else bisect_right(stamps, hi_us)
+        values = val[lo * 8 : hi * 8]  # noqa E203
+        return (
+            [_EPOCH + timedelta(microseconds=us) for us in stamps[lo:hi]],
+            [value for (value,) in _VAL.iter_unpack(values)],
+        )
+
+    def snapshot(
+        self,
+        point_name: str,
+        start: t.Optional[datetime] = None,
+        end: t.Optional[datetime] = None,
+    ):
+        """
+        Same as Point._history_snapshot : (index, values) ready to build the
+        history Series of the point, timestamps in local time.
+        """
+        timestamps, values = self.columns(point_name, start, end)
+        if not _PANDAS:
+            return [ts.astimezone() for ts in timestamps], values
+        local = datetime.now().astimezone().tzinfo
+        index = pd.DatetimeIndex(timestamps).tz_localize("UTC").tz_convert(local)
+        return index, values
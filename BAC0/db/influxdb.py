@@ -1,18 +1,26 @@
-from datetime import datetime
-
-import pytz
+import typing as t
+from datetime import datetime, timedelta
 
+from ..core.devices.Points import BINARY_STATES
 from ..core.utils.lookfordependency import influxdb_if_available
 from ..core.utils.notes import note_and_log
+from .line_protocol import encode
 
 _INFLUX, _ = influxdb_if_available()
 if _INFLUX:
-    from influxdb_client import Point, WriteOptions
+    from influxdb_client import WriteOptions
     from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
 else:
     raise ImportError("Install influxdb to use this feature")
 
 
+def _flux(text) -> str:
+    """
+    Escape a string used in a Flux query
+    """
+    return str(text).replace("\\", "\\\\").replace('"', '\\"')
+
+
 @note_and_log
 class InfluxDB:
     """
@@ -186,8 +194,8 @@ class InfluxDB:
         Cleans and formats the value based on the object type.
 
         This method checks the object type and formats the value accordingly. If the object type contains "analog",
-        the value is formatted to a string with three decimal places and the units state. If the object type contains "multi",
-        the value is split on ":" and the second part is used.
+        the value is formatted to a string with three decimal places and the units state. If the object type contains "multi"
+        or "binary", the value is the state code and the string is the matching state text.
 
         Parameters:
         object_type (str): The type of the object.
@@ -205,60 +213,28 @@ class InfluxDB:
                 _string_value = f"{val:.3f} {units_state}"
                 _value = val
             elif "multi" in object_type:
-                _string_value = f"{val.split(':')[1]}"
-                _value = int(val.split(":")[0])
-            elif "binary" in object_type:
+                _value = int(val)
                 try:
-                    _string_value = f"{units_state[int(val.split(':'[0]))]}"
-                except Exception:
-                    try:
-                        _value, _string_value = val.split(":")
-                        _value = int(_value)
-                    except Exception as error:
-                        self._log.error(
-                            f"Error while cleaning value {val} of object type {object_type}: {error}"
-                        )
+                    _string_value = f"{units_state[_value - 1]}"
+                except (TypeError, IndexError):
+                    _string_value = "n/a"
+            elif "binary" in object_type:
+                _value = int(val)
+                _string_value = BINARY_STATES[_value]
             else:
                 _string_value = f"{val}"
                 _value = val
             return (_value, _string_value)
-        except AttributeError as error:
+        except (AttributeError, TypeError, ValueError, IndexError) as error:
             self._log.error(
                 f"Error while cleaning value {val} of object type {object_type}: {error}"
             )
 
     def prepare_point(self, list_of_points):
-        _points = []
-
         for point in list_of_points:
-            _object_name = point.properties.name
-            _devicename = point.properties.device.properties.name
-            _device_id = point.properties.device.properties.device_id
-            _units_state = f"{point.properties.units_state}"
-            _description = point.properties.description
-            _object = f"{point.properties.type}:{point.properties.address}"
-            _value, _string_value = self.clean_value(
-                point.properties.type, point.lastValue, point.properties.units_state
-            )
-            _name = f"{_devicename}/{_object_name}"
-            _id = f"Device_{_device_id}/{_object}"
-            _point = (
-                Point(_id)
-                .tag("object_name", _object_name)
-                .tag("name", _name)
-                .tag("description", _description)
-                .tag("units_state", _units_state)
-                .tag("object", _object)
-                .tag("device", _devicename)
-                .tag("device_id", _device_id)
-                .field("value", _value)
-                .field("string_value", _string_value)
-                .time(point.lastTimestamp.astimezone(pytz.UTC))
-            )
-            for each in point.tags:
-                _tag_id, _tag_value = each
-                _point.tag(_tag_id, _tag_value)
-            self.points.append(_point)
+            line = encode(point, point.lastValue, point.lastTimestamp)
+            if line is not None:
+                self.points.append(line)
 
     async def write_points_lastvalue_to_db(self, list_of_points):
         """
@@ -276,20 +252,81 @@ class InfluxDB:
         if success:
             self.points = []
 
-    def read_last_value_from_db(self, id=None):
-        # example id : Device_5004/analogInput:1
-        # maybe use device name and object name ?
-        # This must be easy
+    async def read_last_value_from_db(self, id: str):
+        """
+        Last (timestamp, value) recorded for a record ID, None if not found
 
-        f"""
-        from(bucket: {self.bucket}")
-        |> range(start: -100y)
-        |> filter(fn: (r) => r["description"] == "DA-T")
-        |> filter(fn: (r) => r["_field"] == "value")
+        ex. await bacnet.database.read_last_value_from_db("Device_5004/analogInput:1")
+        """
+        query = f"""
+        from(bucket: "{_flux(self.bucket)}")
+        |> range(start: 0)
+        |> filter(fn: (r) => r["_measurement"] == "{_flux(id)}" and r["_field"] == "value")
         |> last()
-        |> yield(name: "last")
         """
-        pass
+        result = None
+        async for record in self.query(query):
+            result = (record.get_time().astimezone(), record.get_value())
+        return result
+
+    async def read_history(
+        self, device, period: t.Union[int, float, timedelta] = 24
+    ) -> t.Dict[str, t.Tuple[t.List[datetime], t.List[t.Any]]]:
+        """
+        Samples of the last `period` (hours or timedelta) of every point of a
+        device, using one query. Returns {object: (timestamps, values)} where
+        object is "analogInput:1" ; values are state codes for binary and
+        multistate points, like the point histories.
+        """
+        if not isinstance(period, timedelta):
+            period = timedelta(hours=period)
+        device_id = device.properties.device_id
+        query = f"""
+        from(bucket: "{_flux(self.bucket)}")
+        |> range(start: -{int(period.total_seconds())}s)
+        |> filter(fn: (r) => r["device_id"] == "{device_id}" and r["_field"] == "value")
+        |> group(columns: ["object"])
+        |> sort(columns: ["_time"])
+        |> keep(columns: ["_time", "_value", "object"])
+        """
+        series: t.Dict[str, t.Tuple[t.List[datetime], t.List[t.Any]]] = {}
+        async for record in self.query(query):
+            timestamps, values = series.setdefault(record.values["object"], ([], []))
+            timestamps.append(record.get_time().astimezone())
+            values.append(record.get_value())
+        return series
+
+    async def warm_start(
+        self, device, period: t.Union[int, float, timedelta] = 24
+    ) -> int:
+        """
+        Fill the histories of the points of a device with what was written
+        to InfluxDB during the last `period` (hours or timedelta), so
+        analytics don't start from an empty history after a restart.
+        Returns the number of samples loaded.
+        """
+        try:
+            series = await self.read_history(device, period)
+        except Exception as error:
+            self.log(
+                f"Can't read history of {device.properties.name} from InfluxDB : {error}",
+                level="error",
+            )
+            return 0
+        points = {
+            f"{point.properties.type}:{point.properties.address}": point
+            for point in device.points
+        }
+        loaded = 0
+        for _object, (timestamps, values) in series.items():
+            point = points.get(_object)
+            if point is not None:
+                loaded += point.load_history(timestamps, values)
+        self.log(
+            f"{loaded} samples of {device.properties.name} loaded from InfluxDB",
+            level="info",
+        )
+        return loaded
 
     #    def example(self, device_name, object_name):
     #        p = {"_bucket": self.bucket,
@@ -0,0 +1,160 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 by Christian Tremblay, P.Eng <christian.tremblay@servisys.com>
+# Licensed under LGPLv3, see file LICENSE in this source tree.
+#
+"""
+line_protocol.py - InfluxDB line protocol encoding of BAC0 samples
+
+The measurement and tag set of a point (and, for binary and multistate
+points, the fields of every state) are serialised once and kept on the
+point. They are built again only when the tags, the description or the
+units of the point are replaced. Encoding a sample then only formats the
+value and the timestamp ::
+
+    Device_5/analogInput:1,description=Zone\\ temp,...,units_state=degreesCelsius value=21.5,string_value="21.500 degreesCelsius" 1718000000000000000
+"""
+import math
+import typing as t
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from ..core.devices.Points import BINARY_STATES
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+
+_MEASUREMENT = str.maketrans({",": r"\,", " ": r"\ ", "\n": r"\ "})
+_TAG = str.maketrans({",": r"\,", "=": r"\=", " ": r"\ ", "\n": r"\ "})
+_STRING = str.maketrans({'"': r"\"", "\\": "\\\\"})
+
+# tags, description and units_state the key was built from, measurement and
+# tag set, state fields (binary, multistate) or units (analog)
+SeriesKey = namedtuple(
+    "SeriesKey", ["tags", "description", "units_state", "prefix", "fields"]
+)
+
+
+def _string(value) -> str:
+    return f'"{str(value).translate(_STRING)}"'
+
+
+def _field(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return f"{value}i"
+    if isinstance(value, float):
+        return repr(value)
+    return _string(value)
+
+
+def _build(point) -> SeriesKey:
+    properties = point.properties
+    device = properties.device.properties
+    _object = f"{properties.type}:{properties.address}"
+    tags = {
+        "object_name": properties.name,
+        "name": f"{device.name}/{properties.name}",
+        "description": properties.description,
+        "units_state": f"{properties.units_state}",
+        "object": _object,
+        "device": device.name,
+        "device_id": device.device_id,
+    }
+    for tag_id, tag_value in point.tags:
+        tags[tag_id] = tag_value
+    measurement = f"Device_{device.device_id}/{_object}".translate(_MEASUREMENT)
+    prefix = ",".join(
+        [measurement]
+        + [
+            f"{str(key).translate(_TAG)}={str(value).translate(_TAG)}"
+            for key, value in sorted(tags.items())
+            if value is not None and str(value) != ""
+        ]
+    )
+    if "binary" in properties.type:
+        fields: t.Any = tuple(
+            f"value={code}i,string_value={_string(state)}"
+            for code, state in enumerate(BINARY_STATES)
+        )
+    elif "multi" in properties.type:
+        # state codes start at 1
+        fields = ("",) + tuple(
+            f"value={code}i,string_value={_string(state)}"
+            for code, state in enumerate(properties.units_state or (), start=1)
+        )
+    elif "analog" in properties.type:
+        fields = f"{properties.units_state}".translate(_STRING)
+    else:
+        fields = None
+    return SeriesKey(
+        point.tags, properties.description, properties.units_state, prefix, fields
+    )
+
+
+def series_key(point) -> SeriesKey:
+    """
+    Serialised measurement and tags of the point, built on first use
+    """
+    key = point._series_key
+    if (
+        key is None
+        or key.tags is not point.tags
+        or key.description is not point.properties.description
+        or key.units_state is not point.properties.units_state
+    ):
+        key = point._series_key = _build(point)
+    return key
+
+
+def encode(point, value, timestamp: datetime) -> t.Optional[str]:
+    """
+    One line for a sample. None when the value can't be written (None, NaN)
+    """
+    if value is None:
+        return None
+    key = series_key(point)
+    fields = key.fields
+    try:
+        if isinstance(fields, tuple):
+            code = int(value)
+            if 0 <= code < len(fields) and fields[code]:
+                _fields = fields[code]
+            else:
+                _fields = f'value={code}i,string_value="n/a"'
+        elif fields is not None:
+            value = float(value)
+            if not math.isfinite(value):
+                return None
+            _fields = f'value={value!r},string_value="{value:.3f} {fields}"'
+        else:
+            _fields = f"value={_field(value)},string_value={_string(value)}"
+    except (TypeError, ValueError):
+        return None
+    ns = (timestamp - _EPOCH) // _ONE_US * 1000
+    return f"{key.prefix} {_fields} {ns}"
+
+
+class LineBuffer:
+    """
+    Lines waiting to be written, sent as one string
+    """
+
+    def __init__(self) -> None:
+        self._lines: t.List[str] = []
+
+    def append(self, point, value, timestamp: datetime) -> None:
+        line = encode(point, value, timestamp)
+        if line is not None:
+            self._lines.append(line)
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def getvalue(self) -> str:
+        return "\n".join(self._lines)
+
+    def clear(self) -> None:
+        self._lines.clear()
@@ -0,0 +1,328 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 by Christian Tremblay, P.Eng <christian.tremblay@servisys.com>
+# Licensed under LGPLv3, see file LICENSE in this source tree.
+#
+"""
+live_values.py - last value of every point in shared memory
+
+Other processes on the same host (dashboards, analytics) read the values
+directly from memory with LiveValueReader, without asking BAC0.
+
+Layout of the shared memory block ::
+
+    header  : magic (4s), version (I), capacity (I), count (I), pid (I)
+    records : capacity x [device_id (I), object_type (H), instance (I),
+              status_flags (B), seq (Q), timestamp (d), value (d)]
+
+A record belongs to one (device_id, object_type, instance) for the life of
+the table. BAC0 is the only writer. seq is odd while a record is written
+and even once done, so a reader retries when it catches a write in
+progress. seq // 2 is the number of updates of the record.
+
+pid is the writer process. A block with the same name is only replaced when
+that process is gone (crash) : two BAC0 processes on one host need
+different names.
+"""
+import os
+import struct
+import typing as t
+from collections import namedtuple
+from datetime import datetime
+from multiprocessing import shared_memory
+
+from bacpypes3.primitivedata import ObjectType
+
+from ..core.utils.notes import note_and_log
+
+MAGIC = b"BAC0"
+VERSION = 2
+DEFAULT_NAME = "BAC0_live_values"
+
+_HEADER = struct.Struct("<4sIIII4x")
+_COUNT = struct.Struct("<I")
+_COUNT_OFFSET = 12
+_RECORD = struct.Struct("<IHxxIBxxxQdd")
+_KEY = struct.Struct("<IHxxI")
+_SEQ = struct.Struct("<Q")
+_DATA = struct.Struct("<Qdd")
+_FLAGS = struct.Struct("<B")
+_FLAGS_OFFSET = _KEY.size
+_SEQ_OFFSET = _KEY.size + 4
+_RETRIES = 100
+
+LiveValue = namedtuple("LiveValue", ["value", "timestamp", "status_flags", "seq"])
+
+
+def _object_type(object_type: t.Union[str, int]) -> int:
+    return int(ObjectType(object_type))
+
+
+def _alive(pid: int) -> bool:
+    if not pid or os.name == "nt":
+        # unknown writer, or Windows where blocks go away with their process
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _flags(status_flags) -> int:
+    """
+    statusFlags (inAlarm, fault, overridden, outOfService) as bits 0 to 3
+    """
+    if not status_flags:
+        return 0
+    bits = 0
+    for i, flag in enumerate(list(status_flags)[:4]):
+        if flag:
+            bits |= 1 << i
+    return bits
+
+
+@note_and_log
+class LiveValueTable:
+    """
+    Writer side, owned by the BAC0 network.
+
+    ex. bacnet.enable_live_values(name="site_live", capacity=100000)
+    """
+
+    def __init__(self, name: t.Optional[str] = None, capacity: int = 65536) -> None:
+        self.capacity = capacity
+        name = name or DEFAULT_NAME
+        size = _HEADER.size + capacity * _RECORD.size
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            self._remove_stale(name)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.shm.name
+        _HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, capacity, 0, os.getpid())
+        self._slots: t.Dict[t.Tuple[t.Any, ...], int] = {}
+        self._full = False
+
+    def _remove_stale(self, name: str) -> None:
+        """
+        Remove a block left behind by a BAC0 process that crashed. Raises
+        FileExistsError if the block is used by a running process, or is not
+        a live value table.
+        """
+        stale = shared_memory.SharedMemory(name=name)
+        try:
+            magic, version, _, _, pid = _HEADER.unpack_from(stale.buf, 0)
+        except struct.error:
+            magic, version, pid = None, None, 0
+        if magic != MAGIC or version != VERSION or _alive(pid):
+            stale.close()
+            owner = f"process {pid}" if magic == MAGIC and pid else "another program"
+            raise FileExistsError(
+                f"Shared memory block {name} already exists and is used by {owner}. "
+                "Give this table another name (enable_live_values(name=...)), or "
+                f"remove the block (/dev/shm/{name} on Linux) if it is not used."
+            )
+        self.log(
+            f"Replacing live value table {name} of process {pid} (not running)",
+            level="warning",
+        )
+        stale.close()
+        stale.unlink()
+
+    def _slot(self, device_id: int, object_type: str, instance: int) -> t.Optional[int]:
+        key = (device_id, object_type, instance)
+        try:
+            return self._slots[key]
+        except KeyError:
+            pass
+        count = len(self._slots)
+        if count >= self.capacity:
+            if not self._full:
+                self.log(
+                    f"Live value table {self.name} is full ({self.capacity})",
+                    level="warning",
+                )
+                self._full = True
+            return None
+        offset = _HEADER.size + count * _RECORD.size
+        _RECORD.pack_into(
+            self.shm.buf,
+            offset,
+            int(device_id),
+            _object_type(object_type),
+            int(instance),
+            0,
+            0,
+            0.0,
+            float("nan"),
+        )
+        # readers only look at records below count, set once the key is written
+        _COUNT.pack_into(self.shm.buf, _COUNT_OFFSET, count + 1)
+        self._slots[key] = offset
+        return offset
+
+    def update(
+        self,
+        device_id: int,
+        object_type: str,
+        instance: int,
+        value,
+        timestamp: t.Optional[datetime] = None,
+        status_flags=None,
+    ) -> None:
+        offset = self._slot(device_id, object_type, instance)
+        if offset is None:
+            return
+        try:
+            _value = float("nan") if value is None else float(value)
+        except (TypeError, ValueError):
+            _value = float("nan")
+        _timestamp = (timestamp or datetime.now().astimezone()).timestamp()
+        buf = self.shm.buf
+        (seq,) = _SEQ.unpack_from(buf, offset + _SEQ_OFFSET)
+        _SEQ.pack_into(buf, offset + _SEQ_OFFSET, seq + 1)
+        _FLAGS.pack_into(buf, offset + _FLAGS_OFFSET, _flags(status_flags))
+        _DATA.pack_into(buf, offset + _SEQ_OFFSET, seq + 1, _timestamp, _value)
+        _SEQ.pack_into(buf, offset + _SEQ_OFFSET, seq + 2)
+
+    def update_point(self, point, timestamp: datetime, value) -> None:
+        """
+        Called by Point._trend for every sample
+        """
+        self.update(
+            point.properties.device.properties.device_id,
+            point.properties.type,
+            point.properties.address,
+            value,
+            timestamp,
+            point.properties.status_flags,
+        )
+
+    def update_status(self, point) -> None:
+        """
+        Called when statusFlags changes (COV) : only the flags are rewritten
+        """
+        offset = self._slot(
+            point.properties.device.properties.device_id,
+            point.properties.type,
+            point.properties.address,
+        )
+        if offset is None:
+            return
+        buf = self.shm.buf
+        (seq,) = _SEQ.unpack_from(buf, offset + _SEQ_OFFSET)
+        _SEQ.pack_into(buf, offset + _SEQ_OFFSET, seq + 1)
+        _FLAGS.pack_into(
+            buf, offset + _FLAGS_OFFSET, _flags(point.properties.status_flags)
+        )
+        _SEQ.pack_into(buf, offset + _SEQ_OFFSET, seq + 2)
+
+    def close(self) -> None:
+        """
+        Release and remove the shared memory block
+        """
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __repr__(self) -> str:
+        return f"LiveValueTable {self.name} ({len(self)}/{self.capacity})"
+
+
+class LiveValueReader:
+    """
+    Read-only access to a LiveValueTable from another process.
+
+    ex. reader = LiveValueReader("site_live")
+        reader.get(5, "analogInput", 1)
+        LiveValue(value=21.5, timestamp=1718000000.1, status_flags=0, seq=42)
+        reader.snapshot()  # every value
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME) -> None:
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13, the reader must not remove the block on exit
+            from multiprocessing import resource_tracker
+
+            self.shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        magic, version, self.capacity, *_ = _HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError(f"{name} is not a BAC0 live value table")
+        self._offsets: t.Dict[t.Tuple[int, int, int], int] = {}
+        self._known = 0
+
+    def _refresh(self) -> None:
+        (count,) = _COUNT.unpack_from(self.shm.buf, _COUNT_OFFSET)
+        for i in range(self._known, count):
+            offset = _HEADER.size + i * _RECORD.size
+            device_id, object_type, instance = _KEY.unpack_from(self.shm.buf, offset)
+            self._offsets[(device_id, object_type, instance)] = offset
+        self._known = count
+
+    def _read(self, offset: int) -> LiveValue:
+        buf = self.shm.buf
+        for _ in range(_RETRIES):
+            (seq,) = _SEQ.unpack_from(buf, offset + _SEQ_OFFSET)
+            if seq & 1:
+                continue
+            *_, flags, _, timestamp, value = _RECORD.unpack_from(buf, offset)
+            if _SEQ.unpack_from(buf, offset + _SEQ_OFFSET)[0] == seq:
+                return LiveValue(value, timestamp, flags, seq // 2)
+        raise BlockingIOError("Record kept changing while reading")
+
+    def get(
+        self, device_id: int, object_type: t.Union[str, int], instance: int
+    ) -> t.Optional[LiveValue]:
+        key = (int(device_id), _object_type(object_type), int(instance))
+        if key not in self._offsets:
+            self._refresh()
+        offset = self._offsets.get(key)
+        return None if offset is None else self._read(offset)
+
+    def keys(self) -> t.List[t.Tuple[int, int, int]]:
+        self._refresh()
+        return list(self._offsets)
+
+    def snapshot(self) -> t.Dict[t.Tuple[int, int, int], LiveValue]:
+        """
+        Every value, keyed by (device_id, object_type (int), instance)
+        """
+        self._refresh()
+        end = _HEADER.size + self._known * _RECORD.size
+        result = {}
+        retry = []
+        buf = self.shm.buf
+        for i, record in enumerate(
+            _RECORD.iter_unpack(buf[_HEADER.size : end])  # noqa E203
+        ):
+            device_id, object_type, instance, flags, seq, timestamp, value = record
+            key = (device_id, object_type, instance)
+            offset = _HEADER.size + i * _RECORD.size
+            # written while unpacking : read again
+            if seq & 1 or _SEQ.unpack_from(buf, offset + _SEQ_OFFSET)[0] != seq:
+                retry.append((key, offset))
+                continue
+            result[key] = LiveValue(value, timestamp, flags, seq // 2)
+        for key, offset in retry:
+            result[key] = self._read(offset)
+        return result
+
+    def __len__(self) -> int:
+        self._refresh()
+        return self._known
+
+    def close(self) -> None:
+        self.shm.close()
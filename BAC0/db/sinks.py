@@ -0,0 +1,485 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015 by Christian Tremblay, P.Eng <christian.tremblay@servisys.com>
+# Licensed under LGPLv3, see file LICENSE in this source tree.
+#
+"""
+sinks.py - send recorded samples to databases, files or user functions
+
+A sink follows the change feed of the network with its own bounded queue.
+Samples are written by batch, when batch_size samples are waiting or every
+flush_interval seconds, by a task of the sink : polling only appends to the
+queue. Many sinks can be registered at the same time.
+
+ex.
+    bacnet.add_sink(SQLiteSink("site.db"))
+    bacnet.add_sink(CSVSink("analog.csv", types=["analog"], flush_interval=60))
+    bacnet.add_sink(CallableSink(my_function))
+"""
+import asyncio
+import csv
+import json
+import os
+import sqlite3
+import typing as t
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+
+import aiosqlite
+
+from ..core.functions.ChangeFeed import ChangeEvent, ChangeSubscription
+from ..core.utils.lookfordependency import pandas_if_available
+from ..core.utils.notes import note_and_log
+from ..core.utils.offload import offload
+from .line_protocol import LineBuffer
+from .sql import point_properties, sample_columns
+
+_PANDAS, pd, _, _ = pandas_if_available()
+
+COLUMNS = ("device_id", "device", "point", "timestamp", "value")
+
+# device_id of the points that have none (virtual points) in SQLiteSink
+VIRTUAL = -1
+
+
+def _value(value) -> t.Any:
+    """
+    Numbers (and state codes) as float, anything else as text
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _device_id(device) -> int:
+    device_id = device.properties.device_id
+    return VIRTUAL if device_id is None else device_id
+
+
+def rows(events: t.Iterable[ChangeEvent]) -> t.List[t.Tuple[t.Any, ...]]:
+    """
+    Plain tuples (see COLUMNS) that can be handed to another thread
+    """
+    return [
+        (
+            event.point.properties.device.properties.device_id,
+            event.point.properties.device.properties.name,
+            event.point.properties.name,
+            event.timestamp,
+            _value(event.value),
+        )
+        for event in events
+    ]
+
+
+@note_and_log
+class Sink:
+    """
+    Base class of the sinks. Subclasses implement `write(events)` (a
+    coroutine) and, if needed, `close()`. A failing write keeps its events
+    for the next flush (as long as they fit in maxsize). After a failure,
+    the next write waits flush_interval, then twice as long after each new
+    failure (up to max_backoff), whatever the number of waiting samples.
+
+    :param devices: only points of these devices (device or device id)
+    :param types: only points whose type contains one of these (ex. "analog")
+    :param tags: only points having one of these tags (tag id or (tag id, value))
+    :param batch_size: samples written at once
+    :param flush_interval: seconds between writes when batch_size is not reached
+    :param maxsize: samples kept while waiting, oldest are dropped
+    :param max_backoff: longest wait between writes while they fail
+    """
+
+    def __init__(
+        self,
+        name: t.Optional[str] = None,
+        devices: t.Optional[t.Iterable[t.Any]] = None,
+        types: t.Optional[t.Iterable[str]] = None,
+        tags: t.Optional[t.Iterable[t.Any]] = None,
+        batch_size: int = 500,
+        flush_interval: float = 10,
+        maxsize: int = 10000,
+        max_backoff: float = 300,
+    ) -> None:
+        self.name = name or self.__class__.__name__
+        self.filters = {"devices": devices, "types": types, "tags": tags}
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maxsize = maxsize
+        self.max_backoff = max_backoff
+        self.subscription: t.Optional[ChangeSubscription] = None
+        self._task: t.Optional[asyncio.Task] = None
+        self.written = 0
+        self.failures = 0
+        # failed writes in a row
+        self.errors = 0
+        self.dropped = 0
+
+    async def write(self, events: t.List[ChangeEvent]) -> None:
+        raise NotImplementedError("Must be implemented")
+
+    async def close(self) -> None:
+        pass
+
+    def start(self, network) -> None:
+        self.subscription = network.changes(
+            maxsize=self.maxsize, batch_size=self.batch_size, **self.filters
+        )
+        self._task = asyncio.create_task(self._run(), name=f"BAC0 sink {self.name}")
+
+    async def stop(self) -> None:
+        """
+        Write what is waiting and release the sink
+        """
+        if self.subscription is not None:
+            self.subscription.close()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.close()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        pending: t.List[ChangeEvent] = []
+        deadline = loop.time() + self.flush_interval
+        while True:
+            try:
+                pending.extend(
+                    await asyncio.wait_for(
+                        self.subscription.get(), max(deadline - loop.time(), 0)
+                    )
+                )
+            except asyncio.TimeoutError:
+                pass
+            except StopAsyncIteration:
+                break
+            if loop.time() >= deadline or (
+                len(pending) >= self.batch_size and not self.errors
+            ):
+                pending = await self._flush(pending)
+                deadline = loop.time() + self._next_flush()
+            else:
+                pending = self._trim(pending)
+        await self._flush(pending)
+
+    def _next_flush(self) -> float:
+        """
+        Seconds before the next write : flush_interval, or the backoff after
+        failed writes
+        """
+        if not self.errors:
+            return self.flush_interval
+        return min(self.max_backoff, self.flush_interval * 2 ** (self.errors - 1))
+
+    def _trim(self, events: t.List[ChangeEvent]) -> t.List[ChangeEvent]:
+        if len(events) > self.maxsize:
+            self.dropped += len(events) - self.maxsize
+            events = events[-self.maxsize :]  # noqa E203
+        return events
+
+    async def _flush(self, events: t.List[ChangeEvent]) -> t.List[ChangeEvent]:
+        if not events:
+            return events
+        try:
+            await self.write(events)
+        except Exception as error:
+            self.failures += 1
+            self.errors += 1
+            self.log(
+                f"{self.name} : write failed ({error}), "
+                f"next try in {self._next_flush()}s",
+                level="error",
+            )
+            return self._trim(events)
+        self.errors = 0
+        self.written += len(events)
+        return []
+
+    @property
+    def stats(self) -> t.Dict[str, int]:
+        subscription = self.subscription.stats if self.subscription else {}
+        return {
+            "written": self.written,
+            "failures": self.failures,
+            "dropped": self.dropped + subscription.get("dropped", 0),
+            "pending": subscription.get("pending", 0),
+        }
+
+    def __repr__(self) -> str:
+        return f"{self.name} {self.stats}"
+
+
+class CallableSink(Sink):
+    """
+    Hand each batch (a list of ChangeEvent) to a function or a coroutine
+    function. A plain function runs in the event loop and must be quick.
+    """
+
+    def __init__(self, fn: t.Callable, **kwargs) -> None:
+        kwargs.setdefault("name", getattr(fn, "__name__", None))
+        super().__init__(**kwargs)
+        self.fn = fn
+
+    async def write(self, events: t.List[ChangeEvent]) -> None:
+        result = self.fn(events)
+        if asyncio.iscoroutine(result):
+            await result
+
+
+class CSVSink(Sink):
+    """
+    Append samples to a CSV file (columns : see COLUMNS, ISO timestamps)
+    """
+
+    def __init__(self, path: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.path = path
+
+    def _append(self, _rows) -> None:
+        header = not os.path.isfile(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", newline="") as file:
+            writer = csv.writer(file)
+            if header:
+                writer.writerow(COLUMNS)
+            writer.writerows(
+                (device_id, device, point, timestamp.isoformat(), value)
+                for device_id, device, point, timestamp, value in _rows
+            )
+
+    async def write(self, events: t.List[ChangeEvent]) -> None:
+        await offload(self._append, rows(events))
+
+
+class ParquetSink(Sink):
+    """
+    Write each batch as new Parquet files in the `path` folder, partitioned
+    by device (path/device_id=<id>/, requires pandas and pyarrow). Files are
+    named after the time of the write and can be read together with
+    pd.read_parquet(path), device_id being restored from the folder names.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 60, **kwargs) -> None:
+        if not _PANDAS:
+            raise ImportError("Install pandas and pyarrow to use this feature")
+        super().__init__(flush_interval=flush_interval, **kwargs)
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _write_file(self, _rows) -> None:
+        df = pd.DataFrame(_rows, columns=COLUMNS)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+        df["value"] = pd.to_numeric(df["value"], errors="coerce")
+        name = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        for device_id, partition in df.groupby("device_id", dropna=False):
+            folder = os.path.join(
+                self.path,
+                f"device_id={'virtual' if pd.isna(device_id) else int(device_id)}",
+            )
+            os.makedirs(folder, exist_ok=True)
+            partition.drop(columns="device_id").to_parquet(
+                os.path.join(folder, f"{name}.parquet"), index=False
+            )
+
+    async def write(self, events: t.List[ChangeEvent]) -> None:
+        await offload(self._write_file, rows(events))
+
+
+class SQLiteSink(Sink):
+    """
+    Site-wide history : the samples of every device in one SQLite database
+    (WAL mode, readers don't block the writer) ::
+
+        devices : device_id, name, properties (json)
+        points  : point_id, device_id, name, type, properties (json)
+        samples : point_id, ts, value, text   index on (point_id, ts)
+
+    Same conventions as Device.save() : ts in seconds since epoch, value is
+    the number (state code), text the state text or the string value.
+    Points without a device id (virtual points) use device_id -1.
+
+    ex. store = bacnet.add_sink(SQLiteSink("site.db"))
+        await store.history(5, "ZN-T", start=timedelta(hours=1))
+        await store.query("SELECT ... FROM samples JOIN points USING (point_id)")
+    """
+
+    SCHEMA = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "CREATE TABLE IF NOT EXISTS devices "
+        "(device_id INTEGER PRIMARY KEY, name TEXT, properties TEXT)",
+        "CREATE TABLE IF NOT EXISTS points (point_id INTEGER PRIMARY KEY, "
+        "device_id INTEGER, name TEXT, type TEXT, properties TEXT, "
+        "UNIQUE (device_id, name))",
+        "CREATE TABLE IF NOT EXISTS samples "
+        "(point_id INTEGER, ts REAL, value REAL, text TEXT)",
+        "CREATE INDEX IF NOT EXISTS samples_point_ts ON samples (point_id, ts)",
+    )
+
+    def __init__(self, path: str, batch_size: int = 2000, **kwargs) -> None:
+        super().__init__(batch_size=batch_size, **kwargs)
+        self.path = path
+        self._db: t.Optional[aiosqlite.Connection] = None
+        # (device_id, point name) : (point_id, state texts)
+        self._points: t.Dict[t.Tuple[int, str], t.Tuple[int, t.Any]] = {}
+        # devices written to the devices table
+        self._devices: t.Set[int] = set()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        if self._db is None:
+            self._db = await aiosqlite.connect(self.path)
+            for statement in self.SCHEMA:
+                await self._db.execute(statement)
+            await self._db.commit()
+        return self._db
+
+    async def _register(self, db: aiosqlite.Connection, points: t.List[t.Any]) -> None:
+        """
+        Add the points (and their devices) seen for the first time, in one
+        statement per table
+        """
+        devices = {}
+        records = []
+        for point in points:
+            device = point.properties.device
+            device_id = _device_id(device)
+            if device_id != VIRTUAL and device_id not in self._devices:
+                devices[device_id] = (
+                    device_id,
+                    device.properties.name,
+                    json.dumps(device.dev_properties_df(), default=str),
+                )
+            records.append(
+                (
+                    device_id,
+                    str(point.properties.name),
+                    point.properties.type,
+                    json.dumps(point_properties(point), default=str),
+                )
+            )
+        await db.executemany(
+            "INSERT OR REPLACE INTO devices VALUES (?, ?, ?)", devices.values()
+        )
+        self._devices.update(devices)
+        await db.executemany(
+            "INSERT INTO points (device_id, name, type, properties) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (device_id, name) DO UPDATE SET "
+            "type = excluded.type, properties = excluded.properties",
+            records,
+        )
+        ids = {}
+        for device_id in {record[0] for record in records}:
+            async with db.execute(
+                "SELECT name, point_id FROM points WHERE device_id = ?", (device_id,)
+            ) as cursor:
+                for name, point_id in await cursor.fetchall():
+                    ids[(device_id, name)] = point_id
+        for point in points:
+            key = (_device_id(point.properties.device), str(point.properties.name))
+            # virtual points have no state table
+            states = point._state_table() if hasattr(point, "_state_table") else None
+            self._points[key] = (ids[key], states)
+
+    async def write(self, events: t.List[ChangeEvent]) -> None:
+        db = await self._connect()
+        new = {}
+        for event in events:
+            point = event.point
+            key = (_device_id(point.properties.device), str(point.properties.name))
+            if key not in self._points:
+                new[key] = point
+        if new:
+            await self._register(db, list(new.values()))
+        samples = []
+        for event in events:
+            point = event.point
+            key = (_device_id(point.properties.device), str(point.properties.name))
+            point_id, states = self._points[key]
+            value, text = sample_columns(point.properties.type, event.value, states)
+            samples.append((point_id, event.timestamp.timestamp(), value, text))
+        await db.executemany("INSERT INTO samples VALUES (?, ?, ?, ?)", samples)
+        await db.commit()
+
+    def _read(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def _query(self, request: str, params: t.Sequence[t.Any] = ()) -> t.List[t.Tuple]:
+        with closing(self._read()) as con:
+            return con.execute(request, params).fetchall()
+
+    async def query(
+        self, request: str, params: t.Sequence[t.Any] = ()
+    ) -> t.List[t.Tuple]:
+        """
+        Rows of a SQL request on the store (ex. across devices), read in a
+        worker thread
+        """
+        return await offload(self._query, request, params)
+
+    async def history(
+        self,
+        device_id: int,
+        point: str,
+        start: t.Optional[t.Union[datetime, timedelta]] = None,
+        end: t.Optional[datetime] = None,
+    ):
+        """
+        History of a point saved in the store, between start (datetime or
+        timedelta for the last X) and end. Values are state codes for binary
+        and multistate points, like the point histories.
+        """
+        if isinstance(start, timedelta):
+            start = datetime.now().astimezone() - start
+        rows = await self.query(
+            "SELECT ts, CASE WHEN value IS NULL THEN text ELSE value END "
+            "FROM samples WHERE point_id = "
+            "(SELECT point_id FROM points WHERE device_id = ? AND name = ?) "
+            "AND ts >= ? AND ts <= ? ORDER BY ts",
+            (
+                device_id,
+                point,
+                float("-inf") if start is None else start.timestamp(),
+                float("inf") if end is None else end.timestamp(),
+            ),
+        )
+        if not _PANDAS:
+            return {
+                datetime.fromtimestamp(ts).astimezone(): value for ts, value in rows
+            }
+        local = datetime.now().astimezone().tzinfo
+        index = pd.to_datetime([ts for ts, _ in rows], unit="s", utc=True)
+        return pd.Series(
+            [value for _, value in rows],
+            index=index.tz_convert(local),
+            name=f"{device_id}/{point}",
+        )
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+
+class InfluxDBSink(Sink):
+    """
+    Write samples to InfluxDB (BAC0.db.influxdb.InfluxDB), in its bucket
+    """
+
+    def __init__(self, database, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.database = database
+        self._lines = LineBuffer()
+
+    async def write(self, events: t.List[ChangeEvent]) -> None:
+        self._lines.clear()
+        for event in events:
+            self._lines.append(event.point, event.value, event.timestamp)
+        if not self._lines:
+            return
+        if not await self.database.write(
+            self.database.bucket, self._lines.getvalue()
+        ):
+            raise ConnectionError("InfluxDB write failed")
@@ -5,13 +5,30 @@
 # Licensed under LGPLv3, see file LICENSE in this source tree.
 #
 """
-sql.py -
-"""
+sql.py - save devices to SQLite and read them back
+
+One database per device, in long format ::
+
+    metadata : key, value (json)          device properties, schema version
+    points   : point_id, name, type, properties (json)
+    samples  : point_id, ts, value, text  index on (point_id, ts)
 
-import os.path
+ts is in seconds since epoch (UTC). value is the number (state code for
+binary and multistate points), text the state text or the value of string
+points. Reading one point only touches its rows, through the index.
 
-# --- standard Python modules ---
+Backups of the first format (a wide "history" table, one column per point,
+and the properties in a pickle file <name>.bin) are converted when opened
+or saved to : see upgrade_backup.
+"""
+import json
+import os
 import pickle
+import sqlite3
+import typing as t
+from bisect import bisect_right
+from contextlib import closing
+from datetime import datetime
 
 # --- 3rd party modules ---
 import aiosqlite
@@ -22,12 +39,207 @@ from ..core.io.IOExceptions import (
     RemovedPointException,
 )
 from ..core.utils.lookfordependency import pandas_if_available
+from ..core.utils.offload import offload
 
-_PANDAS, pd, sql, Timestamp = pandas_if_available()
+_PANDAS, pd, _, _ = pandas_if_available()
 # --- this application's modules ---
 
 # ------------------------------------------------------------------------------
 
+SCHEMA_VERSION = 2
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)",
+    "CREATE TABLE IF NOT EXISTS points "
+    "(point_id INTEGER PRIMARY KEY, name TEXT UNIQUE, type TEXT, properties TEXT)",
+    "CREATE TABLE IF NOT EXISTS samples "
+    "(point_id INTEGER, ts REAL, value REAL, text TEXT)",
+    "CREATE INDEX IF NOT EXISTS samples_point_ts ON samples (point_id, ts)",
+)
+
+_POINT_SAMPLES = (
+    "SELECT ts, value, text FROM samples WHERE point_id = "
+    "(SELECT point_id FROM points WHERE name = ?) ORDER BY ts"
+)
+
+
+def _db_file(db_name: str) -> str:
+    return f"{db_name}.db"
+
+
+def _read_only(db_name: str) -> sqlite3.Connection:
+    # a missing file is an error, not a new empty database
+    return sqlite3.connect(f"file:{_db_file(db_name)}?mode=ro", uri=True)
+
+
+def upgrade_backup(db_name: str) -> bool:
+    """
+    Check the format of a backup and convert a backup of the first format.
+    Returns True when the file was converted.
+    """
+    if not os.path.isfile(_db_file(db_name)):
+        return False
+    with closing(sqlite3.connect(_db_file(db_name))) as con, con:
+        return _upgrade(con, db_name)
+
+
+def _upgrade(con: sqlite3.Connection, db_name: str) -> bool:
+    tables = {
+        name
+        for (name,) in con.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    }
+    if "metadata" in tables:
+        row = con.execute("SELECT value FROM metadata WHERE key = 'version'").fetchone()
+        if row is not None and int(row[0]) > SCHEMA_VERSION:
+            raise DataError(
+                f"{_db_file(db_name)} was saved by a newer BAC0 "
+                f"(schema {row[0]}, this version reads {SCHEMA_VERSION})"
+            )
+        return False
+    if "history" not in tables:
+        # new database
+        return False
+    if not _PANDAS or not os.path.isfile(f"{db_name}.bin"):
+        raise DataError(
+            f"{_db_file(db_name)} is a backup of the first format (wide history "
+            f"table and {db_name}.bin pickle file). Pandas and {db_name}.bin "
+            "are required to convert it."
+        )
+    _convert_v1(con, db_name)
+    return True
+
+
+def _convert_v1(con: sqlite3.Connection, db_name: str) -> None:
+    """
+    Copy the wide history table and the pickled properties to the long
+    format. The history table is kept, renamed history_v1.
+    """
+    with open(f"{db_name}.bin", "rb") as file:
+        backup = pickle.load(file)
+    history = pd.read_sql('SELECT * FROM "history"', con)
+    timestamps = pd.to_datetime(history.pop("index"), utc=True)
+    ts = [timestamp.timestamp() for timestamp in timestamps]
+    for statement in _SCHEMA:
+        con.execute(statement)
+    con.executemany(
+        "INSERT OR REPLACE INTO metadata VALUES (?, ?)",
+        [
+            ("version", str(SCHEMA_VERSION)),
+            ("device", json.dumps(backup["device"], default=str)),
+        ],
+    )
+    rows = []
+    for name, properties in backup["points"].items():
+        properties = dict(properties)
+        units_state = properties.get("units_state")
+        _type = str(properties.get("type"))
+        point_id = con.execute(
+            "INSERT INTO points (name, type, properties) VALUES (?, ?, ?)",
+            (
+                name,
+                _type,
+                json.dumps(
+                    {
+                        "name": name,
+                        "type": _type,
+                        "address": properties.get("address"),
+                        "description": properties.get("description"),
+                        "units_state": (
+                            list(units_state)
+                            if isinstance(units_state, (list, tuple))
+                            else units_state
+                        ),
+                    },
+                    default=str,
+                ),
+            ),
+        ).lastrowid
+        if name not in history:
+            continue
+        texts = history.get(f"{name}_str")
+        for i, sample in enumerate(history[name]):
+            if sample is None or sample != sample:
+                continue
+            value, text = sample_columns(_type, sample, None)
+            if texts is not None and isinstance(texts.iloc[i], str):
+                text = texts.iloc[i]
+            if value is not None or text is not None:
+                rows.append((point_id, ts[i], value, text))
+    con.executemany("INSERT INTO samples VALUES (?, ?, ?, ?)", rows)
+    con.execute("ALTER TABLE history RENAME TO history_v1")
+
+
+def point_properties(point) -> t.Dict[str, t.Any]:
+    """
+    Properties saved with the samples, enough to rebuild an offline point
+    """
+    units_state = point.properties.units_state
+    return {
+        "name": str(point.properties.name),
+        "type": point.properties.type,
+        "address": point.properties.address,
+        "description": point.properties.description,
+        "units_state": (
+            list(units_state) if isinstance(units_state, (list, tuple)) else units_state
+        ),
+    }
+
+
+def sample_columns(
+    _type: str, value, states
+) -> t.Tuple[t.Optional[float], t.Optional[str]]:
+    """
+    (value, text) columns of a sample
+    """
+    if "binary" in _type or "multi" in _type:
+        try:
+            code = int(value)
+        except (TypeError, ValueError):
+            return None, None
+        return code, (states or {}).get(code)
+    if "analog" in _type:
+        try:
+            return float(value), None
+        except (TypeError, ValueError):
+            return None, None
+    return None, None if value is None else str(value)
+
+
+def _write_sqlite(filename: str, device: str, points, snapshot) -> int:
+    """
+    Save device and point properties and append the samples not saved yet.
+    Runs in a worker (see save).
+    """
+    with closing(sqlite3.connect(filename)) as con, con:
+        _upgrade(con, filename[: -len(".db")])
+        for statement in _SCHEMA:
+            con.execute(statement)
+        con.executemany(
+            "INSERT OR REPLACE INTO metadata VALUES (?, ?)",
+            [("version", str(SCHEMA_VERSION)), ("device", device)],
+        )
+        con.executemany(
+            "INSERT INTO points (name, type, properties) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET "
+            "type = excluded.type, properties = excluded.properties",
+            points,
+        )
+        ids = dict(con.execute("SELECT name, point_id FROM points"))
+        last = dict(
+            con.execute("SELECT point_id, MAX(ts) FROM samples GROUP BY point_id")
+        )
+        rows = []
+        for name, _type, timestamps, values, states in snapshot:
+            point_id = ids[name]
+            ts = [timestamp.timestamp() for timestamp in timestamps]
+            since = last.get(point_id)
+            start = 0 if since is None else bisect_right(ts, since)
+            for i in range(start, len(ts)):
+                value, text = sample_columns(_type, values[i], states)
+                rows.append((point_id, ts[i], value, text))
+        con.executemany("INSERT INTO samples VALUES (?, ?, ?, ?)", rows)
+    return len(rows)
+
 
 class SQLMixin(object):
     """
@@ -36,24 +248,27 @@ class SQLMixin(object):
     is not available.
     """
 
-    async def _read_from_sql(self, request, db_name):
-        """
-        Using the contextlib, I hope to close the connection to database when
-        not in use
-        """
-        async with aiosqlite.connect(f"{db_name}.db") as con:
-            async with con.execute(request) as cursor:
-                rows = await cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
-                return pd.DataFrame(rows, columns=columns)
-
     def dev_properties_df(self):
         dic = self.properties.asdict.copy()
         dic.pop("network", None)
+        dic.pop("history_files", None)
         dic["objects_list"] = []
         dic.pop("pss", None)
         return dic
 
+    def _points_records(self) -> t.List[t.Tuple[str, str, str]]:
+        """
+        (name, type, properties as json) of every point, for the points table
+        """
+        return [
+            (
+                str(point.properties.name),
+                point.properties.type,
+                json.dumps(point_properties(point), default=str),
+            )
+            for point in self.points
+        ]
+
     def points_properties_df(self):
         """
         Return a dictionary of point/point_properties in preparation for storage in SQL.
@@ -69,7 +284,28 @@ class SQLMixin(object):
 
         return pd.DataFrame(pprops)
 
-    def backup_histories_df(self, resampling="1s"):
+    def _histories_snapshot(self, start=None, end=None):
+        """
+        Copy of every point history as (name, type, timestamps, values,
+        states), ready to be sent to a worker by save(). states is the text
+        of each code for binary and multistate points. start and end limit
+        the samples to a time range.
+        """
+        snapshot = []
+        for point in self.points:
+            timestamps, values = point._history_snapshot(start, end)
+            snapshot.append(
+                (
+                    str(point.properties.name),
+                    point.properties.type,
+                    timestamps,
+                    values,
+                    point._state_table(),
+                )
+            )
+        return snapshot
+
+    def backup_histories_df(self, resampling="1s", snapshot=None):
         """
         Build a dataframe of the point histories
         By default, dataframe will be resampled for 1sec intervals,
@@ -85,104 +321,88 @@ class SQLMixin(object):
         For binary values, we'll use .last() so we won't get a 0.5 value
         which means nothing in this context.
 
-        If saving a DB that already exists, previous resampling will survive
-        the merge of old data and new data.
+        snapshot (see _histories_snapshot) is used instead of the live
+        histories when provided, so the dataframe can be built in a worker
+        thread.
         """
         if not _PANDAS:
             self.log("Pandas is required to create dataframe.", level="error")
             return
-        backup = {}
         if isinstance(resampling, str):
             resampling_needed = True
             resampling_freq = resampling
         elif resampling in [0, False]:
             resampling_needed = False
-
-        def extract_value_and_string(val):
-            if isinstance(val, str):
-                if ":" in val:
-                    _v, _s = val.split(":")
-                    return (int(_v), _s)
-                elif val == "active":
-                    val = 1
-                elif val == "inactive":
-                    val = 0
-            return (int(val), "unknown")
-
-        # print(resampling, resampling_freq, resampling_needed)
-        for point in self.points:
-            _name = str(point.properties.name)
+            resampling_freq = None
+
+        # columns are listed in the order they will be presented
+        columns = []
+        analog = {}
+        states = {}
+        texts = {}
+        if snapshot is None:
+            snapshot = self._histories_snapshot()
+        for _name, _type, timestamps, values, _states in snapshot:
+            if not timestamps:
+                continue
             try:
-                if (
-                    "binary" in point.properties.type
-                    or "multi" in point.properties.type
-                ):
-                    backup[f"{_name}_str"] = (
-                        point.history.apply(lambda x: extract_value_and_string(x)[1])
-                        .resample(resampling_freq)
-                        .last()
-                    )
-                    backup[_name] = (
-                        point.history.apply(lambda x: extract_value_and_string(x)[0])
-                        .resample(resampling_freq)
-                        .last()
-                    )
-                elif resampling_needed and "analog" in point.properties.type:
-                    backup[_name] = point.history.resample(resampling_freq).mean()
-                else:
-                    # backup[point.properties.name] = point.history.resample(
-                    #    resampling_freq
-                    # ).last()
-                    continue
-
+                his = pd.Series(index=timestamps, data=values)
+                if "binary" in _type or "multi" in _type:
+                    _values, _texts = self._split_states(his, _states)
+                    texts[f"{_name}_str"] = _texts
+                    states[_name] = _values
+                    columns.extend([f"{_name}_str", _name])
+                elif "analog" in _type:
+                    analog[_name] = pd.to_numeric(his, errors="coerce")
+                    columns.append(_name)
             except Exception as error:
                 try:
                     self.log(
-                        f"{self.properties.name} ({self.properties.device.properties.address}) | Error in resampling {point.properties.name} | {error} (probably not enough points)",
+                        f"{self.properties.name} ({self.properties.device.properties.address}) | Error in preparing history of {_name} | {error}",
                         level="error",
                     )
                 except AttributeError as error:
                     raise DataError(
                         f"Cannot save, missing required information : {error}"
                     )
-                if (
-                    "binary" in point.properties.type
-                    or "multi" in point.properties.type
-                ):
-                    backup[f"{_name}.str"] = (
-                        point.history.apply(lambda x: extract_value_and_string(x)[1])
-                        .resample(resampling_freq)
-                        .last()
-                    )
-                    backup[f"{_name}.val"] = (
-                        point.history.apply(lambda x: extract_value_and_string(x)[0])
-                        .resample(resampling_freq)
-                        .last()
-                    )
-                    backup[_name] = point.history.resample(resampling_freq).last()
-                elif "analog" in point.properties.type:
-                    backup[_name] = point.history.resample(resampling_freq).mean()
-                else:
-                    # backup[point.properties.name] = point.history
-                    continue
 
-        df = pd.DataFrame(dict([(k, pd.Series(v)) for k, v in backup.items()]))
+        if not columns:
+            return pd.DataFrame()
+
+        backup = {}
+        for series, how in ((analog, "mean"), (states, "last"), (texts, "last")):
+            for name, his in series.items():
+                if resampling_needed:
+                    backup[name] = getattr(his.resample(resampling_freq), how)()
+                else:
+                    backup[name] = his[~his.index.duplicated(keep="last")]
+        df = pd.DataFrame({name: backup[name] for name in columns})
         if resampling_needed:
             return df.resample(resampling_freq).last().ffill().bfill()
         else:
             return df
 
-    async def save(self, filename=None, resampling=None):
+    @staticmethod
+    def _split_states(his, states=None):
+        """
+        Split a binary or multistate history (codes) into a numeric Series
+        and a text Series, the text being decoded with the state table of
+        the point. Unknown codes are presented as "unknown".
         """
-        Save the point histories to sqlite3 database.
-        Save the device object properties to a pickle file so the device can be reloaded.
+        values = pd.to_numeric(his, errors="coerce")
+        texts = values.map(states or {}).astype(object)
+        return values, texts.where(texts.notna(), "unknown")
 
-        Resampling : valid Pandas resampling frequency. If 0 or False, dataframe will not be resampled on save.
+    async def save(self, filename=None, resampling=None):
         """
-        if not _PANDAS:
-            self.log("Pandas is required to save to SQLite.", level="error")
-            return
+        Save the device, its points and their histories to a SQLite database
+        (Device_<device_id>.db by default) so the device can be reloaded.
+        Samples are saved as recorded ; only the samples newer than the
+        ones already in the database are appended.
 
+        resampling is kept for compatibility, samples are no longer
+        resampled on save (use backup_histories_df for that).
+        """
         if filename:
             if ".db" in filename:
                 filename = filename.split(".")[0]
@@ -190,116 +410,130 @@ class SQLMixin(object):
         else:
             self.properties.db_name = f"Device_{self.properties.device_id}"
 
-        if resampling is None:
-            resampling = self.properties.save_resampling
-
-        # Does file exist? If so, append data
-
-        def _df_to_backup():
-            try:
-                return self.backup_histories_df(resampling=resampling)
-            except (DataError, NoResponseFromController):
-                self.log("Impossible to save right now, error in data", level="error")
-                return pd.DataFrame()
-
-        if os.path.isfile(f"{self.properties.db_name}.db"):
-            try:
-                his = await self._read_from_sql(
-                    'select * from "history"', self.properties.db_name
-                )
-                his.index = his["index"].apply(Timestamp)
-                last = his.index[-1]
-                df_to_backup = _df_to_backup()[last:]
-            except Exception:
-                df_to_backup = _df_to_backup()
-
-        else:
-            self.log("Creating a new backup database", level="debug")
-            df_to_backup = _df_to_backup()
-
-        if df_to_backup is None:
-            return
-        # DataFrames that will be saved to SQL
-        async with aiosqlite.connect(f"{self.properties.db_name}.db") as con:
-            try:
-                async with con.execute("SELECT * FROM history") as cursor:
-                    data = await cursor.fetchall()
-                    columns = [description[0] for description in cursor.description]
-                    data = pd.DataFrame(data, columns=columns)
-                    df = pd.concat([data, df_to_backup], sort=True)
-                    sql.to_sql(
-                        df_to_backup,
-                        name="history",
-                        con=con,
-                        index_label="index",
-                        index=True,
-                        if_exists="append",
-                    )
-            except Exception:
-                # df = df_to_backup
-                self._log.error("Error saving to SQL database")
-
-            # asyncio.run(
-            #    None, df_to_backup.to_sql, "history", con, None, "append", True, "index"
-            # )
-
-        # Saving other properties to a pickle file...
-        prop_backup = {"device": self.dev_properties_df()}
-        prop_backup["points"] = self.points_properties_df()
         try:
-            with open(f"{self.properties.db_name}.bin", "wb") as file:
-                pickle.dump(prop_backup, file)
-            if self.properties.clear_history_on_save:
-                self.clear_histories()
+            device = json.dumps(self.dev_properties_df(), default=str)
+            # histories are copied here, the database is written in a worker
+            count = await offload(
+                _write_sqlite,
+                _db_file(self.properties.db_name),
+                device,
+                self._points_records(),
+                self._histories_snapshot(),
+            )
+        except (DataError, NoResponseFromController, sqlite3.Error) as error:
+            self.log(f"Impossible to save right now : {error}", level="error")
+            return
 
-            self.log(f"Device saved to {self.properties.db_name}.db", level="info")
-        except Exception as error:
-            self._log.error(f"Error saving to pickle file: {error}")
+        if self.properties.clear_history_on_save:
+            self.clear_histories()
+        self.log(
+            f"Device saved to {_db_file(self.properties.db_name)} ({count} samples)",
+            level="info",
+        )
 
     async def points_from_sql(self, db_name):
         """
         Retrieve point list from SQL database
         """
         try:
-            points = await self._read_from_sql("SELECT * FROM history;", db_name)
-            return list(points.columns.values)[1:]
+            async with aiosqlite.connect(_db_file(db_name)) as con:
+                async with con.execute(
+                    "SELECT name FROM points ORDER BY point_id"
+                ) as cursor:
+                    return [name for (name,) in await cursor.fetchall()]
         except Exception:
             self._log.warning(f"No history retrieved from {db_name}.db:")
             return []
 
+    async def points_prop_from_sql(self, db_name) -> t.Dict[str, t.Dict[str, t.Any]]:
+        """
+        Properties of every point, using one query
+        """
+        async with aiosqlite.connect(_db_file(db_name)) as con:
+            async with con.execute(
+                "SELECT name, properties FROM points ORDER BY point_id"
+            ) as cursor:
+                return {
+                    name: json.loads(properties)
+                    for name, properties in await cursor.fetchall()
+                }
+
+    def _samples_from_sql(self, db_name, point, last=False):
+        """
+        (ts, value, text) rows of a point, sorted by time. Only the last one
+        if last is True.
+        """
+        query = _POINT_SAMPLES + (" DESC LIMIT 1" if last else "")
+        with closing(_read_only(db_name)) as con:
+            return con.execute(query, (point,)).fetchall()
+
+    def history_from_sql(self, db_name, point, _type=None):
+        """
+        (timestamps, values) of a point as stored, ready to build its history
+        Series. Values are state codes for binary and multistate points.
+        """
+        rows = self._samples_from_sql(db_name, point)
+        text = _type is not None and not any(
+            each in _type for each in ("analog", "binary", "multi")
+        )
+        values = [_text if text else value for _, value, _text in rows]
+        if not _PANDAS:
+            timestamps = [datetime.fromtimestamp(ts).astimezone() for ts, _, _ in rows]
+            return timestamps, values
+        local = datetime.now().astimezone().tzinfo
+        index = pd.to_datetime([ts for ts, _, _ in rows], unit="s", utc=True)
+        return index.tz_convert(local), values
+
     async def his_from_sql(self, db_name, point):
         """
         Retrive point histories from SQL database
         """
-        his = await self._read_from_sql('select * from "history"', db_name)
-        his.index = his["index"].apply(Timestamp)
-        return his.set_index("index")[point]
+        idx, values = await offload(self.history_from_sql, db_name, point)
+        return pd.Series(index=idx, data=values, name=point)
 
     async def value_from_sql(self, db_name, point):
         """
         Take last known value as the value
         """
-        return await self.his_from_sql(db_name, point).last_valid_index()
+        rows = await offload(self._samples_from_sql, db_name, point, True)
+        if not rows:
+            return None
+        _, value, text = rows[0]
+        return text if value is None else value
+
+    async def upgrade_backup(self, db_name) -> None:
+        """
+        Convert a backup of the first format to the current one (see
+        upgrade_backup), raises DataError when it can't be converted
+        """
+        if await offload(upgrade_backup, db_name):
+            self.log(f"{_db_file(db_name)} converted to the new format", level="info")
 
     def read_point_prop(self, device_name, point):
         """
-        Points properties retrieved from pickle
+        Point properties from the points table
         """
-        with open(f"{device_name}.bin", "rb") as file:
-            try:
-                _point = pickle.load(file)["points"][point]
-            except KeyError:
-                raise RemovedPointException(f"{point} not found (probably deleted)")
-            return _point
+        with closing(_read_only(device_name)) as con:
+            row = con.execute(
+                "SELECT properties FROM points WHERE name = ?", (point,)
+            ).fetchone()
+        if row is None:
+            raise RemovedPointException(f"{point} not found (probably deleted)")
+        return json.loads(row[0])
 
     def read_dev_prop(self, device_name):
         """
-        Device properties retrieved from pickle
+        Device properties from the metadata table
         """
         self.log("Reading prop from DB file", level="debug")
         try:
-            with open(f"{device_name}.bin", "rb") as file:
-                return pickle.load(file)["device"]
-        except (EOFError, FileNotFoundError):
+            with closing(_read_only(device_name)) as con:
+                row = con.execute(
+                    "SELECT value FROM metadata WHERE key = 'device'"
+                ).fetchone()
+        except sqlite3.Error:
+            row = None
+        if row is None:
             self._log.error("Error reading device properties")
             raise ValueError
+        return json.loads(row[0])
@@ -12,14 +12,20 @@ import random
 import sys
 import typing as t
 from collections import defaultdict
+from datetime import datetime
 
 # --- standard Python modules ---
-from bacpypes3.basetypes import DeviceStatus, HostNPort, ObjectTypesSupported
+from bacpypes3.basetypes import (
+    DeviceObjectPropertyReference,
+    DeviceStatus,
+    HostNPort,
+    ObjectTypesSupported,
+)
 from bacpypes3.json.util import sequence_to_json
 from bacpypes3.local.device import DeviceObject
 from bacpypes3.local.networkport import NetworkPortObject
 from bacpypes3.pdu import Address
-from bacpypes3.primitivedata import CharacterString
+from bacpypes3.primitivedata import CharacterString, ObjectIdentifier
 from bacpypes3.vendor import VendorInfo, get_vendor_info
 
 # --- this application's modules ---
@@ -29,6 +35,8 @@ from ..core.app.asyncApp import (
 from ..core.functions.GetIPAddr import validate_ip_address
 from ..core.functions.TimeSync import TimeHandler
 from ..core.io.IOExceptions import InitializationError, UnknownObjectError
+from ..core.io.RoundTrip import RoundTripTimes
+from ..core.io.SingleFlight import SingleFlight
 from ..core.utils.notes import note_and_log
 from ..tasks.TaskManager import stopAllTasks
 
@@ -39,22 +47,104 @@ from ..tasks.TaskManager import stopAllTasks
 
 @note_and_log
 class LocalObjects(object):
+    """
+    Access to the objects hosted by the local device.
+
+    Objects can be retrieved by name or by (objectType, instance). Identifiers
+    are normalized once and kept in an index so repeated lookups resolve
+    directly in the application dicts.
+    """
+
     def __init__(self, device):
         self.device = device
+        self._identifiers: t.Dict[t.Any, ObjectIdentifier] = {}
+        self._trendlogs: t.Dict[t.Any, t.List[t.Any]] = defaultdict(list)
 
-    def __getitem__(self, obj):
-        item = None
-        if isinstance(obj, tuple):
+    def _object_identifier(self, obj: tuple) -> ObjectIdentifier:
+        try:
+            return self._identifiers[obj]
+        except KeyError:
             obj_type, instance = obj
-            item = self.device.this_application.app.get_object_id((obj_type, instance))
-        elif isinstance(obj, str):
-            name = obj
-            item = self.device.this_application.app.get_object_name(name)
+            try:
+                oid = ObjectIdentifier((obj_type, int(instance)))
+            except (TypeError, ValueError):
+                raise UnknownObjectError(f"Can't find {obj} in local device")
+            self._identifiers[obj] = oid
+            return oid
+
+    def get(self, obj, default=None):
+        app = self.device.this_application.app
+        if isinstance(obj, str):
+            return app.objectName.get(obj, default)
+        elif isinstance(obj, tuple):
+            return app.objectIdentifier.get(self._object_identifier(obj), default)
+        return default
+
+    def __getitem__(self, obj):
+        item = self.get(obj)
         if item is None:
             raise UnknownObjectError(f"Can't find {obj} in local device")
         else:
             return item
 
+    def __contains__(self, obj):
+        return self.get(obj) is not None
+
+    def link_trendlog(self, trendlog, obj) -> None:
+        """
+        Feed the local trendLog with the presentValue of obj each time it
+        is modified using update_many(..., trend=True).
+        """
+        _trendlog = self[trendlog] if isinstance(trendlog, (str, tuple)) else trendlog
+        _obj = self[obj] if isinstance(obj, (str, tuple)) else obj
+        if not hasattr(_trendlog, "_local"):
+            raise ValueError(f"{trendlog} is not a local trendLog")
+        _trendlog.logDeviceObjectProperty = DeviceObjectPropertyReference(
+            objectIdentifier=_obj.objectIdentifier,
+            propertyIdentifier="presentValue",
+        )
+        if _trendlog._local not in self._trendlogs[_obj]:
+            self._trendlogs[_obj].append(_trendlog._local)
+
+    def update_many(
+        self,
+        values: t.Dict[t.Any, t.Any],
+        trend: bool = False,
+        timestamp: t.Optional[datetime] = None,
+    ) -> None:
+        """
+        Write the presentValue of many local objects at once.
+
+        :param values: dict of {name or (objectType, instance): value}
+        :param trend: feed the linked local trendLogs (see link_trendlog)
+        :param timestamp: timestamp used for the trendLog records (default: now)
+
+        Every object is resolved before anything is written. Values are then
+        applied without yielding to the event loop so the COV detection of
+        each object runs once for the batch : subscribers get a single
+        notification per object carrying the last value.
+        """
+        _objects = []
+        for key, value in values.items():
+            obj = self.get(key)
+            if obj is None:
+                raise UnknownObjectError(f"Can't find {key} in local device")
+            _objects.append((obj, value))
+
+        for obj, value in _objects:
+            obj.presentValue = value
+
+        if trend and self._trendlogs:
+            _timestamp = timestamp if timestamp is not None else datetime.now()
+            _modified = set()
+            for obj, value in _objects:
+                for trendlog in self._trendlogs.get(obj, ()):
+                    trendlog.add_data(_timestamp, value, update_after=False)
+                    _modified.add(trendlog)
+            for trendlog in _modified:
+                trendlog.update_properties()
+        self.log(f"Updated {len(_objects)} local objects", level="debug")
+
 
 def charstring(val):
     return CharacterString(val) if isinstance(val, str) else val
@@ -163,6 +253,11 @@ class Base:
         self._ric = {}
         self.subscription_contexts = {}
         self.database = None
+        self.live_values = None
+        self.change_feed = None
+        self.sinks = []
+        self.round_trip_times = RoundTripTimes()
+        self.in_flight = SingleFlight()
         self.json_file = json_file
 
         try:
@@ -13,9 +13,11 @@ and allow communication with other devices.
 
 import asyncio
 import typing as t
+import warnings
 
 # --- standard Python modules ---
 import weakref
+from datetime import datetime, timedelta
 
 from bacpypes3 import __version__ as bacpypes_version
 from bacpypes3.app import Application
@@ -30,7 +32,15 @@ from ..core.devices.Points import Point
 from ..core.devices.Trends import TrendLog
 from ..core.devices.Virtuals import VirtualPoint
 from ..core.functions.Alias import Alias
+from ..core.functions.ChangeFeed import ChangeFeed, ChangeSubscription
+from ..core.functions.CircuitBreaker import OPEN
 from ..core.functions.CoV import COVSubscription
+from ..core.functions.DeviceHealth import (
+    OFFLINE,
+    ONLINE,
+    SUSPECT,
+    HealthMonitor,
+)
 
 # from ..core.functions.legacy.cov import CoV
 # from ..core.functions.legacy.DeviceCommunicationControl import (
@@ -47,7 +57,6 @@ from ..core.functions.Text import TextMixin
 from ..core.functions.TimeSync import TimeSync
 from ..core.io.IOExceptions import (
     NoResponseFromController,
-    NumerousPingFailures,
     Timeout,
     UnrecognizedService,
 )
@@ -58,6 +67,9 @@ from ..core.utils.lookfordependency import influxdb_if_available, rich_if_availa
 
 # from ..core.io.asynchronous.Write import WriteProperty
 from ..core.utils.notes import note_and_log
+from ..db.export import HistoryExport
+from ..db.live_values import LiveValueTable
+from ..db.sinks import InfluxDBSink, Sink
 from ..infos import __version__ as version
 
 # --- this application's modules ---
@@ -65,8 +77,6 @@ from ..tasks.RecurringTask import RecurringTask
 from ..tasks.TaskManager import Task
 
 INFLUXDB, _ = influxdb_if_available()
-if INFLUXDB:
-    from ..db.influxdb import InfluxDB
 RICH, rich = rich_if_available()
 if RICH:
     from rich import pretty
@@ -117,6 +127,8 @@ class Lite(
         bdtable=None,
         ping: bool = True,
         ping_delay: int = 300,
+        ping_concurrency: int = 20,
+        ping_per_network: int = 5,
         db_params: t.Optional[t.Dict[str, t.Any]] = None,
         **params,
     ) -> None:
@@ -135,7 +147,11 @@ class Lite(
         self._registered_devices = weakref.WeakValueDictionary()
 
         # Ping task will deal with all registered device and disconnect them if they do not respond.
-
+        self.health_monitor = HealthMonitor(
+            delay=ping_delay,
+            concurrency=ping_concurrency,
+            per_network=ping_per_network,
+        )
         self._ping_task = RecurringTask(
             self.ping_registered_devices,
             delay=ping_delay,
@@ -185,9 +201,14 @@ class Lite(
         self.log(f"Device instance (id) : {self.Boid}", level="info")
         self.bokehserver = False
         self._points_to_trend = weakref.WeakValueDictionary()
+        self._warm_start = None
+        # warm start tasks in progress, referenced until they are done
+        self._warm_starts: t.Set[asyncio.Task] = set()
 
         # Activate InfluxDB if params are available
         if db_params and INFLUXDB:
+            from ..db.influxdb import InfluxDB
+
             try:
                 self.database = (
                     InfluxDB(db_params)
@@ -202,8 +223,14 @@ class Lite(
                     "Unable to connect to InfluxDB. Please validate parameters"
                 )
         if self.database:
-            write_interval = db_params.get("write_interval", 60)
-            self.create_save_to_influxdb_task(delay=write_interval)
+            self.add_sink(
+                InfluxDBSink(
+                    self.database,
+                    flush_interval=db_params.get("write_interval", 60),
+                )
+            )
+            # hours of history read back from InfluxDB when a device connects
+            self._warm_start = db_params.get("warm_start")
 
         # Announce yourself
 
@@ -224,34 +251,167 @@ class Lite(
         _res = await self.this_application.app.i_am()
         self._initialized = True
 
+    def add_sink(self, sink: Sink) -> Sink:
+        """
+        Send recorded samples to a sink (see BAC0.db.sinks). Each sink has
+        its own queue and writes by batch, outside of the polling tasks.
+
+        ex.
+            from BAC0.db.sinks import SQLiteSink, CSVSink
+            bacnet.add_sink(SQLiteSink("site.db", flush_interval=30))
+            bacnet.add_sink(CSVSink("analog.csv", types=["analog"]))
+        """
+        sink.start(self)
+        self.sinks.append(sink)
+        self.log(f"Sink {sink.name} added", level="info")
+        return sink
+
     def create_save_to_influxdb_task(self, delay: int = 60) -> None:
-        self._write_to_db = RecurringTask(
-            self.save_registered_devices_to_db,
-            delay=delay,
-            name="Write to InfluxDB Task",
+        """
+        Deprecated : samples are written to InfluxDB by the sink registered
+        from db_params. This sets its write interval to `delay`.
+        """
+        warnings.warn(
+            "create_save_to_influxdb_task() is deprecated, samples are written "
+            "by the InfluxDB sink (db_params['write_interval'])",
+            DeprecationWarning,
+            stacklevel=2,
         )
-        self._write_to_db.start()
+        if not self.database:
+            return
+        for sink in self.sinks:
+            if isinstance(sink, InfluxDBSink):
+                sink.flush_interval = delay
+                return
+        self.add_sink(InfluxDBSink(self.database, flush_interval=delay))
 
     async def save_registered_devices_to_db(self, delay: int = 60) -> None:
-        if len(self.registered_devices) > 0:
-            for each in self.registered_devices:
-                try:
-                    await self.database.write_points_lastvalue_to_db(each.points)
-                except Exception as error:
-                    self._log.error(
-                        f"Error writing points of {each} to InfluxDB : {error}. Stopping task."
-                    )
-                    await self._write_to_db.stop()
-                    self.log(
-                        "Write to InfluxDB Task stopped. Restarting", level="warning"
-                    )
-                    self.create_save_to_influxdb_task(delay=delay)
+        """
+        Deprecated : write the last value of the points of every registered
+        device to InfluxDB now. The InfluxDB sink already writes every sample.
+        """
+        warnings.warn(
+            "save_registered_devices_to_db() is deprecated, samples are written "
+            "by the InfluxDB sink",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        if not self.database:
+            return
+        for each in self.registered_devices:
+            try:
+                await self.database.write_points_lastvalue_to_db(each.points)
+            except Exception as error:
+                self._log.error(f"Error writing points of {each} to InfluxDB : {error}")
+
+    async def remove_sink(self, sink: Sink) -> None:
+        """
+        Write the samples waiting in the sink, then remove it
+        """
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+        await sink.stop()
+
+    def enable_live_values(
+        self, name: t.Optional[str] = None, capacity: int = 65536
+    ) -> LiveValueTable:
+        """
+        Publish the last value of every point in shared memory, for other
+        processes on this host (see BAC0.db.live_values.LiveValueReader).
+
+        :param name: name of the shared memory block
+        :param capacity: maximum number of points
+        """
+        if self.live_values is None:
+            self.live_values = LiveValueTable(name=name, capacity=capacity)
+            self.log(f"Live values published in {self.live_values.name}", level="info")
+        return self.live_values
+
+    def disable_live_values(self) -> None:
+        if self.live_values is not None:
+            self.live_values.close()
+            self.live_values = None
+
+    def changes(
+        self,
+        devices: t.Optional[t.Iterable[t.Any]] = None,
+        types: t.Optional[t.Iterable[str]] = None,
+        tags: t.Optional[t.Iterable[t.Any]] = None,
+        maxsize: int = 10000,
+        batch_size: int = 500,
+    ) -> ChangeSubscription:
+        """
+        Follow point updates (polls, reads, COV) on the network. Returns an
+        async iterator of lists of ChangeEvent(point, timestamp, value, flags).
+
+        :param devices: only points of these devices (device or device id)
+        :param types: only points whose type contains one of these (ex. "analog")
+        :param tags: only points having one of these tags (tag id or (tag id, value))
+        :param maxsize: events kept for a slow consumer, oldest are dropped
+        :param batch_size: maximum number of events per batch
+
+        ex.
+            async with bacnet.changes(types=["analog"]) as feed:
+                async for batch in feed:
+                    ...
+        """
+        if self.change_feed is None:
+            self.change_feed = ChangeFeed()
+        return self.change_feed.subscribe(
+            devices=devices,
+            types=types,
+            tags=tags,
+            maxsize=maxsize,
+            batch_size=batch_size,
+        )
+
+    async def export(
+        self,
+        path: str,
+        format: str = "parquet",
+        start: t.Optional[t.Union[datetime, timedelta]] = None,
+        end: t.Optional[datetime] = None,
+        devices: t.Optional[t.Iterable[t.Any]] = None,
+        chunk_size: int = 65536,
+    ) -> int:
+        """
+        Write the histories of the registered devices (or devices) to one
+        file. Devices are written one after the other and samples by chunk
+        of chunk_size rows, so memory doesn't grow with the number of
+        devices (see BAC0.db.export).
+
+        :param format: "parquet" (requires pyarrow) or "csv"
+        :param start: datetime, or timedelta for the last X (ex. 1 day)
+        :param end: datetime, defaults to now
+        :returns: number of samples written
+
+        ex. await bacnet.export("site.parquet", start=timedelta(days=1))
+        """
+        if devices is None:
+            devices = self.registered_devices
+        async with HistoryExport(path, format=format, chunk_size=chunk_size) as export:
+            for device in devices:
+                await export.add_device(device, start, end)
+        self.log(f"{export.rows} samples exported to {path}", level="info")
+        return export.rows
 
     def register_device(
         self, device: t.Union[RPDeviceConnected, RPMDeviceConnected]
     ) -> None:
         oid = id(device)
         self._registered_devices[oid] = device
+        if self.database and self._warm_start:
+            task = asyncio.create_task(
+                self.database.warm_start(device, self._warm_start),
+                name=f"BAC0 warm start {device.properties.name}",
+            )
+            self._warm_starts.add(task)
+            task.add_done_callback(self._warm_start_done)
+
+    def _warm_start_done(self, task: asyncio.Task) -> None:
+        self._warm_starts.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.log(f"{task.get_name()} failed : {task.exception()}", level="error")
 
     async def ping_registered_devices(self) -> None:
         """
@@ -260,43 +420,79 @@ class Lite(
         of disconnected devices, we will disconnect the device (which will save it). Then
         we'll ping again until reconnection, where the device will be bring back online.
 
+        Devices are checked concurrently (ping_concurrency, ping_per_network) and
+        offline devices are probed with exponential backoff and jitter
+        (see BAC0.core.functions.DeviceHealth). bacnet.devices_health gives
+        the state of each device.
+
         To permanently disconnect a device, an explicit device.disconnect(unregister=True [default value])
         will be needed. This way, the device won't be in the registered_devices list and
         BAC0 won't try to ping it.
         """
-        for each in self.registered_devices:
-            if isinstance(each, RPDeviceConnected) or isinstance(
-                each, RPMDeviceConnected
-            ):
-                try:
-                    self._log.debug(
-                        f"Ping {each.properties.name}|{each.properties.address}"
-                    )
-                    await each.ping()
-                    if each.properties.ping_failures > 3:
-                        raise NumerousPingFailures
+        await self.health_monitor.sweep(self.registered_devices, self._check_device)
 
-                except NumerousPingFailures:
-                    self._log.warning(
-                        "{}|{} is offline, disconnecting it.".format(
-                            each.properties.name, each.properties.address
-                        )
-                    )
-                    await each._disconnect(unregister=False)
-
-            else:
-                device_id = each.properties.device_id
-                addr = each.properties.address
-                name = await self.read(f"{addr} device {device_id} objectName")
-                if name == each.properties.name:
-                    each.properties.ping_failures = 0
-                    self._log.info(
-                        "{}|{} is back online, reconnecting.".format(
-                            each.properties.name, each.properties.address
-                        )
+    async def _check_device(
+        self, each: t.Union[RPDeviceConnected, RPMDeviceConnected]
+    ) -> str:
+        """
+        Ping a connected device, try to reconnect a disconnected one.
+        Returns the health state of the device.
+
+        Pings are recorded in the breaker of the device, shared with polling :
+        a connected device is disconnected when its breaker is open.
+        """
+        if isinstance(each, RPDeviceConnected) or isinstance(each, RPMDeviceConnected):
+            self._log.debug(f"Ping {each.properties.name}|{each.properties.address}")
+            if await each.ping():
+                each.breaker.success()
+                return ONLINE
+            each.breaker.failure()
+            if each.breaker.state == OPEN:
+                self._log.warning(
+                    "{}|{} is offline, disconnecting it.".format(
+                        each.properties.name, each.properties.address
                     )
-                    each.connect(network=self)
-                    each.poll(delay=each.properties.pollDelay)
+                )
+                await each._disconnect(unregister=False)
+                return OFFLINE
+            return SUSPECT
+
+        device_id = each.properties.device_id
+        addr = each.properties.address
+        try:
+            name = await self.read(f"{addr} device {device_id} objectName")
+        except NoResponseFromController:
+            return OFFLINE
+        if name != each.properties.name:
+            return OFFLINE
+        each.properties.ping_failures = 0
+        self._log.info(
+            "{}|{} is back online, reconnecting.".format(
+                each.properties.name, each.properties.address
+            )
+        )
+        await each.connect(network=self)
+        each.poll(delay=each.properties.pollDelay)
+        return ONLINE
+
+    @property
+    def devices_health(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        """
+        Health of the registered devices : state (online, suspect, offline),
+        consecutive failures, seconds since last seen and until next check
+        """
+        return self.health_monitor.report(self.registered_devices)
+
+    @property
+    def circuit_breakers(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        """
+        Circuit breaker of each registered device : state (closed, open,
+        half-open) and counters (calls, failures, rejected, opened, probes)
+        """
+        return {
+            str(device.properties.name): device.breaker.stats
+            for device in self.registered_devices
+        }
 
     @property
     def registered_devices(self):
@@ -442,8 +638,13 @@ class Lite(
 
     async def _disconnect(self) -> None:
         self.log("Disconnecting", level="debug")
+        for task in list(self._warm_starts):
+            task.cancel()
         for each in self.registered_devices:
             await each._disconnect()
+        for sink in list(self.sinks):
+            await self.remove_sink(sink)
+        self.disable_live_values()
         await super()._disconnect()
         self._initialized = False
 
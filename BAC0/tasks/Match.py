@@ -55,14 +55,15 @@ class Match(Task):
         ):
             raise NotReadyError(f"{self.command} is not ready")
         try:
-            if self.status.history[-1] != self.command.history[-1]:
-                _val = (
-                    self.command.history[-1].split(":")[1]
-                    if ":" in self.command.history[-1]
-                    else self.command.history[-1]
-                )
+            if self.status.lastValue != self.command.lastValue:
+                # histories hold state codes, binary points are written by text
+                _val = self.command.lastValue
+                if "binary" in self.command.properties.type:
+                    _val = self.command.get_state(_val)
+                elif "multi" in self.command.properties.type:
+                    _val = int(_val)
                 self.log(f"Match value is {_val}", level="debug")
-                await self.status._setitem(_val.replace(" ", ""))
+                await self.status._setitem(_val)
         except (NotReadyError, TypeError) as error:
             self.log(
                 f"Problem executing match value task {self.status.name} -> {self.command.name} : {error}",
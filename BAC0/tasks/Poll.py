@@ -13,6 +13,8 @@ import typing as t
 # --- standard Python modules ---
 import weakref
 
+from ..core.functions.CircuitBreaker import HALF_OPEN, is_communication_error
+from ..core.io.IOExceptions import CircuitOpen
 from ..core.utils.notes import note_and_log
 
 # --- this application's modules ---
@@ -23,10 +25,6 @@ if t.TYPE_CHECKING:
 
 
 # ------------------------------------------------------------------------------
-class MultiplePollingFailures(Exception):
-    pass
-
-
 @note_and_log
 class SimplePoll(Task):
     """
@@ -82,8 +80,6 @@ class DevicePoll(Task):
 
         :returns: Nothing
         """
-        self.failures = 0
-        self.MAX_FAILURES = 3
         self._device = weakref.ref(device)
         Task.__init__(self, name=f"{prefix}_{name}", delay=delay)
         self._counter = 0
@@ -93,68 +89,52 @@ class DevicePoll(Task):
         return self._device()
 
     async def task(self) -> None:
-        if self.device.properties.ping_failures > 0:
-            self.device._log.warning(
-                "{} ({}) | Ping failed, skipping polling for now. Resending a ping to speed up things".format(
-                    self.device.properties.name, self.device.properties.address
-                )
-            )
-            await self.device.ping()
+        breaker = self.device.breaker
+        if not breaker.allow():
+            # device not answering, wait for the next probe
+            return
+        if breaker.state == HALF_OPEN:
+            # a cheap read decides if polling resumes
+            if await self.device.ping():
+                breaker.success()
+            else:
+                breaker.failure()
             return
         try:
-            if self.failures >= self.MAX_FAILURES:
-                raise MultiplePollingFailures(
-                    "{} ({}) | Polling failed numerous times in a row... let see what we can do".format(
-                        self.device.properties.name, self.device.properties.address
-                    )
-                )
-            await self.device.read_multiple(
-                list(self.device.pollable_points_name), points_per_request=25
-            )
-            self._counter += 1
-            if self._counter == self.device.properties.auto_save:
-                self.device.save(resampling=self.device.properties.save_resampling)
-                if self.device.properties.clear_history_on_save:
-                    self.device.clear_histories()
-                self._counter = 0
-            self.failures = 0
-        except AttributeError as e:
-            # This error can be seen when defining a controller on a busy network...
-            # When creation fail, polling is created and fail the first time...
-            # So kill the task
-            self.device._log.error(
-                "{} ({}) | Something is wrong while creating the polling task.\nError: {} | Type : {}".format(
-                    self.device.properties.name,
-                    self.device.properties.address,
-                    e,
-                    type(e),
-                )
-            )
-            # self.stop()
-            self.failures += 1
-        except ValueError as e:
-            self.failures += 1
-            self.device._log.error(
-                "{} ({}) | Polling results contains a wrong value. Probably a communication error. Will skip this result and wait for the next cycle.\nError: {} | Type : {}".format(
-                    self.device.properties.name,
-                    self.device.properties.address,
-                    e,
-                    type(e),
-                )
+            await breaker.call(
+                self.device.read_multiple,
+                list(self.device.pollable_points_name),
+                points_per_request=25,
             )
-            pass
-
-        except MultiplePollingFailures as e:
-            self.device._log.warning(
-                "{} ({}) | Trying to ping device then we'll reset the number of failures and get back with polling\nError: {}| Type : {}".format(
-                    self.device.properties.name,
-                    self.device.properties.address,
-                    e,
-                    type(e),
-                )
-            )
-            if await self.device.ping():
-                self.failures = 0
+        except CircuitOpen:
+            # opened by another request since allow()
+            return
+        except (AttributeError, ValueError) as error:
+            # AttributeError : device still being created (busy network)
+            # ValueError : wrong value in the answer
+            self._failed(error)
+            return
+        except Exception as error:
+            if not is_communication_error(error):
+                raise
+            # counted by the breaker, which logs when it opens
+            self._failed(error)
+            return
+        if self.device.properties.history_files is not None:
+            self.device.properties.history_files.flush()
+        self._counter += 1
+        if self._counter == self.device.properties.auto_save:
+            await self.device.save(resampling=self.device.properties.save_resampling)
+            if self.device.properties.clear_history_on_save:
+                self.device.clear_histories()
+            self._counter = 0
+
+    def _failed(self, error: Exception) -> None:
+        self.device._log.warning(
+            f"{self.device.properties.name} ({self.device.properties.address}) | "
+            f"Polling failed, next try at the next cycle ({type(error).__name__}: "
+            f"{error})"
+        )
 
 
 @note_and_log
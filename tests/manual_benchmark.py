@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding utf-8 -*-
+
+"""
+Startup benchmark
+
+Measures, on the loopback interface :
+    - import BAC0
+    - BAC0.start() until the application is ready
+    - connection to a device hosting 100, 1000 and 5000 objects
+    - polling throughput (points per second) on the same devices
+
+Usage ::
+
+    python tests/manual_benchmark.py --output bench.json
+    python tests/manual_benchmark.py --sizes 100 1000 --budget budget.json
+
+Results are written to a JSON file. When a budget file is given (a JSON
+dict using the same keys as the results), the script exits with code 1 if
+a duration is longer than its budget or a throughput (keys ending with
+"_per_s") is lower than its budget.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_CODE = (
+    "import time; t = time.perf_counter(); import BAC0; "
+    "print(time.perf_counter() - t)"
+)
+
+# Types used for the stand-in devices, objects are spread evenly
+OBJECT_TYPES = (
+    "analogInput",
+    "analogValue",
+    "binaryInput",
+    "binaryValue",
+    "multiStateValue",
+)
+
+
+def measure_import(runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_CODE],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(results)
+
+
+def definitions(size):
+    return [
+        {
+            "name": f"BENCH-{OBJECT_TYPES[i % len(OBJECT_TYPES)]}-{i}",
+            "objectType": OBJECT_TYPES[i % len(OBJECT_TYPES)],
+            "instance": i,
+            "presentValue": 1,
+        }
+        for i in range(size)
+    ]
+
+
+async def measure_device(bacnet, size, port, cycles):
+    import BAC0
+    from BAC0.core.devices.local.factory import ObjectFactory
+
+    results = {}
+    async with BAC0.start(
+        ip="127.0.0.1/24", port=port, localObjName=f"bench_{size}"
+    ) as device_app:
+        ObjectFactory.clear_objects()
+        t = time.perf_counter()
+        ObjectFactory.bulk_create(definitions(size), app=device_app)
+        results[f"create_objects_{size}_s"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        dev = await BAC0.device(
+            f"127.0.0.1:{port}", device_app.Boid, bacnet, poll=0
+        )
+        results[f"connect_{size}_s"] = time.perf_counter() - t
+
+        points = list(dev.pollable_points_name)
+        t = time.perf_counter()
+        for _ in range(cycles):
+            await dev.read_multiple(points, points_per_request=25)
+        elapsed = time.perf_counter() - t
+        results[f"poll_{size}_points_per_s"] = len(points) * cycles / elapsed
+
+        await dev._disconnect(save_on_disconnect=False)
+    ObjectFactory.clear_objects()
+    return results
+
+
+async def measure_network(sizes, cycles):
+    import BAC0
+
+    BAC0.log_level("silence")
+    results = {}
+    t = time.perf_counter()
+    bacnet = BAC0.start(ip="127.0.0.1/24", localObjName="bench")
+    async with bacnet:
+        results["app_start_s"] = time.perf_counter() - t
+        for port, size in enumerate(sizes, start=47809):
+            results.update(await measure_device(bacnet, size, port, cycles))
+    return results
+
+
+def check_budget(results, budget):
+    failures = []
+    for key, limit in budget.items():
+        if key not in results:
+            continue
+        value = results[key]
+        if key.endswith("_per_s"):
+            if value < limit:
+                failures.append(f"{key} : {value:.3f} < {limit}")
+        elif value > limit:
+            failures.append(f"{key} : {value:.3f} > {limit}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BAC0 startup benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--import-runs", type=int, default=5)
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--budget", default=None)
+    args = parser.parse_args()
+
+    results = {"import_s": measure_import(args.import_runs)}
+    results.update(asyncio.run(measure_network(args.sizes, args.cycles)))
+
+    import BAC0
+
+    report = {
+        "meta": {
+            "bac0": BAC0.version,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    for key, value in results.items():
+        print(f"{key:35} {value:12.3f}")
+
+    if args.budget:
+        with open(args.budget) as file:
+            failures = check_budget(results, json.load(file))
+        if failures:
+            print("Budget exceeded :")
+            print("\n".join(failures))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
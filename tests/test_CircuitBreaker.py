@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding utf-8 -*-
+from types import SimpleNamespace
+
+import pytest
+
+from BAC0.core.devices.mixins.read_mixin import ReadProperty
+from BAC0.core.functions.CircuitBreaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+)
+from BAC0.core.io.IOExceptions import (
+    CircuitOpen,
+    NoResponseFromController,
+    UnknownObjectError,
+)
+from BAC0.tasks.Poll import DevicePoll
+
+"""
+Test the circuit breaker of devices
+"""
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_probes():
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10)
+    calls = []
+
+    async def dead():
+        calls.append(1)
+        raise NoResponseFromController()
+
+    async def alive():
+        calls.append(1)
+        return 42
+
+    for _ in range(2):
+        with pytest.raises(NoResponseFromController):
+            await breaker.call(dead)
+    assert breaker.state == OPEN and breaker.is_open
+    # no request sent while open
+    with pytest.raises(CircuitOpen):
+        await breaker.call(alive)
+    assert len(calls) == 2 and breaker.metrics["rejected"] == 1
+
+    # wait is over : one probe, failing doubles the wait
+    breaker._retry_at = 0
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.failure()
+    assert breaker.state == OPEN
+    assert breaker.stats["next_probe"] > 10
+
+    breaker._retry_at = 0
+    assert await breaker.call(alive) == 42
+    assert breaker.state == CLOSED and breaker.failures == 0
+    assert [new for _, _, new in breaker.transitions] == [
+        OPEN,
+        HALF_OPEN,
+        OPEN,
+        HALF_OPEN,
+        CLOSED,
+    ]
+    assert breaker.metrics["opened"] == 2 and breaker.metrics["probes"] == 2
+
+
+@pytest.mark.asyncio
+async def test_device_errors_keep_breaker_closed():
+    breaker = CircuitBreaker(threshold=1)
+
+    async def unknown():
+        raise UnknownObjectError("analogInput 99")
+
+    with pytest.raises(UnknownObjectError):
+        await breaker.call(unknown)
+    assert breaker.state == CLOSED
+
+
+class _RPDevice(object):
+    """
+    Device answering (or not) to ReadProperty only
+    """
+
+    def __init__(self, answers):
+        self.properties = SimpleNamespace(name="rp", address="2:5")
+        self.trended = []
+        self._answers = answers
+
+    def _rpm_request_by_name(self, points_list):
+        points = [SimpleNamespace(_trend=self.trended.append) for _ in points_list]
+        return points_list, points
+
+    async def _read_single(self, request):
+        if not self._answers:
+            raise NoResponseFromController()
+        return 1.0
+
+
+@pytest.mark.asyncio
+async def test_read_property_poll_opens_breaker():
+    breaker = CircuitBreaker(threshold=2)
+    dead = _RPDevice(answers=False)
+    for _ in range(2):
+        with pytest.raises(NoResponseFromController):
+            await breaker.call(ReadProperty.read_multiple, dead, ["a", "b"])
+    assert breaker.state == OPEN
+
+    alive = _RPDevice(answers=True)
+    breaker._retry_at = 0
+    await breaker.call(ReadProperty.read_multiple, alive, ["a", "b"])
+    assert breaker.state == CLOSED and alive.trended == [1.0, 1.0]
+
+
+class _PolledDevice(object):
+    def __init__(self):
+        self.properties = SimpleNamespace(
+            name="dead", address="2:6", history_files=None, auto_save=False
+        )
+        self.breaker = CircuitBreaker(self, threshold=2)
+        self.pollable_points_name = ["a"]
+        self.reads = 0
+        self.warnings = []
+        self._log = SimpleNamespace(warning=self.warnings.append)
+
+    async def read_multiple(self, points_list, *, points_per_request=1):
+        self.reads += 1
+        raise NoResponseFromController()
+
+
+@pytest.mark.asyncio
+async def test_poll_failures_go_to_breaker():
+    device = _PolledDevice()
+    poll = DevicePoll(device, delay=10, name="dead")
+    for _ in range(3):
+        # no exception left to the task manager, one warning per cycle
+        await poll.task()
+    assert device.breaker.state == OPEN
+    assert device.reads == 2 and len(device.warnings) == 2
+    assert "Polling failed" in device.warnings[0]
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding utf-8 -*-
+import asyncio
+from types import SimpleNamespace
+from typing import AsyncGenerator
+
+import pytest
+
+from BAC0.core.functions.CircuitBreaker import CLOSED, OPEN
+from BAC0.core.functions.DeviceHealth import (
+    OFFLINE,
+    ONLINE,
+    SUSPECT,
+    HealthMonitor,
+)
+
+"""
+Test health checks of registered devices
+"""
+
+
+def _device(name, address):
+    return SimpleNamespace(properties=SimpleNamespace(name=name, address=address))
+
+
+def test_backoff():
+    monitor = HealthMonitor(delay=10, max_backoff=60)
+    for failures, delay in ((1, 10), (2, 20), (3, 40), (4, 60), (10, 60)):
+        for _ in range(20):
+            assert delay / 2 <= monitor.backoff(failures) <= delay
+
+
+@pytest.mark.asyncio
+async def test_sweep_limits_and_states():
+    monitor = HealthMonitor(delay=10, concurrency=4, per_network=2)
+    devices = [_device(f"mstp{i}", f"2:{i}") for i in range(6)] + [
+        _device(f"ip{i}", f"10.0.0.{i}") for i in range(6)
+    ]
+    running = {"all": 0, "max": 0, "net2": 0, "max_net2": 0}
+
+    async def probe(device):
+        remote = device.properties.address.startswith("2:")
+        running["all"] += 1
+        running["net2"] += remote
+        running["max"] = max(running["max"], running["all"])
+        running["max_net2"] = max(running["max_net2"], running["net2"])
+        await asyncio.sleep(0.01)
+        running["all"] -= 1
+        running["net2"] -= remote
+        if device.properties.name == "ip0":
+            return OFFLINE
+        if device.properties.name == "ip1":
+            raise RuntimeError("no route")
+        return ONLINE
+
+    await monitor.sweep(devices, probe)
+    assert running["max"] == 4
+    assert running["max_net2"] == 2
+    report = monitor.report(devices)
+    assert report["mstp0"]["state"] == ONLINE
+    assert report["ip0"]["state"] == OFFLINE
+    assert report["ip0"]["next_check"] >= 5
+    assert report["ip1"]["state"] == SUSPECT
+
+    # offline devices wait for their backoff, the others are checked again
+    due = monitor.due(devices)
+    assert devices[6] not in due and len(due) == 11
+    # health of unregistered devices is dropped
+    monitor.due(devices[:2])
+    assert len(monitor.report(devices[:2])) == 2 and len(monitor._health) == 2
+
+
+@pytest.mark.asyncio
+async def test_busy_network_does_not_block_others():
+    # more devices on one remote network than global slots
+    monitor = HealthMonitor(delay=10, concurrency=2, per_network=1)
+    devices = [_device(f"mstp{i}", f"2:{i}") for i in range(4)] + [
+        _device(f"ip{i}", f"10.0.0.{i}") for i in range(2)
+    ]
+    started = []
+
+    async def probe(device):
+        started.append(device.properties.name)
+        await asyncio.sleep(0.01)
+        return ONLINE
+
+    await monitor.sweep(devices, probe)
+    # local devices are checked while the trunk is busy, not after it
+    assert started.index("ip1") < started.index("mstp2")
+
+
+def test_backoff_starts_when_offline():
+    monitor = HealthMonitor(delay=10, max_backoff=3600)
+    device = _device("dev", "10.0.0.1")
+    for _ in range(4):
+        monitor.record(device, SUSPECT)
+    health = monitor.record(device, OFFLINE)
+    assert health.failures == 5 and health.probes == 1
+    assert 5 <= health.stats["next_check"] <= 10
+    health = monitor.record(device, OFFLINE)
+    assert health.probes == 2 and 10 <= health.stats["next_check"] <= 20
+    monitor.record(device, ONLINE)
+    assert monitor.record(device, OFFLINE).probes == 1
+
+
+@pytest.mark.asyncio
+async def test_checks_share_the_breaker(
+    network_and_devices: AsyncGenerator, monkeypatch
+):
+    async for resources in network_and_devices:
+        loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
+        answers = []
+        disconnected = []
+
+        async def ping():
+            return answers.pop(0)
+
+        async def disconnect(*args, **kwargs):
+            disconnected.append(kwargs)
+
+        monkeypatch.setattr(test_device, "ping", ping)
+        monkeypatch.setattr(test_device, "_disconnect", disconnect)
+        breaker = test_device.breaker
+        try:
+            # a failed poll and a failed ping count in the same breaker
+            breaker.failure()
+            answers.extend([False, True, False, False, False])
+            assert await bacnet._check_device(test_device) == SUSPECT
+            assert breaker.failures == 2
+            assert await bacnet._check_device(test_device) == ONLINE
+            assert breaker.state == CLOSED and breaker.failures == 0
+            states = [await bacnet._check_device(test_device) for _ in range(3)]
+            assert states == [SUSPECT, SUSPECT, OFFLINE]
+            assert breaker.state == OPEN and disconnected == [{"unregister": False}]
+        finally:
+            breaker.reset()
@@ -0,0 +1,16 @@
+#!/usr/bin/env python
+# -*- coding utf-8 -*-
+
+"""
+Test that optional heavy dependencies are loaded on first use only
+"""
+import subprocess
+import sys
+
+
+def test_import_does_not_load_pandas():
+    code = "import sys, BAC0; print('pandas' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip().splitlines()[-1] == "False"
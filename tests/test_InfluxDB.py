@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding utf-8 -*-
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from BAC0.core.devices.Points import BooleanPoint, NumericPoint
+
+# influxdb_client and aiohttp
+influxdb = pytest.importorskip("BAC0.db.influxdb")
+
+"""
+Test histories read back from InfluxDB (warm start)
+"""
+
+
+class _Record(object):
+    def __init__(self, _object, timestamp, value):
+        self.values = {"object": _object}
+        self._timestamp = timestamp
+        self._value = value
+
+    def get_time(self):
+        return self._timestamp
+
+    def get_value(self):
+        return self._value
+
+
+def _device():
+    device = SimpleNamespace(
+        properties=SimpleNamespace(
+            name="RTU 1",
+            device_id=5,
+            history_files=None,
+            network=SimpleNamespace(live_values=None, change_feed=None),
+        ),
+        binary_states={},
+        multi_states={},
+    )
+    device.points = [
+        NumericPoint(
+            device=device,
+            pointType="analogInput",
+            pointAddress=1,
+            pointName="ZN-T",
+            description="",
+            units_state="degreesCelsius",
+        ),
+        BooleanPoint(
+            device=device,
+            pointType="binaryValue",
+            pointAddress=2,
+            pointName="FAN",
+            description="",
+            units_state=("off", "on"),
+        ),
+    ]
+    return device
+
+
+@pytest.mark.asyncio
+async def test_warm_start():
+    start = datetime(2024, 6, 10, 6, 0, tzinfo=timezone.utc)
+    records = [
+        _Record("analogInput:1", start, 21.0),
+        _Record("binaryValue:2", start, 1),
+        _Record("analogInput:1", start + timedelta(minutes=1), 21.5),
+        # object that is not a point of the device
+        _Record("analogValue:9", start, 3.0),
+    ]
+    queries = []
+
+    async def query(flux):
+        queries.append(flux)
+        for record in records:
+            yield record
+
+    database = influxdb.InfluxDB({"bucket": "BAC0"})
+    database.query = query
+    device = _device()
+
+    series = await database.read_history(device, timedelta(hours=2))
+    assert '"device_id"] == "5"' in queries[0] and "start: -7200s" in queries[0]
+    timestamps, values = series["analogInput:1"]
+    assert values == [21.0, 21.5]
+    assert timestamps[1] == start + timedelta(minutes=1)
+    assert timestamps[1].tzinfo is not None
+
+    assert await database.warm_start(device, 2) == 3
+    temp, fan = device.points
+    assert temp._history.value == [21.0, 21.5]
+    assert fan._history.value == [1]
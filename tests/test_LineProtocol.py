@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding utf-8 -*-
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from BAC0.core.devices.Points import BooleanPoint, EnumPoint, NumericPoint
+from BAC0.db.line_protocol import LineBuffer, encode
+
+"""
+Test InfluxDB line protocol encoding
+"""
+
+TIMESTAMP = datetime(2024, 6, 10, 6, 13, 20, 500000, tzinfo=timezone.utc)
+
+
+def _device():
+    return SimpleNamespace(
+        properties=SimpleNamespace(name="RTU 1", device_id=5),
+        binary_states={},
+        multi_states={},
+    )
+
+
+def test_analog_line():
+    point = NumericPoint(
+        device=_device(),
+        pointType="analogInput",
+        pointAddress=1,
+        pointName="ZN-T",
+        description="Zone temp, room=101",
+        units_state="degreesCelsius",
+    )
+    assert encode(point, 21.5, TIMESTAMP) == (
+        "Device_5/analogInput:1,description=Zone\\ temp\\,\\ room\\=101,"
+        "device=RTU\\ 1,device_id=5,name=RTU\\ 1/ZN-T,object=analogInput:1,"
+        "object_name=ZN-T,units_state=degreesCelsius "
+        'value=21.5,string_value="21.500 degreesCelsius" 1718000000500000000'
+    )
+    assert encode(point, float("nan"), TIMESTAMP) is None
+
+    # the key is kept until tags change
+    key = point._series_key
+    encode(point, 22.0, TIMESTAMP)
+    assert point._series_key is key
+    point.tag("site", "north")
+    assert ",site=north," in encode(point, 22.0, TIMESTAMP)
+    assert point._series_key is not key
+
+
+def test_state_lines():
+    switch = BooleanPoint(
+        device=_device(),
+        pointType="binaryValue",
+        pointAddress=2,
+        pointName="FAN",
+        description="",
+        units_state=("off", "on"),
+    )
+    mode = EnumPoint(
+        device=_device(),
+        pointType="multiStateValue",
+        pointAddress=3,
+        pointName="MODE",
+        description="",
+        units_state=["Occupied", "Unoccupied"],
+    )
+    buffer = LineBuffer()
+    buffer.append(switch, 1, TIMESTAMP)
+    buffer.append(mode, 2, TIMESTAMP)
+    buffer.append(mode, 7, TIMESTAMP)
+    buffer.append(mode, None, TIMESTAMP)
+    lines = buffer.getvalue().split("\n")
+    assert len(buffer) == len(lines) == 3
+    assert 'value=1i,string_value="active"' in lines[0]
+    assert 'value=2i,string_value="Unoccupied"' in lines[1]
+    assert 'value=7i,string_value="n/a"' in lines[2]
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding utf-8 -*-
+
+"""
+Test batch update of local objects
+"""
+import pytest
+
+from BAC0.core.devices.local.factory import ObjectFactory, trendlog
+from BAC0.core.io.IOExceptions import UnknownObjectError
+
+
+@pytest.mark.asyncio
+async def test_update_many(network_and_devices):
+    async for resources in network_and_devices:
+        loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
+        local = device_app.local_objects
+        av = local["AV"]
+        assert local[("analogValue", av.objectIdentifier[1])] is av
+        assert local[("analog-value", av.objectIdentifier[1])] is av
+
+        local.update_many({"AV": 42.0, "AV-1": 43.0})
+        assert local["AV"].presentValue == 42.0
+        assert local["AV-1"].presentValue == 43.0
+
+        with pytest.raises(UnknownObjectError):
+            local.update_many({"AV": 1.0, "NOT-THERE": 2.0})
+        # nothing is written when an object is unknown
+        assert local["AV"].presentValue == 42.0
+
+
+@pytest.mark.asyncio
+async def test_update_many_feeds_trendlog(network_and_devices):
+    async for resources in network_and_devices:
+        loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
+        local = device_app.local_objects
+        trendlog(name="TL-AV", instance=901)
+        tl = ObjectFactory.objects["TL-AV"]
+        local.link_trendlog(tl, "AV")
+
+        local.update_many({"AV": 12.0}, trend=True)
+        local.update_many({"AV": 13.0}, trend=True)
+        assert tl.recordCount == 2
+        assert tl.logBuffer[-1].logDatum.realValue == 13.0
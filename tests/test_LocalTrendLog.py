@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding utf-8 -*-
+
+"""
+Test local trendLog buffer maintenance
+"""
+from datetime import datetime, timedelta
+
+from BAC0.core.devices.local.factory import ObjectFactory, trendlog
+
+START = datetime(2024, 1, 1, 0, 0, 0)
+
+
+def _local_trendlog(name):
+    trendlog(name=name, instance=900)
+    return ObjectFactory.objects[name]
+
+
+def test_add_data_keeps_buffer_bounded():
+    obj = _local_trendlog("TL-BOUNDED")
+    for i in range(300):
+        obj._local.add_data(START + timedelta(seconds=i), float(i), interval=1)
+    # duplicated timestamp is ignored
+    obj._local.add_data(START + timedelta(seconds=299), 0.0, interval=1)
+
+    assert len(obj.logBuffer) == 250
+    assert obj.recordCount == 250
+    assert obj.totalRecordCount == 300
+    assert obj.logBuffer[0].logDatum.realValue == 50.0
+    assert obj.logBuffer[-1].logDatum.realValue == 299.0
+
+
+def test_add_many():
+    obj = _local_trendlog("TL-MANY")
+    obj._local.add_many(
+        [(START + timedelta(seconds=i), float(i)) for i in range(10)], interval=1
+    )
+    obj._local.add_data(START + timedelta(seconds=10), 10.0, interval=1)
+    assert len(obj.logBuffer) == 11
+    assert [each.logDatum.realValue for each in obj.logBuffer] == [
+        float(i) for i in range(11)
+    ]
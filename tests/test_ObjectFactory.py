@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding utf-8 -*-
+
+"""
+Test bulk creation of local objects
+"""
+import io
+
+from BAC0.core.devices.local.factory import ObjectFactory
+
+
+def test_bulk_create_from_list():
+    objects = ObjectFactory.bulk_create(
+        [
+            {
+                "name": "BULK-AV-{}".format(i),
+                "objectType": "analogValue",
+                "instance": 2000 + i,
+                "presentValue": float(i),
+                "properties": {"units": "degreesCelsius"},
+            }
+            for i in range(20)
+        ]
+    )
+    assert len(objects) == 20
+    assert objects["BULK-AV-3"].presentValue == 3.0
+    assert objects["BULK-AV-3"].objectIdentifier[1] == 2003
+    assert type(objects["BULK-AV-3"]) is type(objects["BULK-AV-4"])
+
+
+def test_bulk_create_from_csv():
+    data = (
+        "name,objectType,instance,presentValue,is_commandable,properties\n"
+        'BULK-AO,analogOutput,,3.5,true,"{""units"": ""percent""}"\n'
+        "BULK-BV,binaryValue,2100,active,,\n"
+    )
+    objects = ObjectFactory.bulk_create(io.StringIO(data), format="csv")
+    assert objects["BULK-AO"].presentValue == 3.5
+    assert objects["BULK-BV"].objectIdentifier[1] == 2100
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding utf-8 -*-
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from bacpypes3.basetypes import BinaryPV
+
+from BAC0.core.devices.Points import BooleanPoint, NumericPoint
+
+"""
+Test point histories : recording policies and tiered retention
+"""
+
+
+def _device():
+    return SimpleNamespace(
+        properties=SimpleNamespace(
+            name="dev",
+            network=SimpleNamespace(
+                database=None, live_values=None, change_feed=None
+            ),
+            history_files=None,
+        ),
+        binary_states={},
+        multi_states={},
+    )
+
+
+def _point(cls, **kwargs):
+    return cls(
+        device=_device(),
+        pointType="analogValue" if cls is NumericPoint else "binaryValue",
+        pointAddress=1,
+        pointName="point",
+        description="",
+        **kwargs,
+    )
+
+
+def test_deadband_and_heartbeat():
+    point = _point(NumericPoint, units_state="degreesCelsius")
+    point.properties.bacnet_properties["covIncrement"] = 0.5
+    policy = point.set_recording_policy(heartbeat=60)
+    assert policy.deadband == 0.5
+
+    for value in (20.0, 20.1, 20.4, 20.6, 20.6, 19.9):
+        point._trend(value)
+    assert point._history.value == [20.0, 20.6, 19.9]
+
+    # heartbeat records an unchanged value
+    point._history.timestamp[-1] -= timedelta(seconds=61)
+    point._trend(19.9)
+    assert point._history.value == [20.0, 20.6, 19.9, 19.9]
+
+    point.clear_recording_policy()
+    point._trend(19.9)
+    assert len(point._history.value) == 5
+
+
+def test_change_only():
+    point = _point(BooleanPoint, units_state=("off", "on"))
+    point.set_recording_policy()
+    active, inactive = BinaryPV.active, BinaryPV.inactive
+    for value in (inactive, inactive, active, active, inactive):
+        point._trend(value)
+    assert point._history.value == [0, 1, 0]
+
+
+def test_tiered_retention(monkeypatch):
+    import BAC0.core.devices.Points as Points
+
+    start = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    clock = [start]
+
+    class _Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock[0]
+
+    monkeypatch.setattr(Points, "datetime", _Clock)
+    point = _point(NumericPoint, units_state="degreesCelsius")
+    point.set_retention(raw=120, hour=None)
+    # 3 samples per minute during 5 minutes, recorded as the poller does
+    for i in range(15):
+        clock[0] = start + timedelta(seconds=20 * i)
+        point._trend(float(i))
+
+    minute = point.history_at("minute")
+    assert list(minute.index) == [start + timedelta(minutes=m) for m in range(5)]
+    assert list(minute["min"]) == [0, 3, 6, 9, 12]
+    assert list(minute["max"]) == [2, 5, 8, 11, 14]
+    assert list(minute["mean"]) == [1, 4, 7, 10, 13]
+    assert list(minute["last"]) == [2, 5, 8, 11, 14]
+
+    hour = point.history_at("hour")
+    assert len(hour) == 1 and hour["mean"].iloc[0] == 7
+
+    # raw samples older than 120 s are trimmed
+    assert point._history.timestamp[0] == start + timedelta(seconds=160)
+
+    # a late sample is merged into its bucket, a missing bucket is inserted
+    tier = point._history.tiers["minute"]
+    tier.add(start + timedelta(minutes=1, seconds=30), -3.0)
+    tier.add(start - timedelta(minutes=2), 50.0)
+    minute = point.history_at("minute")
+    assert list(minute.index) == [
+        start + timedelta(minutes=m) for m in (-2, 0, 1, 2, 3, 4)
+    ]
+    assert list(minute["min"])[:3] == [50, 0, -3]
+    assert list(minute["mean"])[:3] == [50, 1, 2.25]
+    assert list(minute["last"])[:3] == [50, 2, 5]
+
+
+def test_history_range():
+    point = _point(NumericPoint, units_state="degreesCelsius")
+    start = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    point._history.timestamp = [start + timedelta(minutes=i) for i in range(60)]
+    point._history.value = [float(i) for i in range(60)]
+
+    his = point.history_range(
+        start + timedelta(minutes=10), start + timedelta(minutes=14)
+    )
+    assert list(his) == [10.0, 11.0, 12.0, 13.0, 14.0]
+    assert len(point.history_range(start=start + timedelta(minutes=55))) == 5
+    assert len(point.history_range(end=start - timedelta(minutes=1))) == 0
+    # last X
+    assert len(point.history_range(timedelta(minutes=15))) == 0
+
+
+def test_change_feed():
+    from BAC0.core.functions.ChangeFeed import ChangeFeed
+
+    point = _point(NumericPoint, units_state="degreesCelsius")
+    switch = _point(BooleanPoint, units_state=("off", "on"))
+    feed = ChangeFeed()
+    for each in (point, switch):
+        each.properties.device.properties.network.change_feed = feed
+    analog = feed.subscribe(types=["analog"], maxsize=3, batch_size=2)
+    everything = feed.subscribe()
+
+    for value in (1.0, 2.0, 3.0, 4.0):
+        point._trend(value)
+    switch._trend(BinaryPV.active)
+
+    # oldest event dropped, switch filtered out
+    assert analog.stats == {"received": 4, "dropped": 1, "pending": 3}
+    assert [event.value for event in analog.get_nowait()] == [2.0, 3.0]
+    assert [event.value for event in analog.get_nowait()] == [4.0]
+    assert everything.get_nowait()[-1].point is switch
+
+    analog.close()
+    assert feed.subscribers == [everything]
+
+
+def test_load_history():
+    point = _point(NumericPoint, units_state="degreesCelsius")
+    point.set_retention(minute=None)
+    now = datetime.now().astimezone()
+    point._trend(22.0)
+    older = [now - timedelta(minutes=m) for m in (30, 20, 10)]
+    # the last one is newer than the sample in memory
+    timestamps = older + [now + timedelta(seconds=5)]
+    assert point.load_history(timestamps, [19, 20, 21, 23]) == 3
+    assert point._history.value == [19, 20, 21, 22.0]
+    assert point.history_range(now - timedelta(minutes=25)).tolist() == [20, 21, 22.0]
+
+    empty = _point(NumericPoint, units_state="degreesCelsius", history_size=2)
+    empty.set_retention()
+    assert empty.load_history(older, [19, 20, 21]) == 3
+    assert empty._history.value == [20, 21]
+    assert len(empty.history_at("minute")) == 3
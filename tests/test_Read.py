@@ -32,6 +32,8 @@ async def test_ReadAnalog(network_and_devices: AsyncGenerator):
         assert (test_device["AI"].lastValue - CHANGE_DELTA_AI) < TOLERANCE
         await test_device["AO"].value
         assert (test_device["AO"].lastValue - CHANGE_DELTA_AO) < TOLERANCE
+        # answer times are learned from the reads
+        assert test_device.round_trip_time["samples"] >= 3
 
         # assert test_device["CS_VALUE"] == CHARACTERSTRINGVALUE
 
@@ -49,3 +51,18 @@ async def test_ReadBinary(network_and_devices: AsyncGenerator):
 
         assert test_device["BO"] == BINARY_TEST_STATE_STR2
         assert test_device["BO-1"] == BINARY_TEST_STATE_BOOL
+
+
+@pytest.mark.asyncio
+async def test_StateHistoryCodes(network_and_devices: AsyncGenerator):
+    async for resources in network_and_devices:
+        loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
+        await test_device["BIG-ALARM"].value
+        assert test_device["BIG-ALARM"]._history.value[-1] == 1
+        assert test_device["BIG-ALARM"] == "1: Normal"
+        assert test_device["BIG-ALARM"] == 1
+
+        await test_device["BI"].value
+        assert test_device["BI"]._history.value[-1] == 0
+        assert test_device["BI"] == "inactive"
+        assert test_device["BI"] == "0: inactive"
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding utf-8 -*-
+import asyncio
+
+import pytest
+
+from BAC0.core.io.IOExceptions import NoResponseFromController
+from BAC0.core.io.RoundTrip import RoundTripTime, RoundTripTimes
+
+"""
+Test timeouts and retries learned from answer times
+"""
+
+
+def test_rto_follows_answer_times():
+    fast = RoundTripTime()
+    for _ in range(20):
+        fast.update(0.005)
+    # fast devices : shortest wait, many attempts fit in the budget
+    assert fast.rto == 0.5
+    assert fast.attempts(budget=10, max_attempts=3) == 3
+
+    slow = RoundTripTime()
+    for rtt in (0.8, 1.9, 0.4, 1.5, 2.0, 0.6) * 3:
+        slow.update(rtt)
+    assert slow.srtt == pytest.approx(1.2, abs=0.4)
+    assert slow.rto > 2.0
+    assert slow.attempts(budget=10, max_attempts=3) < 3
+
+    fast.timeout()
+    assert fast.rto == 1.0 and fast.timeouts == 1
+
+
+@pytest.mark.asyncio
+async def test_request_retries_then_gives_up():
+    times = RoundTripTimes(initial_rto=0.05, min_rto=0.05, budget=1)
+    calls = []
+
+    async def lost_once(value):
+        calls.append(value)
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+        return value
+
+    assert await times.request("2:5", lost_once, 42) == 42
+    stats = times.stats("2:5")
+    assert len(calls) == 2 and stats["timeouts"] == 1 and stats["samples"] == 1
+
+    async def dead():
+        raise NoResponseFromController()
+
+    with pytest.raises(NoResponseFromController):
+        await times.request("10.0.0.2:47808", dead)
+    assert times.stats("10.0.0.2")["timeouts"] >= 2
@@ -4,8 +4,9 @@
 """
 Test Bacnet communication with another device
 """
-import asyncio
 import os.path
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 
 import pytest
 
@@ -18,15 +19,25 @@ async def test_SaveToSQL(network_and_devices):
     async for resources in network_and_devices:
         loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
         # test_device_300 = network_and_devices.test_device_300
-        test_device.save()
-        test_device_30.save(filename="obj30.db")
-        await asyncio.sleep(2)
+        await test_device["AV"].value
+        await test_device.save()
+        await test_device_30.save(filename="obj30.db")
         # test_device_300.save(filename="obj300")
         assert os.path.isfile("{}.db".format(test_device.properties.db_name))
         assert os.path.isfile("{}.db".format("obj30"))
         # assert os.path.isfile("{}.db".format("obj300"))
 
 
+@pytest.mark.asyncio
+async def test_df_async(network_and_devices):
+    async for resources in network_and_devices:
+        loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
+        await test_device["AV"].value
+        df = await test_device.df_async(["AV", "BV"], force_read=False)
+        assert list(df.columns) == ["AV", "BV"]
+        assert len(df["AV"].dropna()) >= 1
+
+
 # @pytest.mark.skip(reason="Need more work")
 @pytest.mark.asyncio
 async def test_disconnection_of_device(network_and_devices):
@@ -43,3 +54,426 @@ async def test_disconnection_of_device(network_and_devices):
         await test_device_30.connect(network=bacnet)
         assert isinstance(test_device, BAC0.core.devices.Device.RPMDeviceConnected)
         assert isinstance(test_device_30, BAC0.core.devices.Device.RPMDeviceConnected)
+
+
+@pytest.mark.asyncio
+async def test_HistoryFiles(network_and_devices, tmp_path):
+    from BAC0.db.history_files import HistoryFiles
+
+    async for resources in network_and_devices:
+        loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
+        path = str(tmp_path / f"Device_{test_device.properties.device_id}")
+        files = test_device.properties.history_files = HistoryFiles(path)
+        files.register_points(test_device.points)
+        try:
+            await test_device["AV"].value
+            await test_device["BI"].value
+            his = test_device["AV"].history_range(from_disk=True)
+            recent = test_device["AV"].history_range(
+                timedelta(minutes=5), from_disk=True
+            )
+        finally:
+            files.close()
+            test_device.properties.history_files = None
+        assert len(his) >= 1 and list(recent) == list(his)
+        assert his.iloc[-1] == pytest.approx(test_device["AV"]._history.value[-1])
+
+        offline = await BAC0.device(from_backup=path)
+        assert offline.properties.name == test_device.properties.name
+        points = {str(point.properties.name): point for point in offline.points}
+        # every stored point is in the index, written once at registration
+        assert {"AV", "BI"} <= set(points)
+        assert list(points["AV"].history) == list(his)
+        assert points["BI"].history.iloc[-1] == 0
+
+
+def test_history_files_after_crash(tmp_path):
+    from BAC0.db.history_files import HistoryFiles
+
+    device = SimpleNamespace(
+        properties=SimpleNamespace(
+            name="dev",
+            address="2:5",
+            device_id=5,
+            vendor_id=0,
+            pollDelay=10,
+            multistates={},
+            history_size=None,
+        )
+    )
+    point = SimpleNamespace(
+        properties=SimpleNamespace(
+            name="ZN-T",
+            type="analogInput",
+            address=1,
+            description="",
+            units_state="degreesCelsius",
+            device=device,
+        )
+    )
+    start = datetime(2024, 6, 10, tzinfo=timezone.utc)
+    files = HistoryFiles(str(tmp_path))
+    for i in range(3):
+        files.append(point, start + timedelta(minutes=i), float(i))
+    files.flush()
+    # crash : the values of a cycle were written, not their timestamps
+    with open(tmp_path / "0.val", "ab") as file:
+        file.write(bytes(8 * 2 + 3))
+    assert list(files.columns("ZN-T")[1]) == [0.0, 1.0, 2.0]
+
+    # after a restart, columns are aligned before new samples are added
+    files = HistoryFiles(str(tmp_path))
+    files.append(point, start + timedelta(minutes=3), 3.0)
+    files.close()
+    stamps, values = files.columns("ZN-T")
+    assert list(values) == [0.0, 1.0, 2.0, 3.0] and len(stamps) == 4
+    assert os.path.getsize(tmp_path / "0.val") == os.path.getsize(tmp_path / "0.ts")
+
+
+@pytest.mark.asyncio
+async def test_LiveValues(network_and_devices):
+    import subprocess
+    import sys
+    from multiprocessing import shared_memory
+
+    from BAC0.db.live_values import (
+        _HEADER,
+        MAGIC,
+        VERSION,
+        LiveValueReader,
+        LiveValueTable,
+    )
+
+    async for resources in network_and_devices:
+        loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
+        name = f"BAC0_test_{os.getpid()}"
+        # block left behind by a crashed process
+        dead = subprocess.run(
+            [sys.executable, "-c", "import os; print(os.getpid())"],
+            capture_output=True,
+            text=True,
+        )
+        stale = shared_memory.SharedMemory(name=name, create=True, size=64)
+        _HEADER.pack_into(stale.buf, 0, MAGIC, VERSION, 1, 0, int(dead.stdout))
+        stale.close()
+        table = bacnet.enable_live_values(name=name)
+        try:
+            # the block of a running process is not replaced
+            with pytest.raises(FileExistsError, match=name):
+                LiveValueTable(name=name)
+            await test_device["AV"].value
+            await test_device["AV"].value
+            reader = LiveValueReader(table.name)
+            point = test_device["AV"]
+            live = reader.get(
+                test_device.properties.device_id,
+                point.properties.type,
+                point.properties.address,
+            )
+            assert live.value == pytest.approx(point._history.value[-1])
+            assert live.seq >= 2
+            assert len(reader.snapshot()) == len(reader) >= 1
+            reader.close()
+        finally:
+            bacnet.disable_live_values()
+
+
+@pytest.mark.asyncio
+async def test_Sinks(network_and_devices, tmp_path):
+    import csv
+    import sqlite3
+
+    from BAC0.db.sinks import CallableSink, CSVSink, SQLiteSink
+
+    async for resources in network_and_devices:
+        loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
+        received = []
+        sinks = [
+            bacnet.add_sink(SQLiteSink(str(tmp_path / "site.db"))),
+            bacnet.add_sink(CSVSink(str(tmp_path / "analog.csv"), types=["analog"])),
+            bacnet.add_sink(CallableSink(received.extend, devices=[test_device])),
+        ]
+        await test_device["AV"].value
+        await test_device["BV"].value
+        for sink in sinks:
+            await bacnet.remove_sink(sink)
+        assert bacnet.sinks == []
+
+        store = sinks[0]
+        points = {
+            name
+            for (name,) in await store.query(
+                "SELECT DISTINCT name FROM samples JOIN points USING (point_id) "
+                "WHERE device_id = ?",
+                (test_device.properties.device_id,),
+            )
+        }
+        assert {"AV", "BV"} <= points
+        his = await store.history(test_device.properties.device_id, "AV")
+        assert his.iloc[-1] == pytest.approx(test_device["AV"]._history.value[-1])
+        with sqlite3.connect(tmp_path / "site.db") as db:
+            assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        with open(tmp_path / "analog.csv") as file:
+            rows = list(csv.DictReader(file))
+        assert rows and all(row["point"] != "BV" for row in rows)
+        assert {event.point.properties.name for event in received} == {"AV", "BV"}
+        assert sinks[0].stats["written"] >= 2
+
+
+@pytest.mark.asyncio
+async def test_deprecated_influxdb_tasks(network_and_devices):
+    from BAC0.db.sinks import InfluxDBSink
+
+    async for resources in network_and_devices:
+        loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
+        written = []
+
+        async def write_points_lastvalue_to_db(points):
+            written.append(points)
+
+        database = bacnet.database
+        bacnet.database = SimpleNamespace(
+            write_points_lastvalue_to_db=write_points_lastvalue_to_db
+        )
+        try:
+            with pytest.warns(DeprecationWarning):
+                bacnet.create_save_to_influxdb_task(delay=30)
+            with pytest.warns(DeprecationWarning):
+                bacnet.create_save_to_influxdb_task(delay=20)
+            (sink,) = [s for s in bacnet.sinks if isinstance(s, InfluxDBSink)]
+            assert sink.flush_interval == 20
+            with pytest.warns(DeprecationWarning):
+                await bacnet.save_registered_devices_to_db()
+            assert len(written) == len(bacnet.registered_devices) >= 1
+        finally:
+            bacnet.database = database
+            for sink in [s for s in bacnet.sinks if isinstance(s, InfluxDBSink)]:
+                await bacnet.remove_sink(sink)
+
+
+@pytest.mark.asyncio
+async def test_sink_backoff():
+    from types import SimpleNamespace
+
+    from BAC0.db.sinks import CallableSink
+
+    calls = []
+
+    def fail(events):
+        calls.append(len(events))
+        raise ConnectionError("database down")
+
+    batches = [["event"] * 2 for _ in range(5)]
+
+    async def get():
+        if not batches:
+            raise StopAsyncIteration
+        return batches.pop(0)
+
+    sink = CallableSink(fail, batch_size=2, flush_interval=10, max_backoff=30)
+    sink.subscription = SimpleNamespace(get=get, stats={})
+    await sink._run()
+    # after the first failure, full batches wait for the backoff
+    assert calls == [2, 10]
+    assert sink.errors == 2 and sink._next_flush() == 20
+    sink.errors = 5
+    assert sink._next_flush() == 30
+
+
+@pytest.mark.asyncio
+async def test_sqlite_sink_points(tmp_path):
+    from datetime import datetime
+    from types import SimpleNamespace
+
+    from BAC0.db.sinks import VIRTUAL, SQLiteSink
+
+    device = SimpleNamespace(properties=SimpleNamespace(device_id=None, name="virtual"))
+
+    def _event(name, value):
+        point = SimpleNamespace(
+            properties=SimpleNamespace(
+                device=device,
+                name=name,
+                type="analog",
+                address=0,
+                description="",
+                units_state=None,
+            )
+        )
+        return SimpleNamespace(
+            point=point, value=value, timestamp=datetime.now().astimezone()
+        )
+
+    path = str(tmp_path / "site.db")
+    # the second sink is the same store after a restart
+    for _ in range(2):
+        store = SQLiteSink(path)
+        await store.write([_event("V1", 1.0), _event("V2", 2.0), _event("V1", 3.0)])
+        await store.close()
+    rows = await store.query("SELECT device_id, name FROM points ORDER BY name")
+    assert rows == [(VIRTUAL, "V1"), (VIRTUAL, "V2")]
+    assert len(await store.query("SELECT * FROM samples")) == 6
+    assert list(await store.history(VIRTUAL, "V1")) == [1.0, 3.0, 1.0, 3.0]
+
+
+@pytest.mark.asyncio
+async def test_SQLiteBackup(network_and_devices, tmp_path):
+    import sqlite3
+
+    async for resources in network_and_devices:
+        loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
+        await test_device["AV"].value
+        await test_device["BV"].value
+        filename = str(tmp_path / "backup")
+        await test_device.save(filename=filename)
+        await test_device["AV"].value
+        await test_device.save(filename=filename)
+        with sqlite3.connect(f"{filename}.db") as db:
+            count = db.execute(
+                "SELECT COUNT(*) FROM samples JOIN points USING (point_id) "
+                "WHERE name = 'AV'"
+            ).fetchone()[0]
+        # the second save only appends the new sample
+        assert count == len(test_device["AV"]._history.value)
+
+        offline = await BAC0.device(from_backup=f"{filename}.db")
+        assert offline.properties.name == test_device.properties.name
+        points = {str(point.properties.name): point for point in offline.points}
+        assert list(points["AV"].history) == pytest.approx(
+            test_device["AV"]._history.value
+        )
+        assert points["BV"].history.iloc[-1] == test_device["BV"]._history.value[-1]
+        assert await offline.value_from_sql(filename, "AV") == pytest.approx(
+            test_device["AV"]._history.value[-1]
+        )
+
+
+def _first_format_backup(filename, with_properties=True):
+    """
+    Backup written by the first format : wide history table and pickle file
+    """
+    import pickle
+    import sqlite3
+
+    import pandas as pd
+
+    index = pd.date_range("2024-01-01 12:00", periods=3, freq="1s", tz="UTC")
+    history = pd.DataFrame(
+        {"AV": [1.0, 2.0, 3.0], "BV_str": ["inactive", "active", "active"]},
+        index=index,
+    )
+    history["BV"] = [0, 1, 1]
+    with sqlite3.connect(f"{filename}.db") as con:
+        history.to_sql("history", con, index_label="index")
+    if not with_properties:
+        return index
+    device = {
+        "name": "old device",
+        "address": "2:5",
+        "device_id": 5,
+        "pollDelay": 10,
+        "objects_list": [],
+        "multistates": {},
+        "auto_save": False,
+        "save_resampling": "1s",
+        "clear_history_on_save": False,
+        "history_size": None,
+    }
+    points = pd.DataFrame(
+        {
+            "AV": {
+                "name": "AV",
+                "type": "analogValue",
+                "address": 1,
+                "description": "",
+                "units_state": "degreesCelsius",
+            },
+            "BV": {
+                "name": "BV",
+                "type": "binaryValue",
+                "address": 2,
+                "description": "",
+                "units_state": ["off", "on"],
+            },
+        }
+    )
+    with open(f"{filename}.bin", "wb") as file:
+        pickle.dump({"device": device, "points": points}, file)
+    return index
+
+
+@pytest.mark.asyncio
+async def test_first_format_backup(tmp_path):
+    import json
+    import sqlite3
+
+    from BAC0.core.io.IOExceptions import DataError
+    from BAC0.db.sql import _write_sqlite
+
+    # properties are missing, can't be converted
+    _first_format_backup(str(tmp_path / "broken"), with_properties=False)
+    with pytest.raises(DataError, match="first format"):
+        await BAC0.device(from_backup=str(tmp_path / "broken.db"))
+
+    filename = str(tmp_path / "old")
+    index = _first_format_backup(filename)
+    offline = await BAC0.device(from_backup=f"{filename}.db")
+    assert offline.properties.name == "old device"
+    points = {str(point.properties.name): point for point in offline.points}
+    assert list(points["AV"].history) == [1.0, 2.0, 3.0]
+    assert list(points["AV"].history.index) == list(index)
+    assert list(points["BV"].history) == [0, 1, 1]
+    with sqlite3.connect(f"{filename}.db") as con:
+        tables = {row[0] for row in con.execute("SELECT name FROM sqlite_master")}
+        assert {"history_v1", "samples"} <= tables and "history" not in tables
+        assert con.execute(
+            "SELECT text FROM samples JOIN points USING (point_id) "
+            "WHERE name = 'BV' ORDER BY ts DESC"
+        ).fetchone() == ("active",)
+
+    # saving to an old file converts it first
+    filename = str(tmp_path / "saved")
+    _first_format_backup(filename)
+    _write_sqlite(f"{filename}.db", json.dumps({"name": "new"}), [], [])
+    with sqlite3.connect(f"{filename}.db") as con:
+        assert con.execute("SELECT COUNT(*) FROM samples").fetchone()[0] == 6
+
+
+@pytest.mark.asyncio
+async def test_Export(network_and_devices, tmp_path):
+    import csv
+
+    async for resources in network_and_devices:
+        loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
+        await test_device["AV"].value
+        await test_device["BV"].value
+        expected = sum(
+            len(point._history.value)
+            for dev in (test_device, test_device_30)
+            for point in dev.points
+            if point.properties.type in ("analogValue", "binaryValue")
+        )
+
+        path = str(tmp_path / "site.csv")
+        written = await bacnet.export(
+            path, format="csv", devices=[test_device, test_device_30], chunk_size=2
+        )
+        with open(path) as file:
+            rows = list(csv.DictReader(file))
+        assert len(rows) == written
+        assert written >= expected
+        av = [row for row in rows if row["point"] == "AV"]
+        assert float(av[-1]["value"]) == pytest.approx(
+            test_device["AV"]._history.value[-1]
+        )
+
+        with pytest.raises(ValueError):
+            await test_device.export(path, format="xlsx")
+        pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        path = str(tmp_path / "device.parquet")
+        written = await test_device.export(path, chunk_size=2)
+        table = pq.read_table(path)
+        assert table.num_rows == written
+        assert str(table.schema.field("point").type).startswith("dictionary")
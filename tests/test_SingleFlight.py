@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding utf-8 -*-
+import asyncio
+from typing import AsyncGenerator
+
+import pytest
+
+from BAC0.core.io.SingleFlight import SingleFlight
+
+"""
+Test sharing of identical requests in flight
+"""
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_call():
+    in_flight = SingleFlight()
+    calls = []
+
+    async def read(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    results = await asyncio.gather(
+        *(in_flight.do(("rp", "2:5"), read, 1) for _ in range(5)),
+        in_flight.do(("rp", "2:6"), read, 2),
+    )
+    assert results == [1, 1, 1, 1, 1, 2]
+    assert calls == [1, 2]
+    assert in_flight.stats == {"sent": 2, "shared": 4, "pending": 0}
+
+    # once answered, the next request goes on the network
+    assert await in_flight.do(("rp", "2:5"), read, 3) == 3
+
+
+@pytest.mark.asyncio
+async def test_errors_and_cancellation():
+    in_flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("no answer")
+
+    first = asyncio.ensure_future(in_flight.do("key", failing))
+    second = asyncio.ensure_future(in_flight.do("key", failing))
+    await asyncio.sleep(0)
+    # a cancelled caller doesn't cancel the request of the others
+    first.cancel()
+    with pytest.raises(ValueError):
+        await second
+    assert len(in_flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads(network_and_devices: AsyncGenerator):
+    async for resources in network_and_devices:
+        loop, bacnet, device_app, device30_app, test_device, test_device_30 = resources
+        shared = bacnet.in_flight.shared
+        point = test_device["AV"]
+        request = (
+            f"{test_device.properties.address} analogValue "
+            f"{point.properties.address} presentValue"
+        )
+        values = await asyncio.gather(*(bacnet.read(request) for _ in range(4)))
+        assert len(set(values)) == 1
+        assert bacnet.in_flight.shared >= shared + 3